@@ -0,0 +1,89 @@
+"""Partition notifications by month
+
+Revision ID: 1e2bdf3effd8
+Revises: 939f271729b5
+Create Date: 2026-10-19 09:41:03.227415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1e2bdf3effd8'
+down_revision: Union[str, Sequence[str], None] = '939f271729b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE notifications RENAME TO notifications_unpartitioned")
+    op.execute("ALTER INDEX ix_notifications_id RENAME TO ix_notifications_unpartitioned_id")
+    op.execute("ALTER SEQUENCE notifications_id_seq OWNED BY NONE")
+
+    # The partition key has to be part of the primary key.
+    op.execute("""
+        CREATE TABLE notifications (
+            id INTEGER NOT NULL DEFAULT nextval('notifications_id_seq'),
+            message VARCHAR NOT NULL,
+            is_read BOOLEAN,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            owner_id INTEGER REFERENCES users (id),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE notifications_id_seq OWNED BY notifications.id")
+    op.create_index(op.f('ix_notifications_id'), 'notifications', ['id'], unique=False)
+    op.create_index('ix_notifications_owner_created', 'notifications', ['owner_id', sa.text('created_at DESC')], unique=False)
+
+    # One partition per month from the oldest existing row through two months ahead,
+    # plus a default partition so an insert can never fail for lack of one.
+    op.execute("""
+        DO $$
+        DECLARE
+            month DATE := date_trunc('month', COALESCE(
+                (SELECT MIN(created_at) FROM notifications_unpartitioned), now()))::date;
+        BEGIN
+            WHILE month <= (date_trunc('month', now()) + interval '2 months')::date LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF notifications FOR VALUES FROM (%L) TO (%L)',
+                    'notifications_' || to_char(month, '"y"YYYY"m"MM'), month, (month + interval '1 month')::date
+                );
+                month := (month + interval '1 month')::date;
+            END LOOP;
+        END $$
+    """)
+    op.execute("CREATE TABLE notifications_default PARTITION OF notifications DEFAULT")
+
+    op.execute("""
+        INSERT INTO notifications (id, message, is_read, created_at, owner_id)
+        SELECT id, message, is_read, COALESCE(created_at, now()), owner_id
+        FROM notifications_unpartitioned
+    """)
+    op.execute("DROP TABLE notifications_unpartitioned")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE notifications RENAME TO notifications_partitioned")
+    op.execute("ALTER SEQUENCE notifications_id_seq OWNED BY NONE")
+    op.execute("DROP INDEX ix_notifications_id")
+    op.execute("""
+        CREATE TABLE notifications (
+            id INTEGER NOT NULL DEFAULT nextval('notifications_id_seq') PRIMARY KEY,
+            message VARCHAR NOT NULL,
+            is_read BOOLEAN,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            owner_id INTEGER REFERENCES users (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE notifications_id_seq OWNED BY notifications.id")
+    op.create_index(op.f('ix_notifications_id'), 'notifications', ['id'], unique=False)
+    op.execute("""
+        INSERT INTO notifications (id, message, is_read, created_at, owner_id)
+        SELECT id, message, is_read, created_at, owner_id FROM notifications_partitioned
+    """)
+    op.execute("DROP TABLE notifications_partitioned CASCADE")
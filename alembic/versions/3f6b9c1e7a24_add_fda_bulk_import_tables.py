@@ -0,0 +1,54 @@
+"""Add tables for the openFDA bulk enforcement import
+
+Revision ID: 3f6b9c1e7a24
+Revises: 8d4f2a6b1c37
+Create Date: 2026-10-19 16:42:08.519236
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6b9c1e7a24'
+down_revision: Union[str, Sequence[str], None] = '8d4f2a6b1c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('fda_recalls',
+    sa.Column('recall_number', sa.String(), nullable=False),
+    sa.Column('event_id', sa.String(), nullable=True),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('recall_date', sa.Date(), nullable=True),
+    sa.Column('report_date', sa.Date(), nullable=True),
+    sa.Column('severity', sa.String(), nullable=True),
+    sa.Column('classification', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('recalling_firm', sa.String(), nullable=True),
+    sa.Column('product_description', sa.String(), nullable=True),
+    sa.Column('source_url', sa.String(), nullable=True),
+    sa.Column('imported_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('recall_number')
+    )
+    op.create_index(op.f('ix_fda_recalls_recall_date'), 'fda_recalls', ['recall_date'], unique=False)
+    op.create_table('fda_import_checkpoints',
+    sa.Column('member', sa.String(), nullable=False),
+    sa.Column('fingerprint', sa.String(), nullable=False),
+    sa.Column('records_done', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('member')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('fda_import_checkpoints')
+    op.drop_index(op.f('ix_fda_recalls_recall_date'), table_name='fda_recalls')
+    op.drop_table('fda_recalls')
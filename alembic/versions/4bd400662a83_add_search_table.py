@@ -1,7 +1,7 @@
 """Add search table
 
 Revision ID: 4bd400662a83
-Revises: 
+Revises: 0a1c5e7f2b90
 Create Date: 2025-08-29 16:27:49.195866
 
 """
@@ -13,7 +13,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision: str = '4bd400662a83'
-down_revision: Union[str, Sequence[str], None] = None
+down_revision: Union[str, Sequence[str], None] = '0a1c5e7f2b90'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
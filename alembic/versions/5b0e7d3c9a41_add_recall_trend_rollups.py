@@ -0,0 +1,51 @@
+"""Add recall trend rollup tables
+
+Revision ID: 5b0e7d3c9a41
+Revises: c98ae2d61295
+Create Date: 2026-10-19 11:05:12.337402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b0e7d3c9a41'
+down_revision: Union[str, Sequence[str], None] = 'c98ae2d61295'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('trend_terms',
+    sa.Column('term', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('last_ingested_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('term')
+    )
+    op.create_table('trend_seen_recalls',
+    sa.Column('term', sa.String(), nullable=False),
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('recall_key', sa.String(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('severity', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('term', 'source', 'recall_key')
+    )
+    op.create_table('trend_counts',
+    sa.Column('term', sa.String(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('severity', sa.String(), nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('term', 'month', 'source', 'severity')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('trend_counts')
+    op.drop_table('trend_seen_recalls')
+    op.drop_table('trend_terms')
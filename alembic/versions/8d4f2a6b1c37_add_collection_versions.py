@@ -0,0 +1,66 @@
+"""Add per-user collection version counters
+
+Revision ID: 8d4f2a6b1c37
+Revises: 5b0e7d3c9a41
+Create Date: 2026-10-19 11:48:36.902615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4f2a6b1c37'
+down_revision: Union[str, Sequence[str], None] = '5b0e7d3c9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> collection name used in ETags (see caching.py)
+COLLECTIONS = {
+    'searches': 'searches',
+    'watchlist_items': 'watchlist',
+    'notifications': 'notifications',
+}
+# Transition tables allow only one event per trigger.
+EVENTS = {'INSERT': 'NEW', 'UPDATE': 'NEW', 'DELETE': 'OLD'}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('collection_versions',
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('collection', sa.String(), nullable=False),
+    sa.Column('version', sa.BigInteger(), server_default='1', nullable=False),
+    sa.PrimaryKeyConstraint('owner_id', 'collection')
+    )
+    # Statement-level: a bulk write bumps each affected owner once, not per row.
+    op.execute("""
+        CREATE FUNCTION bump_collection_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO collection_versions (owner_id, collection)
+            SELECT DISTINCT owner_id, TG_ARGV[0] FROM changed_rows WHERE owner_id IS NOT NULL
+            ON CONFLICT (owner_id, collection)
+            DO UPDATE SET version = collection_versions.version + 1;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table, collection in COLLECTIONS.items():
+        for event, transition in EVENTS.items():
+            op.execute(f"""
+                CREATE TRIGGER {table}_version_{event.lower()}
+                AFTER {event} ON {table}
+                REFERENCING {transition} TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_collection_version('{collection}')
+            """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in COLLECTIONS:
+        for event in EVENTS:
+            op.execute(f"DROP TRIGGER {table}_version_{event.lower()} ON {table}")
+    op.execute("DROP FUNCTION bump_collection_version()")
+    op.drop_table('collection_versions')
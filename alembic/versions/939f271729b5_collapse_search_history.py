@@ -0,0 +1,54 @@
+"""Collapse search history into one row per user and query
+
+Revision ID: 939f271729b5
+Revises: 73377ec25045
+Create Date: 2026-10-19 09:12:40.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '939f271729b5'
+down_revision: Union[str, Sequence[str], None] = '73377ec25045'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('searches', sa.Column('search_count', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('searches', sa.Column('last_seen_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True))
+    op.execute("UPDATE searches SET last_seen_at = created_at")
+
+    # Fold duplicate (owner, query) rows into the oldest one before adding the constraint.
+    op.execute("""
+        WITH grouped AS (
+            SELECT owner_id, query_text, MIN(id) AS keep_id, COUNT(*) AS n, MAX(created_at) AS last_seen
+            FROM searches
+            GROUP BY owner_id, query_text
+            HAVING COUNT(*) > 1
+        )
+        UPDATE searches s
+        SET search_count = g.n, last_seen_at = g.last_seen
+        FROM grouped g
+        WHERE s.id = g.keep_id
+    """)
+    op.execute("""
+        DELETE FROM searches s
+        USING searches keep
+        WHERE s.owner_id = keep.owner_id
+          AND s.query_text = keep.query_text
+          AND s.id > keep.id
+    """)
+    op.create_unique_constraint('uq_searches_owner_query', 'searches', ['owner_id', 'query_text'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_searches_owner_query', 'searches', type_='unique')
+    op.drop_column('searches', 'last_seen_at')
+    op.drop_column('searches', 'search_count')
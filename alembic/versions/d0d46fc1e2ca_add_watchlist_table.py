@@ -20,13 +20,24 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Upgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    # Originally created by create_all at app startup, so this revision was
+    # generated empty; existing databases already have the table.
+    if sa.inspect(op.get_bind()).has_table('watchlist_items'):
+        return
+    op.create_table('watchlist_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('query_text', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_watchlist_items_id'), 'watchlist_items', ['id'], unique=False)
+    op.create_index(op.f('ix_watchlist_items_query_text'), 'watchlist_items', ['query_text'], unique=False)
 
 
 def downgrade() -> None:
     """Downgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    op.drop_index(op.f('ix_watchlist_items_query_text'), table_name='watchlist_items')
+    op.drop_index(op.f('ix_watchlist_items_id'), table_name='watchlist_items')
+    op.drop_table('watchlist_items')
@@ -1,44 +1,122 @@
+import asyncio
+import logging
+from collections import defaultdict
 from sqlalchemy.orm import Session
-import httpx
 from datetime import datetime, timedelta
 
-from . import crud, database, models
+from . import config, crud, database, mailer, metrics, models, sources, tracing, trends
+from .matcher import WatchlistMatcher
+from .suggest import suggestions
+
+logger = logging.getLogger(__name__)
 
 def get_past_date_str(days: int = 1):
     """Returns a date in the past in YYYYMMDD format for the FDA API."""
     past_date = datetime.now() - timedelta(days=days)
     return past_date.strftime('%Y%m%d')
 
+def percolate(records: list[tuple[tuple[str, ...], dict]],
+              matcher: WatchlistMatcher) -> list[tuple[str, dict]]:
+    """
+    Matches each new record against every term at once and returns
+    (term, recall) matches. Cost grows with the number of new records,
+    not with users x watchlist size.
+    """
+    matches = []
+    for fields, recall in records:
+        for term in matcher.match_fields(fields):
+            matches.append((term, recall))
+    return matches
+
+async def fetch_new_reports(matcher: WatchlistMatcher, since: str) -> list[tuple[str, dict]]:
+    """
+    Sources with a feed are read once and percolated through the matcher;
+    sources without one fall back to a search per distinct term.
+    """
+    matches = []
+    try:
+        searched = []
+        for source in sources.enabled_sources():
+            records = await source.fetch_feed(sources.http_client(), since)
+            if records is None:
+                searched.append(source)
+                continue
+            suggestions.add_recalls(alert for _, alert in records)
+            with tracing.tracer.start_as_current_span("alerter.percolate", attributes={"source": source.name, "records": len(records)}):
+                matches.extend(percolate(records, matcher))
+
+        if searched:
+            results = await sources.search_many(sorted(matcher.terms), since=since, only=searched)
+            for term, recalls in results.items():
+                matches.extend((term, recall) for recall in recalls)
+    finally:
+        # This loop is the alerter's own (asyncio.run), so its client goes with it.
+        await sources.close_http_client()
+    return matches
+
+def digest_message(terms: dict[str, dict]) -> str:
+    """Formats one user's matches, e.g. New reports for 2 watchlist terms: 'metformin' (FDA); ..."""
+    parts = [f"'{term}' ({', '.join(source_names)})" for term, source_names in sorted(terms.items())]
+    if len(parts) == 1:
+        return f"New report found for {parts[0]} on your watchlist."
+    return f"New reports for {len(parts)} watchlist terms: {'; '.join(parts)}."
+
 def check_for_new_reports():
     """
     The main function for the background task.
-    Checks for new FDA reports and creates in-app notifications.
+    Checks every enabled source for new reports and creates in-app notifications.
     """
     db = database.SessionLocal()
     try:
-        print(f"--- [ALERTER] Running daily check at {datetime.now()} ---")
-
-        users_with_watchlist = db.query(models.User).filter(models.User.watchlist_items.any()).all()
-        if not users_with_watchlist:
-            return
-
-        report_date = get_past_date_str(days=1)
-
-        for user in users_with_watchlist:
-            for item in user.watchlist_items:
-                query = item.query_text
-                api_url = f"https://api.fda.gov/drug/enforcement.json?search=report_date:{report_date}+AND+(product_description:{query}+OR+reason_for_recall:{query})&limit=1"
-
-                try:
-                    response = httpx.get(api_url)
-                    if response.status_code == 200:
-                        data = response.json()
-                        if 'results' in data and data['results']:
-                          
-                            message = f"New FDA report found for '{query}' on your watchlist."
-                            crud.create_notification(db=db, user_id=user.id, message=message)
-                            print(f"!!! ALERT !!! Created notification for user {user.email} for query '{query}'.")
-                except Exception as api_err:
-                    print(f"[ALERTER] Error querying FDA API for '{query}': {api_err}")
+        with tracing.tracer.start_as_current_span("alerter.check_for_new_reports"):
+            _check_for_new_reports(db)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def _check_for_new_reports(db: Session):
+    logger.info("Running daily watchlist check")
+
+    watchers = defaultdict(list)
+    for user_id, query_text in db.query(models.WatchlistItem.owner_id, models.WatchlistItem.query_text):
+        watchers[query_text].append(user_id)
+    # Terms rolled up for /api/trends stay current even once nobody watches them.
+    trend_terms = [term for (term,) in db.query(models.TrendTerm.term)]
+    if not watchers and not trend_terms:
+        return
+
+    report_date = get_past_date_str(days=1)
+    matcher = WatchlistMatcher([*watchers, *trend_terms])
+
+    with tracing.tracer.start_as_current_span("alerter.fetch", attributes={"terms": len(matcher.terms)}):
+        matches = asyncio.run(fetch_new_reports(matcher, since=report_date))
+    hits = [(user_id, term, recall) for term, recall in matches for user_id in watchers.get(term, ())]
+
+    with tracing.tracer.start_as_current_span("alerter.trends"):
+        # New watchlist terms get their history backfilled once; after that the
+        # daily matches are all the rollup needs.
+        trends.backfill_terms(db, watchers)
+        trends.ingest(db, matches)
+
+    # One digest notification per user per run, listing every matched term.
+    matched = defaultdict(lambda: defaultdict(dict))  # user -> term -> {source: None}
+    for user_id, term, recall in hits:
+        matched[user_id][term][recall['source']] = None
+
+    with tracing.tracer.start_as_current_span("alerter.notify", attributes={"hits": len(hits), "users": len(matched)}):
+        digests = [(user_id, digest_message(terms)) for user_id, terms in matched.items()]
+        crud.create_notifications(db, digests)
+        metrics.ALERTER_NOTIFICATIONS.inc(len(digests))
+        logger.info("Created watchlist digests", extra={"users": len(digests), "hits": len(hits)})
+
+        if config.EMAIL_ENABLED and digests:
+            emails = dict(db.query(models.User.id, models.User.email).filter(models.User.id.in_(matched)))
+            mailer.enqueue_emails(db, [
+                {
+                    "owner_id": user_id,
+                    "to_address": emails[user_id],
+                    "subject": "PharmaClear daily watchlist digest",
+                    "body": f"{message}\n\nSign in to PharmaClear to review the reports.",
+                    "dedupe_key": f"digest:{report_date}",
+                }
+                for user_id, message in digests
+            ])
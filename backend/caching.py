@@ -0,0 +1,67 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+
+from . import config, models
+
+# ===================================================================
+# ===== 1. CACHE-CONTROL POLICIES
+# ===================================================================
+# Per-user data is always private. Collections the dashboard polls must be
+# revalidated on every use, which is cheap thanks to their version ETags.
+REVALIDATE = "private, no-cache"
+SEARCH = f"private, max-age={config.SEARCH_RESULTS_MAX_AGE}"
+SUGGEST = "private, max-age=300"
+TRENDS = "private, max-age=600"
+NO_STORE = "no-store"
+
+# ===================================================================
+# ===== 2. ETAGS
+# ===================================================================
+# Weak validators throughout: the compression middleware may re-encode the
+# body, which a strong ETag would not survive.
+
+def collection_etag(db: Session, user_id: int, collection: str, extra: str = "") -> str:
+    """
+    ETag for one of a user's collections ("searches", "watchlist",
+    "notifications"), read from the version counter that database triggers
+    bump on every write. Costs one primary-key lookup instead of the
+    collection query. `extra` distinguishes query parameters and anything
+    not yet in the database.
+    """
+    version = db.query(models.CollectionVersion.version) \
+        .filter(models.CollectionVersion.owner_id == user_id, models.CollectionVersion.collection == collection) \
+        .scalar() or 0
+    return f'W/"{collection}-{version}{"-" + extra if extra else ""}"'
+
+
+def content_etag(body: bytes) -> str:
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def digest(value: str) -> str:
+    """Short stable fingerprint for ETag suffixes."""
+    return hashlib.blake2b(value.encode(), digest_size=8).hexdigest()
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/"x" matches "x"."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == wanted for candidate in header.split(","))
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def set_cache_headers(response: Response, etag: Optional[str], cache_control: str):
+    if etag:
+        response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
@@ -0,0 +1,92 @@
+import gzip
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """Picks br over gzip when the client accepts both; "" when neither."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return ""
+
+
+class CompressionMiddleware:
+    """
+    Compresses complete responses of at least `minimum_size` bytes with
+    brotli or gzip, whichever the client prefers. Streaming responses (the
+    bulk export has its own gzip option) and bodies that are already encoded
+    or not text-like are passed through untouched.
+
+    Every response that could have been compressed carries
+    `Vary: Accept-Encoding`, whether or not this one was, so a shared cache
+    never hands a compressed body to a client that didn't ask for it (or the
+    other way round). 304s carry it too, as they stand in for such a response.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if start["status"] == 304:
+                headers.add_vary_header("Accept-Encoding")
+            if (message.get("more_body") or "content-encoding" in headers
+                    or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)):
+                await send(start)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            if encoding and len(body) >= self.minimum_size:
+                body = self.compress(encoding, body)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -17,4 +17,84 @@ ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 GMAIL_EMAIL = os.getenv("GMAIL_EMAIL")
-GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD")
\ No newline at end of file
+GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD")
+
+# Comma-separated source names (e.g. "FDA,Health Canada"); unset means all registered sources.
+ENABLED_SOURCES = os.getenv("ENABLED_SOURCES")
+# Max upstream requests in flight at once, shared by every source.
+SOURCE_CONCURRENCY = int(os.getenv("SOURCE_CONCURRENCY", "8"))
+# Requests per second to the scraped Health Canada site, shared by every search.
+HEALTH_CANADA_RATE_LIMIT = float(os.getenv("HEALTH_CANADA_RATE_LIMIT", "10"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Tracing: "none", "otlp" (send to OTEL_EXPORTER_OTLP_ENDPOINT) or "file" (append to TRACE_FILE).
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+
+# Comma-separated emails allowed to use the X-Profile request header.
+ADMIN_EMAILS = {email.strip() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+
+# Upstream base URLs; overridden by the benchmark suite to point at a local fake upstream.
+FDA_API_BASE = os.getenv("FDA_API_BASE", "https://api.fda.gov")
+HEALTH_CANADA_BASE = os.getenv("HEALTH_CANADA_BASE", "https://recalls-rappels.canada.ca")
+
+# Search history is buffered in memory and bulk-upserted on whichever threshold is hit first.
+SEARCH_HISTORY_FLUSH_SIZE = int(os.getenv("SEARCH_HISTORY_FLUSH_SIZE", "200"))
+SEARCH_HISTORY_FLUSH_INTERVAL = float(os.getenv("SEARCH_HISTORY_FLUSH_INTERVAL", "2.0"))
+# Flushes a row may fail before it is dropped (e.g. its user was deleted meanwhile).
+SEARCH_HISTORY_MAX_ATTEMPTS = int(os.getenv("SEARCH_HISTORY_MAX_ATTEMPTS", "5"))
+
+# Bulk export (/api/export): queries per request, and rows per Parquet row group.
+EXPORT_MAX_QUERIES = int(os.getenv("EXPORT_MAX_QUERIES", "200"))
+EXPORT_PARQUET_ROW_GROUP_SIZE = int(os.getenv("EXPORT_PARQUET_ROW_GROUP_SIZE", "10000"))
+
+# Typeahead (/api/suggest): delta size that triggers a compaction, how often
+# popularity is rebuilt from search history, and how many distinct users must
+# have searched a term before it is suggested to others.
+SUGGEST_COMPACT_THRESHOLD = int(os.getenv("SUGGEST_COMPACT_THRESHOLD", "500"))
+SUGGEST_REFRESH_MINUTES = int(os.getenv("SUGGEST_REFRESH_MINUTES", "15"))
+SUGGEST_MIN_SEARCHERS = int(os.getenv("SUGGEST_MIN_SEARCHERS", "2"))
+
+# Recall trend rollups: rows per ingest statement, how many terms are
+# backfilled at once, and how long a failed backfill is reported before a
+# request may retry it.
+TREND_INGEST_BATCH_SIZE = int(os.getenv("TREND_INGEST_BATCH_SIZE", "5000"))
+TREND_BACKFILL_WORKERS = int(os.getenv("TREND_BACKFILL_WORKERS", "1"))
+TREND_BACKFILL_RETRY_SECONDS = float(os.getenv("TREND_BACKFILL_RETRY_SECONDS", "60"))
+
+# HTTP caching: how long browsers may reuse a search response, and the
+# smallest response body worth compressing.
+SEARCH_RESULTS_MAX_AGE = int(os.getenv("SEARCH_RESULTS_MAX_AGE", "60"))
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# openFDA bulk import (python -m backend.fda_import): the download manifest
+# listing the enforcement zips, where downloaded zips are kept, and records
+# per COPY batch (also the checkpoint interval for resuming).
+FDA_DOWNLOAD_MANIFEST = os.getenv("FDA_DOWNLOAD_MANIFEST", f"{FDA_API_BASE}/download.json")
+FDA_IMPORT_DIR = os.getenv("FDA_IMPORT_DIR", "fda_downloads")
+FDA_IMPORT_BATCH_SIZE = int(os.getenv("FDA_IMPORT_BATCH_SIZE", "20000"))
+
+# Notification retention: read notifications are purged after this many days;
+# whole monthly partitions are dropped once older than the partition window.
+NOTIFICATION_READ_RETENTION_DAYS = int(os.getenv("NOTIFICATION_READ_RETENTION_DAYS", "90"))
+NOTIFICATION_PARTITION_RETENTION_MONTHS = int(os.getenv("NOTIFICATION_PARTITION_RETENTION_MONTHS", "12"))
+NOTIFICATION_PURGE_BATCH_SIZE = int(os.getenv("NOTIFICATION_PURGE_BATCH_SIZE", "5000"))
+
+# Outgoing email. Defaults to Gmail SMTP with the app password above, and is
+# off unless SMTP credentials are set (or EMAIL_ENABLED=true). For local runs
+# point it at a stand-in: python -m aiosmtpd -n -l localhost:8025
+# with SMTP_HOST=localhost SMTP_PORT=8025 SMTP_STARTTLS=false EMAIL_ENABLED=true.
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_USERNAME = os.getenv("SMTP_USERNAME", GMAIL_EMAIL)
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", GMAIL_APP_PASSWORD)
+EMAIL_FROM = os.getenv("EMAIL_FROM", GMAIL_EMAIL or "alerts@pharmaclear.local")
+EMAIL_ENABLED = os.getenv("EMAIL_ENABLED", "true" if SMTP_USERNAME and SMTP_PASSWORD else "false").lower() == "true"
+EMAIL_RATE_PER_SECOND = float(os.getenv("EMAIL_RATE_PER_SECOND", "5"))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "100"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_RETRY_BASE_SECONDS = int(os.getenv("EMAIL_RETRY_BASE_SECONDS", "60"))
@@ -1,3 +1,7 @@
+from typing import Iterable
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from . import models, schemas, security
 
@@ -22,15 +26,31 @@ def authenticate_user(db: Session, email: str, password: str):
     return user
 
 
-def get_searches_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Search).filter(models.Search.owner_id == user_id).offset(skip).limit(limit).all()
+def get_searches_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100, exclude: Iterable[str] = ()):
+    query = db.query(models.Search).filter(models.Search.owner_id == user_id)
+    if exclude:
+        query = query.filter(models.Search.query_text.not_in(list(exclude)))
+    return query.order_by(models.Search.last_seen_at.desc()).offset(skip).limit(limit).all()
 
-def create_user_search(db: Session, search: schemas.SearchCreate, user_id: int):
-    db_search = models.Search(**search.model_dump(), owner_id=user_id)
-    db.add(db_search)
-    db.commit()
-    db.refresh(db_search)
-    return db_search
+def get_searches_by_query(db: Session, user_id: int, query_texts: Iterable[str]):
+    return db.query(models.Search).filter(models.Search.owner_id == user_id, models.Search.query_text.in_(list(query_texts))).all()
+
+def upsert_user_searches(db: Session, rows: list[dict]):
+    """
+    Bulk-writes collapsed search history in one executemany. Rows for an
+    existing (owner, query) add to its search_count and advance last_seen_at.
+    The caller commits.
+    """
+    table = models.Search.__table__
+    stmt = pg_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_searches_owner_query",
+        set_={
+            "search_count": table.c.search_count + stmt.excluded.search_count,
+            "last_seen_at": func.greatest(table.c.last_seen_at, stmt.excluded.last_seen_at),
+        },
+    )
+    db.execute(stmt, rows)
 
 def get_watchlist_items_by_user(db: Session, user_id: int):
     return db.query(models.WatchlistItem).filter(models.WatchlistItem.owner_id == user_id).all()
@@ -60,17 +80,14 @@ def delete_watchlist_item(db: Session, item_id: int, user_id: int):
         return db_item
     return None
 
-def create_notification(db: Session, user_id: int, message: str):
-    """Creates a new notification for a user."""
-    db_notification = models.Notification(owner_id=user_id, message=message)
-    db.add(db_notification)
+def create_notifications(db: Session, notifications: list[tuple[int, str]]):
+    """Creates many (user_id, message) notifications in a single commit."""
+    db.add_all(models.Notification(owner_id=user_id, message=message) for user_id, message in notifications)
     db.commit()
-    db.refresh(db_notification)
-    return db_notification
 
-def get_notifications_by_user(db: Session, user_id: int):
-    """Gets all notifications for a user, newest first."""
-    return db.query(models.Notification).filter(models.Notification.owner_id == user_id).order_by(models.Notification.created_at.desc()).all()
+def get_notifications_by_user(db: Session, user_id: int, limit: int = 50):
+    """Gets a user's most recent notifications, newest first."""
+    return db.query(models.Notification).filter(models.Notification.owner_id == user_id).order_by(models.Notification.created_at.desc()).limit(limit).all()
 
 def mark_notifications_as_read(db: Session, user_id: int):
     """Marks all unread notifications for a user as read."""
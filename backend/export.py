@@ -0,0 +1,147 @@
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, List, Optional
+
+from . import config
+
+# Column order for every export format. "query" is the search that produced the row.
+EXPORT_COLUMNS = ("query", "date", "source", "severity", "title", "description",
+                  "source_url", "recall_number", "event_id")
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# ===================================================================
+# ===== 1. ENCODERS
+# ===================================================================
+# Each encoder is fed rows in batches and hands back the bytes that are ready
+# to send, so an export only ever holds one batch (or one Parquet row group)
+# in memory however many rows it streams.
+
+class CsvEncoder:
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.DictWriter(self._buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+        self._writer.writeheader()
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def write(self, rows: Iterable[dict]) -> bytes:
+        self._writer.writerows(rows)
+        return self._drain()
+
+    def close(self) -> bytes:
+        return self._drain()
+
+
+class NdjsonEncoder:
+    def write(self, rows: Iterable[dict]) -> bytes:
+        return "".join(
+            json.dumps({column: row.get(column) for column in EXPORT_COLUMNS}) + "\n" for row in rows
+        ).encode("utf-8")
+
+    def close(self) -> bytes:
+        return b""
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that keeps what ParquetWriter wrote until it is drained."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ParquetEncoder:
+    """
+    Buffers rows until a full row group is available, then writes it. Needs
+    pyarrow, which is only imported when a Parquet export is requested.
+    """
+
+    def __init__(self, row_group_size: Optional[int] = None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.row_group_size = row_group_size or config.EXPORT_PARQUET_ROW_GROUP_SIZE
+        self._schema = pa.schema([(column, pa.string()) for column in EXPORT_COLUMNS])
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(self._sink, self._schema, compression="zstd")
+        self._pending: List[dict] = []
+
+    def _write_row_group(self, rows: List[dict]):
+        columns = {
+            column: [None if row.get(column) is None else str(row[column]) for row in rows]
+            for column in EXPORT_COLUMNS
+        }
+        self._writer.write_table(self._pa.table(columns, schema=self._schema))
+
+    def write(self, rows: Iterable[dict]) -> bytes:
+        self._pending.extend(rows)
+        while len(self._pending) >= self.row_group_size:
+            self._write_row_group(self._pending[:self.row_group_size])
+            del self._pending[:self.row_group_size]
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        if self._pending:
+            self._write_row_group(self._pending)
+            self._pending = []
+        self._writer.close()
+        return self._sink.drain()
+
+
+class GzipEncoder:
+    """Wraps another encoder and gzips its output as it streams."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+
+    def write(self, rows: Iterable[dict]) -> bytes:
+        return self._compressor.compress(self.inner.write(rows))
+
+    def close(self) -> bytes:
+        return self._compressor.compress(self.inner.close()) + self._compressor.flush()
+
+# ===================================================================
+# ===== 2. FACTORY
+# ===================================================================
+
+ENCODERS = {"csv": CsvEncoder, "ndjson": NdjsonEncoder, "parquet": ParquetEncoder}
+
+
+def make_encoder(fmt: str, gzip: bool = False):
+    """Raises ImportError for Parquet when pyarrow isn't installed."""
+    encoder = ENCODERS[fmt]()
+    return GzipEncoder(encoder) if gzip else encoder
+
+
+def export_filename(fmt: str, gzip: bool = False) -> str:
+    return f"pharmaclear-export.{fmt}" + (".gz" if gzip else "")
@@ -0,0 +1,314 @@
+"""
+Imports openFDA's bulk drug enforcement download into the fda_recalls table.
+
+    python -m backend.fda_import                  # every partition listed in the openFDA download manifest
+    python -m backend.fda_import drug-enforcement-0001-of-0001.json.zip
+    python -m backend.fda_import https://download.open.fda.gov/drug/enforcement/drug-enforcement-0001-of-0001.json.zip
+    python -m backend.fda_import --restart ...    # ignore checkpoints and import everything again
+
+The JSON inside each zip is decompressed and parsed as a stream, one record
+at a time, so memory stays flat however large the dataset grows. Records are
+normalized with the same mapping the live FDA search uses and loaded with
+COPY in batches of FDA_IMPORT_BATCH_SIZE. Each batch commits together with a
+checkpoint; an interrupted import picks up after the last committed batch.
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import time
+import zipfile
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import or_, text
+from sqlalchemy.orm import Session
+
+from . import config, database, models
+from .matcher import WatchlistMatcher, tokenize
+from .sources import SOURCES
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("recall_number", "event_id", "title", "description", "recall_date", "report_date", "severity",
+           "classification", "status", "recalling_firm", "product_description", "source_url")
+
+# ===================================================================
+# ===== 1. DOWNLOADS
+# ===================================================================
+# A zip's directory sits at the end of the file, so remote archives are
+# streamed to disk first and read from there.
+
+def manifest_urls(client: httpx.Client) -> List[str]:
+    """The drug enforcement partitions listed in openFDA's download manifest."""
+    response = client.get(config.FDA_DOWNLOAD_MANIFEST)
+    response.raise_for_status()
+    partitions = response.json()["results"]["drug"]["enforcement"]["partitions"]
+    return [partition["file"] for partition in partitions]
+
+
+def download(url: str, client: httpx.Client) -> Path:
+    """Streams `url` into FDA_IMPORT_DIR, reusing a complete earlier download."""
+    target = Path(config.FDA_IMPORT_DIR) / url.rsplit("/", 1)[-1]
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with client.stream("GET", url) as response:
+        response.raise_for_status()
+        size = int(response.headers.get("content-length", -1))
+        if target.exists() and target.stat().st_size == size:
+            return target
+        partial = target.with_name(target.name + ".part")
+        with open(partial, "wb") as f:
+            for chunk in response.iter_bytes(1 << 20):
+                f.write(chunk)
+    partial.replace(target)
+    logger.info("Downloaded openFDA archive", extra={"url": url, "bytes": target.stat().st_size})
+    return target
+
+# ===================================================================
+# ===== 2. STREAMING PARSE AND NORMALIZATION
+# ===================================================================
+
+def zip_members(path: Path) -> Iterator[Tuple[str, str, Iterator[dict]]]:
+    """
+    Yields (member name, fingerprint, records) for each JSON file in the zip.
+    `records` decompresses and parses lazily; the fingerprint (CRC and size)
+    tells a re-published file apart from the one a checkpoint refers to.
+    """
+    import ijson
+
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if not info.filename.endswith(".json"):
+                continue
+            with archive.open(info) as stream:
+                yield info.filename, f"{info.CRC:08x}-{info.file_size}", ijson.items(stream, "results.item")
+
+
+def _iso_date(value: Optional[str]) -> Optional[str]:
+    for fmt in ("%Y-%m-%d", "%Y%m%d"):
+        try:
+            return datetime.strptime(value or "", fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def to_row(record: dict) -> Optional[tuple]:
+    """One fda_recalls row, or None for records without a recall number."""
+    alert = SOURCES["FDA"].normalize(record)
+    if not alert["recall_number"]:
+        return None
+    return (
+        alert["recall_number"], alert["event_id"], alert["title"], alert["description"],
+        _iso_date(alert["date"]), _iso_date(record.get("report_date")), alert["severity"],
+        record.get("classification"), record.get("status"), record.get("recalling_firm"),
+        record.get("product_description"), alert["source_url"],
+    )
+
+# ===================================================================
+# ===== 3. BATCHED COPY + UPSERT
+# ===================================================================
+# COPY can't upsert, so each batch is copied into a session-local staging
+# table and merged from there in one statement. Rows whose content hasn't
+# changed are left alone, which keeps re-imports of the same dataset cheap.
+
+_STAGE_SQL = "CREATE TEMP TABLE IF NOT EXISTS fda_recalls_stage (LIKE fda_recalls INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+
+_COPY_SQL = f"COPY fda_recalls_stage ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+_UPDATED = [column for column in COLUMNS if column != "recall_number"]
+_MERGE_SQL = f"""
+    INSERT INTO fda_recalls ({', '.join(COLUMNS)})
+    SELECT {', '.join(COLUMNS)} FROM fda_recalls_stage
+    ON CONFLICT (recall_number) DO UPDATE
+    SET {', '.join(f'{column} = EXCLUDED.{column}' for column in _UPDATED)}, imported_at = now()
+    WHERE ({', '.join(f'fda_recalls.{column}' for column in _UPDATED)})
+        IS DISTINCT FROM ({', '.join(f'EXCLUDED.{column}' for column in _UPDATED)})
+"""
+
+_CHECKPOINT_SQL = """
+    INSERT INTO fda_import_checkpoints (member, fingerprint, records_done, completed_at)
+    VALUES (%s, %s, %s, CASE WHEN %s THEN now() END)
+    ON CONFLICT (member) DO UPDATE
+    SET fingerprint = EXCLUDED.fingerprint, records_done = EXCLUDED.records_done, completed_at = EXCLUDED.completed_at
+"""
+
+
+@dataclass
+class ImportStats:
+    member: str
+    resumed_from: int = 0  # records already imported by an interrupted run
+    records: int = 0       # records read and loaded by this run
+    written: int = 0       # rows inserted or changed
+    seconds: float = 0.0
+    skipped: bool = False  # file was already fully imported
+
+    def as_dict(self) -> dict:
+        return {
+            "member": self.member,
+            "resumed_from": self.resumed_from,
+            "records": self.records,
+            "written": self.written,
+            "seconds": round(self.seconds, 3),
+            "records_per_sec": round(self.records / self.seconds, 1) if self.seconds else 0.0,
+            "skipped": self.skipped,
+        }
+
+
+def _write_batch(conn, cur, rows: List[tuple], member: str, fingerprint: str, position: int, complete: bool) -> int:
+    """Loads one batch and advances the checkpoint in the same transaction."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cur.copy_expert(_COPY_SQL, buffer)
+    cur.execute(_MERGE_SQL)
+    written = cur.rowcount
+    cur.execute(_CHECKPOINT_SQL, (member, fingerprint, position, complete))
+    conn.commit()
+    return written
+
+
+def _import_member(conn, cur, member: str, fingerprint: str, records: Iterator[dict],
+                   batch_size: int, restart: bool) -> ImportStats:
+    stats = ImportStats(member)
+    cur.execute("SELECT fingerprint, records_done, completed_at FROM fda_import_checkpoints WHERE member = %s", (member,))
+    checkpoint = cur.fetchone()
+    if checkpoint and checkpoint[0] == fingerprint and not restart:
+        if checkpoint[2] is not None:
+            stats.skipped = True
+            logger.info("Already imported", extra={"member": member})
+            return stats
+        stats.resumed_from = checkpoint[1]
+
+    start = time.perf_counter()
+    batch = {}  # recall_number -> row; a later duplicate replaces an earlier one
+    position = 0
+    for record in records:
+        position += 1
+        # The compressed stream can't seek, so resuming re-parses the records
+        # already loaded, but doesn't write them again.
+        if position <= stats.resumed_from:
+            continue
+        row = to_row(record)
+        if row:
+            batch[row[0]] = row
+        if position % batch_size == 0:
+            stats.written += _write_batch(conn, cur, list(batch.values()), member, fingerprint, position, False)
+            batch.clear()
+            stats.records = position - stats.resumed_from
+            logger.info("Imported batch", extra={
+                "member": member, "records": position,
+                "records_per_sec": round(stats.records / (time.perf_counter() - start), 1),
+            })
+    stats.written += _write_batch(conn, cur, list(batch.values()), member, fingerprint, position, True)
+    stats.records = max(position - stats.resumed_from, 0)
+    stats.seconds = time.perf_counter() - start
+    logger.info("Imported file", extra=stats.as_dict())
+    return stats
+
+
+def import_archive(path: Path, batch_size: Optional[int] = None, restart: bool = False) -> List[ImportStats]:
+    """Imports every JSON file in the zip at `path`; returns per-file stats."""
+    batch_size = batch_size or config.FDA_IMPORT_BATCH_SIZE
+    # COPY needs the psycopg2 connection itself rather than a Session.
+    conn = database.engine.raw_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(_STAGE_SQL)
+        conn.commit()
+        return [
+            _import_member(conn, cur, member, fingerprint, records, batch_size, restart)
+            for member, fingerprint, records in zip_members(path)
+        ]
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# ===================================================================
+# ===== 4. READING THE LOCAL COPY
+# ===================================================================
+
+def complete_through(db: Session) -> Optional[date]:
+    """
+    Newest report date in fda_recalls when every file's last import ran to
+    the end; None when nothing was imported or an import was interrupted.
+    """
+    files, completed = db.execute(text("SELECT count(*), count(completed_at) FROM fda_import_checkpoints")).one()
+    if not files or files != completed:
+        return None
+    return db.execute(text("SELECT max(report_date) FROM fda_recalls")).scalar()
+
+
+def match_terms(db: Session, terms: Iterable[str]) -> Iterator[Tuple[str, dict]]:
+    """
+    (term, alert) for every imported recall matching any of `terms`, in one
+    pass over the table. Fields are matched the way the alerter matches the
+    live feed; alerts carry the fields trends.ingest needs.
+    """
+    matcher = WatchlistMatcher(terms)
+    if not matcher.terms:
+        return
+    # Only rows containing each term's longest token can match, so the
+    # database narrows the scan before the matcher checks whole phrases.
+    needles = {max(tokenize(term), key=len) for term in matcher.terms}
+    rows = db.query(
+        models.FdaRecall.recall_number, models.FdaRecall.event_id, models.FdaRecall.title,
+        models.FdaRecall.description, models.FdaRecall.product_description, models.FdaRecall.recall_date,
+        models.FdaRecall.severity, models.FdaRecall.source_url,
+    ).filter(or_(*(
+        column.ilike(f"%{needle}%")
+        for needle in sorted(needles)
+        for column in (models.FdaRecall.product_description, models.FdaRecall.description)
+    ))).execution_options(yield_per=5000)
+    for row in rows:
+        for term in matcher.match_fields((row.product_description, row.description)):
+            yield term, {
+                "title": row.title,
+                "description": row.description,
+                "date": row.recall_date.isoformat() if row.recall_date else "",
+                "source": "FDA",
+                "severity": row.severity,
+                "source_url": row.source_url,
+                "recall_number": row.recall_number,
+                "event_id": row.event_id,
+            }
+
+# ===================================================================
+# ===== 5. COMMAND LINE
+# ===================================================================
+
+def main():
+    from .logging_setup import setup_logging
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("archives", nargs="*", help="zip files or URLs; defaults to the openFDA download manifest")
+    parser.add_argument("--batch-size", type=int, default=config.FDA_IMPORT_BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true", help="ignore checkpoints and import from the start")
+    args = parser.parse_args()
+    setup_logging()
+
+    results = []
+    with httpx.Client(timeout=300.0, follow_redirects=True) as client:
+        for archive in args.archives or manifest_urls(client):
+            path = download(archive, client) if archive.startswith(("http://", "https://")) else Path(archive)
+            results.extend(import_archive(path, args.batch_size, args.restart))
+
+    records = sum(stats.records for stats in results)
+    seconds = sum(stats.seconds for stats in results)
+    print(json.dumps({
+        "files": [stats.as_dict() for stats in results],
+        "records": records,
+        "written": sum(stats.written for stats in results),
+        "seconds": round(seconds, 3),
+        "records_per_sec": round(records / seconds, 1) if seconds else 0.0,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import config, crud, database, schemas
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[int, str]  # (user_id, query_text)
+
+
+class SearchHistoryBuffer:
+    """
+    Write-behind buffer for search history.
+
+    record() only updates an in-memory map, so saving a search costs no DB
+    round trip on the request path. Repeats of the same (user, query) are
+    collapsed into a count + last_seen entry, and a background thread flushes
+    everything as one bulk upsert when `flush_size` keys are pending or every
+    `flush_interval` seconds. stop() drains whatever is left.
+
+    If the bulk upsert fails, the batch is written row by row so one bad row
+    (say, for a user deleted meanwhile) can't hold back the rest. Rows that
+    still fail are retried on later flushes and dropped after `max_attempts`.
+    """
+
+    def __init__(self, flush_size: int, flush_interval: float, max_attempts: int = 5):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Held around every commit of buffered rows and by readers taking a
+        # snapshot, so rows leave _flushing in the same step they become
+        # visible in the database. record() never waits on it.
+        self._commit_lock = threading.Lock()
+        self._pending: Dict[Key, List] = {}   # key -> [count, last_seen, failed attempts]
+        self._flushing: Dict[Key, List] = {}  # batch being written, still visible to reads
+        self._generation = 0                  # bumped by every commit of buffered rows
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def record(self, user_id: int, query_text: str) -> dict:
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            entry = self._pending.setdefault((user_id, query_text), [0, now, 0])
+            entry[0] += 1
+            entry[1] = now
+            if len(self._pending) >= self.flush_size:
+                self._wake.set()
+        return {"query_text": query_text, "owner_id": user_id, "created_at": now, "last_seen_at": now}
+
+    def _snapshot(self, user_id: int) -> Tuple[int, Dict[str, Tuple[int, datetime]]]:
+        merged = {}
+        with self._commit_lock, self._lock:
+            for source in (self._flushing, self._pending):
+                for (owner_id, query_text), (count, last_seen, _) in source.items():
+                    if owner_id == user_id:
+                        prev_count, _ = merged.get(query_text, (0, last_seen))
+                        merged[query_text] = (prev_count + count, last_seen)
+            return self._generation, merged
+
+    def pending_for(self, user_id: int) -> Dict[str, Tuple[int, datetime]]:
+        """Unflushed searches for one user: query_text -> (count, last_seen)."""
+        return self._snapshot(user_id)[1]
+
+    def read_searches(self, db: Session, user_id: int, skip: int = 0, limit: int = 50) -> List[schemas.Search]:
+        """
+        A page of the user's search history with unflushed searches overlaid.
+
+        A pending search moves its query to the top with its stored count
+        added in, so the page is cut only after merging: the first
+        skip + limit stored rows for other queries, plus every pending query
+        combined with its stored row, if it has one. That way each query
+        shows up once, on the page its newest search puts it on.
+
+        A flush that commits between taking the overlay and the queries would
+        count its rows twice, so the read is repeated if one did.
+        """
+        while True:
+            generation, pending = self._snapshot(user_id)
+            if pending:
+                rows = crud.get_searches_by_user(db, user_id=user_id, skip=0, limit=skip + limit, exclude=pending)
+                stored = {row.query_text: row for row in crud.get_searches_by_query(db, user_id, pending)}
+            else:
+                rows = crud.get_searches_by_user(db, user_id=user_id, skip=skip, limit=limit)
+            if self._generation == generation:
+                break
+        searches = [schemas.Search.model_validate(row) for row in rows]
+        if not pending:
+            return searches
+
+        for query_text, (count, last_seen) in pending.items():
+            row = stored.get(query_text)
+            if row is None:
+                searches.append(schemas.Search(query_text=query_text, owner_id=user_id, created_at=last_seen,
+                                               last_seen_at=last_seen, search_count=count))
+                continue
+            search = schemas.Search.model_validate(row)
+            search.search_count += count
+            search.last_seen_at = max(search.last_seen_at or last_seen, last_seen)
+            searches.append(search)
+        searches.sort(key=lambda s: s.last_seen_at or s.created_at, reverse=True)
+        return searches[skip:skip + limit]
+
+    @staticmethod
+    def _row(key: Key, entry: List) -> dict:
+        (user_id, query_text), (count, last_seen, _) = key, entry
+        return {"owner_id": user_id, "query_text": query_text, "search_count": count, "last_seen_at": last_seen}
+
+    def _commit(self, db: Session, keys: Iterable[Key]):
+        with self._commit_lock:
+            db.commit()
+            with self._lock:
+                for key in keys:
+                    self._flushing.pop(key, None)
+                self._generation += 1
+
+    def _give_back(self, key: Key, error: Exception):
+        """Returns a row that failed to the pending map, or drops it once it has failed max_attempts times."""
+        with self._lock:
+            count, last_seen, attempts = self._flushing.pop(key)
+            attempts += 1
+            if attempts >= self.max_attempts:
+                logger.error("Dropping search history row after repeated failures", extra={
+                    "owner_id": key[0], "query_text": key[1], "searches": count, "attempts": attempts, "error": str(error),
+                })
+                return
+            entry = self._pending.setdefault(key, [0, last_seen, 0])
+            entry[0] += count
+            entry[1] = max(entry[1], last_seen)
+            entry[2] = max(entry[2], attempts)
+
+    def flush(self) -> int:
+        """Writes out everything pending; returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._flushing, self._pending = self._pending, {}
+                batch = list(self._flushing.items())
+            db = database.SessionLocal()
+            try:
+                try:
+                    crud.upsert_user_searches(db, [self._row(key, entry) for key, entry in batch])
+                    self._commit(db, [key for key, _ in batch])
+                    return len(batch)
+                except Exception as e:
+                    db.rollback()
+                    logger.warning("Search history bulk flush failed; writing rows one by one", extra={"rows": len(batch), "error": str(e)})
+
+                written = 0
+                for key, entry in batch:
+                    try:
+                        crud.upsert_user_searches(db, [self._row(key, entry)])
+                        self._commit(db, [key])
+                        written += 1
+                    except Exception as e:
+                        db.rollback()
+                        self._give_back(key, e)
+                return written
+            finally:
+                db.close()
+                with self._lock:
+                    # Only non-empty if the writes above were interrupted: keep those rows.
+                    for key, (count, last_seen, attempts) in self._flushing.items():
+                        entry = self._pending.setdefault(key, [0, last_seen, attempts])
+                        entry[0] += count
+                        entry[1] = max(entry[1], last_seen)
+                    self._flushing = {}
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(timeout=self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="search-history-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops the flusher thread and writes out everything still pending."""
+        if self._thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+search_history = SearchHistoryBuffer(
+    flush_size=config.SEARCH_HISTORY_FLUSH_SIZE,
+    flush_interval=config.SEARCH_HISTORY_FLUSH_INTERVAL,
+    max_attempts=config.SEARCH_HISTORY_MAX_ATTEMPTS,
+)
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from typing import List, Optional
+
+import aiosmtplib
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from . import config, database, metrics, models
+
+logger = logging.getLogger(__name__)
+
+# ===================================================================
+# ===== 1. OUTBOX
+# ===================================================================
+
+def enqueue_emails(db: Session, emails: List[dict]):
+    """
+    Queues emails in the outbox in one statement. Each dict needs owner_id,
+    to_address, subject, body and dedupe_key; duplicates are skipped.
+    """
+    if not emails:
+        return
+    stmt = pg_insert(models.EmailOutbox.__table__).on_conflict_do_nothing(
+        constraint="uq_email_outbox_owner_dedupe",
+    )
+    db.execute(stmt, emails)
+    db.commit()
+
+
+def claim_due_emails(db: Session, limit: int) -> List[models.EmailOutbox]:
+    """
+    Marks up to `limit` due emails as 'sending' and returns them. SKIP LOCKED
+    lets several workers drain the outbox without sending anything twice;
+    next_attempt_at doubles as the claim time for release_stuck_emails.
+    """
+    ids = db.execute(text("""
+        UPDATE email_outbox SET status = 'sending', next_attempt_at = now()
+        WHERE id IN (
+            SELECT id FROM email_outbox
+            WHERE status = 'pending' AND next_attempt_at <= now()
+            ORDER BY next_attempt_at
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id
+    """), {"limit": limit}).scalars().all()
+    db.commit()
+    if not ids:
+        return []
+    return db.query(models.EmailOutbox).filter(models.EmailOutbox.id.in_(ids)).all()
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff: base, 2x base, 4x base ... capped at six hours."""
+    return timedelta(seconds=min(config.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), 6 * 3600))
+
+
+def release_stuck_emails(db: Session, older_than: timedelta = timedelta(minutes=30)):
+    """Returns emails left in 'sending' by a crashed worker to the queue."""
+    db.execute(text("""
+        UPDATE email_outbox SET status = 'pending'
+        WHERE status = 'sending' AND next_attempt_at < :cutoff
+    """), {"cutoff": datetime.now(timezone.utc) - older_than})
+    db.commit()
+
+# ===================================================================
+# ===== 2. SMTP CONNECTION
+# ===================================================================
+
+class SMTPSender:
+    """
+    Keeps one authenticated SMTP connection open across many messages, and
+    reconnects once if the server drops it. Sends are throttled to
+    `rate_per_second`.
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str], password: Optional[str],
+                 start_tls: bool, rate_per_second: float):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.min_interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._last_send = 0.0
+
+    async def connect(self):
+        self._smtp = aiosmtplib.SMTP(hostname=self.host, port=self.port, start_tls=self.start_tls, timeout=30)
+        await self._smtp.connect()
+        if self.username and self.password:
+            await self._smtp.login(self.username, self.password)
+
+    async def close(self):
+        if self._smtp is not None and self._smtp.is_connected:
+            try:
+                await self._smtp.quit()
+            except aiosmtplib.SMTPException:
+                self._smtp.close()
+        self._smtp = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def send(self, message: EmailMessage):
+        wait = self._last_send + self.min_interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._last_send = time.monotonic()
+        try:
+            await self._smtp.send_message(message)
+        except aiosmtplib.SMTPServerDisconnected:
+            await self.connect()
+            await self._smtp.send_message(message)
+
+
+def default_sender() -> SMTPSender:
+    return SMTPSender(
+        host=config.SMTP_HOST,
+        port=config.SMTP_PORT,
+        username=config.SMTP_USERNAME,
+        password=config.SMTP_PASSWORD,
+        start_tls=config.SMTP_STARTTLS,
+        rate_per_second=config.EMAIL_RATE_PER_SECOND,
+    )
+
+
+def build_message(email: models.EmailOutbox) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = config.EMAIL_FROM
+    message["To"] = email.to_address
+    message["Subject"] = email.subject
+    message.set_content(email.body)
+    return message
+
+# ===================================================================
+# ===== 3. DELIVERY
+# ===================================================================
+
+async def deliver_pending(db: Session, sender: SMTPSender, batch_size: int) -> dict:
+    """
+    Sends every due email, batch by batch, over a single SMTP session. The
+    session is only opened once a batch has been claimed, so an empty outbox
+    costs one query and no connection.
+    """
+    sent = failed = 0
+    batch = claim_due_emails(db, batch_size)
+    if not batch:
+        return {"sent": sent, "failed": failed}
+    try:
+        await sender.connect()
+    except (aiosmtplib.SMTPException, OSError):
+        # Nothing was sent: hand the batch straight back instead of leaving it
+        # to release_stuck_emails.
+        for email in batch:
+            email.status = "pending"
+        db.commit()
+        raise
+    try:
+        while batch:
+            for email in batch:
+                try:
+                    await sender.send(build_message(email))
+                except (aiosmtplib.SMTPException, OSError) as e:
+                    email.attempts += 1
+                    email.last_error = str(e)[:500]
+                    if email.attempts >= config.EMAIL_MAX_ATTEMPTS:
+                        email.status = "failed"
+                        failed += 1
+                    else:
+                        email.status = "pending"
+                        email.next_attempt_at = datetime.now(timezone.utc) + retry_delay(email.attempts)
+                    metrics.EMAILS.labels("error").inc()
+                    logger.warning("Email send failed", extra={"email_id": email.id, "attempts": email.attempts, "error": str(e)})
+                else:
+                    email.status = "sent"
+                    email.sent_at = datetime.now(timezone.utc)
+                    sent += 1
+                    metrics.EMAILS.labels("sent").inc()
+            db.commit()
+            batch = claim_due_emails(db, batch_size)
+    finally:
+        await sender.close()
+    return {"sent": sent, "failed": failed}
+
+
+def run_delivery():
+    """Scheduled job: drain the outbox."""
+    db = database.SessionLocal()
+    try:
+        release_stuck_emails(db)
+        try:
+            result = asyncio.run(deliver_pending(db, default_sender(), config.EMAIL_BATCH_SIZE))
+        except (aiosmtplib.SMTPException, OSError) as e:
+            # Could not even connect; the claimed batch is back in the queue for the next run.
+            logger.warning("SMTP unavailable, delivery skipped", extra={"error": str(e)})
+            return
+        if result["sent"] or result["failed"]:
+            logger.info("Email delivery finished", extra=result)
+    finally:
+        db.close()
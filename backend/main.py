@@ -1,39 +1,85 @@
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, date # !! IMPORTED 'date' !!
 from typing import List, Optional
-import asyncio 
+import asyncio
 import json
+import logging
 from pathlib import Path
 
-import httpx
-from fastapi import FastAPI, HTTPException, Query, Depends, status
+from fastapi import FastAPI, HTTPException, Query, Depends, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
-# Import for Web Scraping
-from bs4 import BeautifulSoup 
-
-from . import config, database, models, schemas, crud, auth
-from fastapi.responses import StreamingResponse
+from . import config, database, models, schemas, crud, auth, sources
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from io import BytesIO
-import google.generativeai as genai
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet
-from groq import Groq
-from apscheduler.schedulers.background import BackgroundScheduler
-from . import alerter
-
-
-models.Base.metadata.create_all(bind=database.engine)
+from . import alerter, caching, export, mailer, metrics, profiling, retention, tracing, trends
+from .compression import CompressionMiddleware
+from .history import search_history
+from .suggest import refresh_suggestions, suggestions
+from .logging_setup import setup_logging
+
+# Importing this module must stay cheap and side-effect free: no DB access,
+# no threads, no network clients. Heavy optional libraries (reportlab, groq,
+# apscheduler, bs4) are imported where they are first used, and everything
+# that starts work lives in lifespan() below. The schema is owned by alembic
+# ("alembic upgrade head"), not created here.
+logger = logging.getLogger(__name__)
+
+ALEMBIC_DIR = Path(__file__).resolve().parent.parent / "alembic"
+
+
+def expected_schema_revision() -> Optional[str]:
+    """The alembic head shipped with this build, or None if migrations aren't bundled."""
+    if not ALEMBIC_DIR.is_dir():
+        return None
+    from alembic.script import ScriptDirectory
+    return ScriptDirectory(str(ALEMBIC_DIR)).get_current_head()
+
+
+def start_scheduler():
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    logger.info("Initializing and starting background alerter")
+    scheduler = BackgroundScheduler()
+    scheduler.add_job(alerter.check_for_new_reports, 'interval', hours=24)
+    scheduler.add_job(retention.run_retention, 'interval', hours=24, next_run_time=datetime.now())
+    scheduler.add_job(refresh_suggestions, 'interval', minutes=config.SUGGEST_REFRESH_MINUTES, next_run_time=datetime.now())
+    scheduler.add_job(suggestions.compact, 'interval', minutes=1)
+    if config.EMAIL_ENABLED:
+        scheduler.add_job(mailer.run_delivery, 'interval', minutes=5)
+    scheduler.start()
+    return scheduler
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    tracing.setup_tracing()
+    metrics.instrument_engine(database.engine)
+    app.state.schema_revision = expected_schema_revision()
+    app.state.loop_monitor = asyncio.create_task(metrics.monitor_event_loop())
+    search_history.start()
+    scheduler = start_scheduler()
+    app.state.ready = True
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        scheduler.shutdown(wait=False)
+        search_history.stop()
+        trends.backfills.shutdown()
+        app.state.loop_monitor.cancel()
+        await sources.close_http_client()
 
 app = FastAPI(
     title="PharmaClear API",
     description="API for fetching pharmaceutical compliance data.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -42,7 +88,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=config.COMPRESSION_MIN_SIZE)
+# Registered last so it runs outermost: profiles include the span bookkeeping.
+app.middleware("http")(tracing.trace_request)
+app.middleware("http")(profiling.profile_request)
 
 # --- API Endpoints ---
 # (All your user, token, search history, and watchlist endpoints are unchanged)
@@ -69,29 +120,49 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.post("/api/searches/", response_model=schemas.Search)
+@app.post("/api/searches/", response_model=schemas.Search, status_code=status.HTTP_202_ACCEPTED)
 def create_search_for_user(
     search: schemas.SearchCreate,
-    db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    return crud.create_user_search(db=db, search=search, user_id=current_user.id)
+    """
+    Queues the search in the write-behind history buffer; it is persisted
+    with the next bulk flush but shows up in GET /api/searches/ immediately.
+    """
+    suggestions.bump(search.query_text)
+    return search_history.record(current_user.id, search.query_text)
 
 @app.get("/api/searches/", response_model=list[schemas.Search])
 def read_user_searches(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 50,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    searches = crud.get_searches_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
-    return searches
+    pending = search_history.pending_for(current_user.id)
+    # Unflushed searches aren't covered by the version counter yet, so they go into the ETag.
+    etag = caching.collection_etag(db, current_user.id, "searches", caching.digest(
+        f"{skip}:{limit}:" + ";".join(f"{q}:{count}:{seen.isoformat()}" for q, (count, seen) in sorted(pending.items()))
+    ))
+    if caching.etag_matches(request, etag):
+        return caching.not_modified(etag, caching.REVALIDATE)
+    caching.set_cache_headers(response, etag, caching.REVALIDATE)
+
+    return search_history.read_searches(db, current_user.id, skip, limit)
 
 @app.get("/api/watchlist/", response_model=list[schemas.WatchlistItem])
 def read_watchlist(
+    request: Request,
+    response: Response,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
+    etag = caching.collection_etag(db, current_user.id, "watchlist")
+    if caching.etag_matches(request, etag):
+        return caching.not_modified(etag, caching.REVALIDATE)
+    caching.set_cache_headers(response, etag, caching.REVALIDATE)
     return crud.get_watchlist_items_by_user(db=db, user_id=current_user.id)
 
 @app.post("/api/watchlist/", response_model=schemas.WatchlistItem)
@@ -104,10 +175,17 @@ def add_to_watchlist(
 
 @app.get("/api/notifications/", response_model=list[schemas.Notification])
 def read_notifications(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    return crud.get_notifications_by_user(db=db, user_id=current_user.id)
+    etag = caching.collection_etag(db, current_user.id, "notifications", str(limit))
+    if caching.etag_matches(request, etag):
+        return caching.not_modified(etag, caching.REVALIDATE)
+    caching.set_cache_headers(response, etag, caching.REVALIDATE)
+    return crud.get_notifications_by_user(db=db, user_id=current_user.id, limit=limit)
 
 @app.post("/api/notifications/read")
 def mark_all_as_read(
@@ -135,164 +213,98 @@ def health_check(db: Session = Depends(database.get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database connection failed: {e}")
 
-# ===================================================================
-# ===== 2. HEALTH CANADA WEB SCRAPING FUNCTION (Unchanged)
-# ===================================================================
-async def search_health_canada(q: str, client: httpx.AsyncClient) -> List[dict]:
+@app.get("/api/ready")
+def readiness_check(db: Session = Depends(database.get_db)):
     """
-    Searches Health Canada by SCRAPING the HTML results page.
-    This version uses the exact HTML tags you found by inspecting.
+    Readiness, as opposed to /api/health's liveness: startup has finished and
+    the database is reachable and migrated to the revision this build expects.
     """
-    print("\n" + "="*50)
-    print(f"--- [HEALTH CANADA] STARTING WEB SCRAPE FOR: {q} ---")
-    print("="*50)
-    
+    if not getattr(app.state, "ready", False):
+        raise HTTPException(status_code=503, detail="Starting up")
     try:
-        scrape_url = f"https://recalls-rappels.canada.ca/en/search/site?search_api_fulltext={q}"
-        
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36"
-        }
-        
-        print(f"[HEALTH CANADA] Scraping URL: {scrape_url}")
-        
-        response = await client.get(scrape_url, timeout=30.0, headers=headers, follow_redirects=True)
-        response.raise_for_status()
-        
-        print("[HEALTH CANADA] Page downloaded. Parsing HTML...")
-        
-        soup = BeautifulSoup(response.text, "lxml")
-        
-        search_results = soup.find_all("div", class_="views-row")
-        
-        print(f"[HEALTH CANADA] Found {len(search_results)} HTML blocks.")
-        
-        results = []
-        
-        for item in search_results:
-            try:
-                # 1. Find Title
-                title_span = item.find("span", class_="homepage-recent")
-                if not title_span:
-                    continue 
-                
-                title_tag = title_span.find("a")
-                if not title_tag:
-                    continue 
-                
-                title = title_tag.text.strip()
-                source_url = "https://recalls-rappels.canada.ca" + title_tag["href"]
-
-                # 2. Find Date
-                date_span = item.find("span", class_="ar-type")
-                if not date_span:
-                    continue 
-                
-                date_text_parts = date_span.text.split('|')
-                date = date_text_parts[-1].strip() if len(date_text_parts) > 1 else "Unknown Date"
-
-                # 3. Find Description
-                problem_tag = item.find("div", class_="field-name-field-problem")
-                description = problem_tag.find("p").text.strip() if problem_tag else "" # !! Set to "" instead of "No description"
-                
-                # 4. Guess Severity
-                severity = 'low'
-                if "Type I" in title:
-                    severity = 'high'
-                elif "Type II" in title:
-                    severity = 'medium'
-
-                alert = {
-                    'title': title,
-                    'description': description,
-                    'date': date,
-                    'source': 'Health Canada',
-                    'severity': severity,
-                    'source_url': source_url,
-                    'recall_number': "N/A (Scraped)",
-                    'event_id': "N/A (Scraped)"
-                }
-                results.append(alert)
-            
-            except Exception as e:
-                print(f"[HEALTH CANADA] Error parsing one item (skipping): {e}")
-        
-        print(f"[HEALTH CANADA] Finished scraping. Found {len(results)} health product matches.")
-        print("="*50 + "\n")
-        return results
-        
+        revision = db.execute(text("SELECT version_num FROM alembic_version")).scalar()
     except Exception as e:
-        print("\n" + "!"*50)
-        print(f"[HEALTH CANADA] !!! CRITICAL SCRAPING ERROR !!!")
-        print(f"[HEALTH CANADA] Error Type: {type(e)}")
-        print(f"[HEALTH CANADA] Error Details: {str(e)}")
-        print("!"*50 + "\n")
-        return []
-
-#3. FDA SEARCH FUNCTION
-async def search_fda(q: str, client: httpx.AsyncClient) -> List[dict]:
+        raise HTTPException(status_code=503, detail=f"Database not ready: {e}")
+    expected = app.state.schema_revision
+    if expected is not None and revision != expected:
+        raise HTTPException(status_code=503, detail=f"Database at revision {revision}, expected {expected}; run 'alembic upgrade head'")
+    return {"status": "ready", "schema_revision": revision}
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    metrics.refresh_resource_gauges(database.engine)
+    body, content_type = metrics.render_latest()
+    return Response(content=body, media_type=content_type)
+
+# ===================================================================
+# ===== 2. REGULATOR SOURCES (plugins live in sources.py)
+# ===================================================================
+@app.get("/api/sources")
+def list_sources(current_user: models.User = Depends(auth.get_current_user)):
     """
-    Searches the openFDA API for drug enforcement reports.
+    Lists the registered regulator sources with their latency and error stats.
     """
-    try:
-        start_str, end_str = get_date_range()
-        api_url = f"https://api.fda.gov/drug/enforcement.json?search=report_date:[{start_str}+TO+{end_str}]+AND+(product_description:{q}+OR+reason_for_recall:{q})&limit=100"
-        
-        response = await client.get(api_url)
-        response.raise_for_status()
-        data = response.json()
-
-        results = []
-        for recall in data.get('results', []):
-            event_id = recall.get('event_id')
-            recall_number = recall.get('recall_number')
-            
-            # FIXED: Correct URL format for FDA Enforcement Reports
-            # The FDA uses their new enforcement report system at cacmap.fda.gov
-            # You can link to either the event or search by recall number
-            if recall_number:
-                # Option 1: Search by recall number (most reliable)
-                source_url = f"https://cacmap.fda.gov/safety/recalls-market-withdrawals-safety-alerts/enforcement-reports?search={recall_number}"
-            elif event_id:
-                # Option 2: If no recall number, try event ID search
-                source_url = f"https://cacmap.fda.gov/safety/recalls-market-withdrawals-safety-alerts/enforcement-reports?event_id={event_id}"
-            else:
-                # Option 3: Fallback to general enforcement reports page
-                source_url = "https://cacmap.fda.gov/safety/recalls-market-withdrawals-safety-alerts/enforcement-reports"
-
-            # Date formatting
-            date_str = recall.get('recall_initiation_date', '')
-            formatted_date = date_str
-            if len(date_str) == 8:
-                try:
-                    formatted_date = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
-                except Exception:
-                    formatted_date = date_str
-
-            alert = {
-                'title': recall.get('product_description', 'No Title').split('.')[0],
-                'description': recall.get('reason_for_recall', ''),
-                'date': formatted_date,
-                'source': 'FDA',
-                'severity': get_severity(recall.get('classification', '')),
-                'source_url': source_url,
-                'recall_number': recall_number,
-                'event_id': event_id
-            }
-            results.append(alert)
-        return results
-
-    except httpx.HTTPStatusError as e:
-        print(f"[FDA API ERROR]: {e.response.text}")
-        return []
-    except Exception as e:
-        print(f"[FDA UNKNOWN ERROR]: {str(e)}")
-        return []
+    enabled = {source.name for source in sources.enabled_sources()}
+    return [
+        {
+            "name": source.name,
+            "enabled": source.name in enabled,
+            "timeout": source.timeout,
+            "cache_ttl": source.cache_ttl,
+            "rate_limit": source.rate_limit,
+            "stats": source.stats.as_dict(),
+        }
+        for source in sources.SOURCES.values()
+    ]
+
 # ===================================================================
 # ===== 4. MAIN SEARCH ENDPOINT (!! FILTERS ADDED !!)
 # ===================================================================
+def apply_filters(all_results: List[dict], date_filter: str = "all", source_filter: str = "all", severity_filter: str = "all") -> List[dict]:
+    """
+    Applies the dashboard's date/source/severity filters and sorts newest first.
+    """
+    # 1. Date Filter
+    if date_filter != "all":
+        today = date.today()
+        cutoff_date = None
+        if date_filter == "1y":
+            cutoff_date = today - timedelta(days=365)
+        elif date_filter == "3y":
+            cutoff_date = today - timedelta(days=365 * 3)
+        elif date_filter == "5y":
+            cutoff_date = today - timedelta(days=365 * 5)
+
+        if cutoff_date:
+            filtered_list = []
+            for alert in all_results:
+                try:
+                    # Convert "YYYY-MM-DD" string to a date object
+                    alert_date = datetime.strptime(alert.get('date', ''), "%Y-%m-%d").date()
+                    if alert_date >= cutoff_date:
+                        filtered_list.append(alert)
+                except (ValueError, TypeError):
+                    continue # Skip alerts with bad/missing dates
+            all_results = filtered_list
+
+    # 2. Source Filter
+    if source_filter != "all":
+        all_results = [a for a in all_results if a.get('source') == source_filter]
+
+    # 3. Severity Filter
+    if severity_filter != "all":
+        all_results = [a for a in all_results if a.get('severity') == severity_filter]
+
+    # Sort *after* filtering
+    all_results.sort(
+        key=lambda x: x.get('date', '1900-01-01'), 
+        reverse=True
+    )
+    return all_results
+
 @app.get("/api/search")
 async def search_drugs(
+    request: Request,
     q: str = Query(..., min_length=2, description="The search query for drugs or recalls."),
     # !! NEW FILTER PARAMETERS WITH DEFAULTS !!
     date_filter: str = "all",
@@ -301,75 +313,153 @@ async def search_drugs(
     current_user: models.User = Depends(auth.get_current_user)
 ):
     """
-    Searches FDA AND Health Canada, then applies filters.
+    Searches every enabled regulator source, then applies filters.
     """
     if not q:
         return {"results": [], "total": 0}
 
-    async with httpx.AsyncClient() as client:
-        try:
-            (fda_results, canada_results) = await asyncio.gather(
-                search_fda(q, client),
-                search_health_canada(q, client)
-            )
+    try:
+        with tracing.tracer.start_as_current_span("search.fan_out"):
+            all_results = await sources.search_all(q)
+        suggestions.add_recalls(all_results)
+
+        with tracing.tracer.start_as_current_span("search.filter_sort"), metrics.FILTER_SORT_SECONDS.time():
+            all_results = apply_filters(all_results, date_filter, source_filter, severity_filter)
+
+        # Upstream data has no version to check first, so the ETag is a hash
+        # of the body: a 304 saves the transfer, not the search.
+        response = JSONResponse({"results": all_results, "total": len(all_results)})
+        etag = caching.content_etag(response.body)
+        if caching.etag_matches(request, etag):
+            return caching.not_modified(etag, caching.SEARCH)
+        caching.set_cache_headers(response, etag, caching.SEARCH)
+        return response
 
-            all_results = fda_results + canada_results
-            
-            # --- !! START NEW FILTER LOGIC !! ---
-
-            # 1. Date Filter
-            if date_filter != "all":
-                today = date.today()
-                cutoff_date = None
-                if date_filter == "1y":
-                    cutoff_date = today - timedelta(days=365)
-                elif date_filter == "3y":
-                    cutoff_date = today - timedelta(days=365 * 3)
-                elif date_filter == "5y":
-                    cutoff_date = today - timedelta(days=365 * 5)
-                
-                if cutoff_date:
-                    filtered_list = []
-                    for alert in all_results:
-                        try:
-                            # Convert "YYYY-MM-DD" string to a date object
-                            alert_date = datetime.strptime(alert.get('date', ''), "%Y-%m-%d").date()
-                            if alert_date >= cutoff_date:
-                                filtered_list.append(alert)
-                        except (ValueError, TypeError):
-                            continue # Skip alerts with bad/missing dates
-                    all_results = filtered_list
-
-            # 2. Source Filter
-            if source_filter != "all":
-                all_results = [a for a in all_results if a.get('source') == source_filter]
-
-            # 3. Severity Filter
-            if severity_filter != "all":
-                all_results = [a for a in all_results if a.get('severity') == severity_filter]
-            
-            # --- !! END NEW FILTER LOGIC !! ---
-
-            # Sort *after* filtering
-            all_results.sort(
-                key=lambda x: x.get('date', '1900-01-01'), 
-                reverse=True
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An internal server error occurred: {str(e)}")
+
+@app.get("/api/suggest", response_model=list[schemas.Suggestion])
+async def suggest(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    fuzzy: bool = True,
+    email: str = Depends(auth.get_token_email)
+):
+    """
+    Typeahead for drug and ingredient names, cheap enough to call on every
+    keystroke: served from the in-memory suggestion index, and the token is
+    checked without a database round trip.
+    """
+    caching.set_cache_headers(response, None, caching.SUGGEST)
+    with metrics.SUGGEST_SECONDS.time():
+        return suggestions.suggest(q, limit, fuzzy)
+
+@app.get("/api/trends", response_model=schemas.TrendResponse)
+def recall_trends(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=2, description="Drug or ingredient to chart."),
+    months: int = Query(24, ge=1, le=240),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Recalls per month by source and severity, read from the precomputed
+    rollup; tracked terms are kept current by the alerter. A term that isn't
+    tracked yet has its full history backfilled in the background, and the
+    request answers 202 until that's done. If a source couldn't supply the
+    history it answers 503 for a while rather than charting a partial count.
+    """
+    if trends.untracked_terms(db, [q]):
+        if trends.backfills.request(q) is None:
+            raise HTTPException(
+                status_code=503, detail="Recall history is temporarily unavailable; try again later",
+                headers={"Retry-After": str(int(config.TREND_BACKFILL_RETRY_SECONDS))},
             )
+        return JSONResponse(
+            status_code=202, headers={"Retry-After": "5"},
+            content={"term": sources.normalize_query(q), "status": "backfilling"},
+        )
+    today = date.today()
+    month_index = today.year * 12 + today.month - months
+    since = date(month_index // 12, month_index % 12 + 1, 1)
+
+    # The rollup only changes when a term is ingested, so that timestamp stands in for the buckets.
+    etag = f'W/"trends-{caching.digest(f"{sources.normalize_query(q)}:{since}:{trends.last_ingested(db, q)}")}"'
+    if caching.etag_matches(request, etag):
+        return caching.not_modified(etag, caching.TRENDS)
+    caching.set_cache_headers(response, etag, caching.TRENDS)
+    buckets = trends.get_trend(db, q, since)
+    return {
+        "term": sources.normalize_query(q),
+        "since": since,
+        "total": sum(bucket.count for bucket in buckets),
+        "buckets": buckets,
+    }
+
+@app.get("/api/export")
+async def export_results(
+    request: Request,
+    q: List[str] = Query(..., description="Search query; repeat q= to export several searches at once."),
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    gzip: bool = False,
+    date_filter: str = "all",
+    source_filter: str = "all",
+    severity_filter: str = "all",
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Streams the filtered results of one or more searches as CSV, NDJSON or
+    Parquet, optionally gzipped. Queries are searched one after another and
+    written as they arrive, so memory stays flat however large the export.
+    """
+    queries = list(dict.fromkeys(query.strip() for query in q if len(query.strip()) >= 2))
+    if not queries:
+        raise HTTPException(status_code=400, detail="At least one query of 2+ characters is required")
+    if len(queries) > config.EXPORT_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {config.EXPORT_MAX_QUERIES} queries per export")
+    try:
+        encoder = export.make_encoder(format, gzip)
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed on the server")
+
+    async def stream():
+        rows_written = 0
+        with tracing.tracer.start_as_current_span("export.stream", attributes={"format": format, "queries": len(queries)}):
+            for query in queries:
+                results = await sources.search_all(query)
+                results = apply_filters(results, date_filter, source_filter, severity_filter)
+                chunk = encoder.write({**row, "query": query} for row in results)
+                rows_written += len(results)
+                if chunk:
+                    yield chunk
+            yield encoder.close()
+        metrics.EXPORT_ROWS.labels(format).inc(rows_written)
 
-            return {"results": all_results, "total": len(all_results)}
-
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"An internal server error occurred: {str(e)}")
+    return StreamingResponse(
+        stream(),
+        media_type="application/gzip" if gzip else export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{export.export_filename(format, gzip)}"'},
+    )
 
 # ===================================================================
 # ===== 5. ALL OTHER FUNCTIONS (Unchanged)
 # ===================================================================
-groq_client = Groq(api_key=config.GROQ_API_KEY)
+_groq_client = None
+
+def get_groq_client():
+    """Created on first use so importing the app doesn't pay for the groq SDK."""
+    global _groq_client
+    if _groq_client is None:
+        from groq import Groq
+        _groq_client = Groq(api_key=config.GROQ_API_KEY)
+    return _groq_client
 
 def generate_summary_with_groq(query: str, alerts: list[schemas.AlertItem]):
     alert_details = "\n".join([
         # !! Use title as description, since description is hidden !!
-        f"- Date: {a.date}, Severity: {a.severity.upper()}, Title: {a.title[:200]}..."
+        f"- Date: {a.date}, Severity: {a.severity.upper()}, Title: {(a.title or a.description)[:200]}..."
         for a in alerts
     ])
 
@@ -385,21 +475,78 @@ def generate_summary_with_groq(query: str, alerts: list[schemas.AlertItem]):
     """
 
     try:
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama-3.1-8b-instant",
-        )
+        with tracing.tracer.start_as_current_span("report.llm_summary"), \
+                metrics.LLM_CALL_SECONDS.labels("summary").time():
+            chat_completion = get_groq_client().chat.completions.create(
+                messages=[
+                    {
+                        "role": "user",
+                        "content": prompt,
+                    }
+                ],
+                model="llama-3.1-8b-instant",
+            )
         return chat_completion.choices[0].message.content
     except Exception as e:
-        print(f"Groq API error: {e}")
+        logger.warning("Groq summary call failed", extra={"error": str(e)})
         return "Summary could not be generated due to an API error."
 
+def render_report_pdf(query: str, summary: str, email: str, alerts: list[schemas.AlertItem]) -> BytesIO:
+    """
+    Builds the PDF compliance report in memory. Split out of generate_report so
+    the render cost can be measured on its own (see benchmarks/).
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+    with tracing.tracer.start_as_current_span("report.render_pdf", attributes={"alerts": len(alerts)}), \
+            metrics.PDF_RENDER_SECONDS.time():
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter)
+        styles = getSampleStyleSheet()
+        story = []
+
+        story.append(Paragraph(f"Compliance Report: {query}", styles['h1']))
+        story.append(Spacer(1, 12))
+        story.append(Paragraph(f"Generated for: {email}", styles['Normal']))
+        story.append(Paragraph(f"Date: {datetime.now().strftime('%Y-%m-%d')}", styles['Normal']))
+        story.append(Spacer(1, 24))
+
+        story.append(Paragraph("Executive Summary", styles['h2']))
+        story.append(Paragraph(summary, styles['BodyText']))
+        story.append(Spacer(1, 24))
+
+        story.append(Paragraph("Detailed Alerts", styles['h2']))
+        # !! Use Title instead of Description in report !!
+        table_data = [['Date', 'Severity', 'Title']]
+        for alert in alerts:
+            table_data.append([
+                alert.date,
+                alert.severity.upper(),
+                Paragraph(alert.title or alert.description, styles['BodyText']) # !! Changed from description
+            ])
+
+        table = Table(table_data, colWidths=[70, 70, 340])
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        story.append(table)
+
+        doc.build(story)
+        buffer.seek(0)
+        return buffer
+
 @app.post("/api/report")
+@profiling.profile_worker_thread
 def generate_report(
     report_data: schemas.ReportRequest,
     current_user: models.User = Depends(auth.get_current_user)
@@ -408,49 +555,7 @@ def generate_report(
     alerts = report_data.alerts
 
     summary = generate_summary_with_groq(query, alerts)
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    story = []
-
-    
-    story.append(Paragraph(f"Compliance Report: {query}", styles['h1']))
-    story.append(Spacer(1, 12))
-    story.append(Paragraph(f"Generated for: {current_user.email}", styles['Normal']))
-    story.append(Paragraph(f"Date: {datetime.now().strftime('%Y-%m-%d')}", styles['Normal']))
-    story.append(Spacer(1, 24))
-
-    story.append(Paragraph("Executive Summary", styles['h2']))
-    story.append(Paragraph(summary, styles['BodyText']))
-    story.append(Spacer(1, 24))
-
-    
-    story.append(Paragraph("Detailed Alerts", styles['h2']))
-    # !! Use Title instead of Description in report !!
-    table_data = [['Date', 'Severity', 'Title']]
-    for alert in alerts:
-        table_data.append([
-            alert.date,
-            alert.severity.upper(),
-            Paragraph(alert.title, styles['BodyText']) # !! Changed from description
-        ])
-
-    table = Table(table_data, colWidths=[70, 70, 340])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    story.append(table)
-
-    doc.build(story)
-    buffer.seek(0)
+    buffer = render_report_pdf(query, summary, current_user.email, alerts)
 
     return StreamingResponse(
         buffer,
@@ -460,6 +565,7 @@ def generate_report(
 
 
 @app.post("/api/chat", response_model=schemas.ChatResponse)
+@profiling.profile_worker_thread
 def chat_with_results(
     chat_request: schemas.ChatRequest,
     current_user: models.User = Depends(auth.get_current_user)
@@ -472,7 +578,7 @@ def chat_with_results(
 
     # !! Use Title as context, since description is hidden/empty !!
     context = "\n\n".join([
-        f"Document Title: {a.title}\nContent: {a.title}"
+        f"Document Title: {a.title or a.description}\nContent: {a.title or a.description}"
         for a in alerts
     ])
 
@@ -494,39 +600,19 @@ def chat_with_results(
     """
 
     try:
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama-3.1-8b-instant",
-        )
+        with tracing.tracer.start_as_current_span("chat.llm_answer", attributes={"context_alerts": len(alerts)}), \
+                metrics.LLM_CALL_SECONDS.labels("chat").time():
+            chat_completion = get_groq_client().chat.completions.create(
+                messages=[
+                    {
+                        "role": "user",
+                        "content": prompt,
+                    }
+                ],
+                model="llama-3.1-8b-instant",
+            )
         answer = chat_completion.choices[0].message.content
         return schemas.ChatResponse(answer=answer)
     except Exception as e:
-        print(f"Groq RAG error: {e}")
+        logger.warning("Groq RAG call failed", extra={"error": str(e)})
         raise HTTPException(status_code=500, detail="Failed to get an answer from the AI.")
-    
-
-def get_date_range():
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=180) # Keeping the 180-day range for FDA
-    start_str = start_date.strftime('%Y%m%d')
-    end_str = end_date.strftime('%Y%m%d')
-    return start_str, end_str
-
-def get_severity(classification: str = '') -> str:
-    if not classification:
-        return 'low'
-    if classification=="Class I":
-        return 'high'
-    elif classification=="Class II":
-        return 'medium'
-    return 'low'
-
-print("--- SCHEDULER: Initializing and starting background alerter... ---") 
-scheduler = BackgroundScheduler()
-scheduler.add_job(alerter.check_for_new_reports, 'interval', hours=24)
-scheduler.start()
\ No newline at end of file
@@ -0,0 +1,47 @@
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class WatchlistMatcher:
+    """
+    Matches many watchlist terms against a document in one pass.
+
+    Terms are tokenized like openFDA's analyzer (lowercase alphanumeric runs)
+    and indexed by their first token. Scanning a document checks, at each
+    token, only the terms that start with it, so the cost is proportional to
+    the document length rather than to the number of terms.
+    A term matches when its tokens appear consecutively in the document.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self._index: Dict[str, List[Tuple[str, Tuple[str, ...]]]] = defaultdict(list)
+        self.terms: Set[str] = set()
+        for term in terms:
+            tokens = tuple(tokenize(term))
+            if tokens and term not in self.terms:
+                self.terms.add(term)
+                self._index[tokens[0]].append((term, tokens))
+
+    def match_fields(self, fields: Iterable[str]) -> Set[str]:
+        """Matches each field on its own, so no phrase spans two fields."""
+        hits = set()
+        for text in fields:
+            if text:
+                hits |= self.match(text)
+        return hits
+
+    def match(self, text: str) -> Set[str]:
+        tokens = tokenize(text)
+        hits = set()
+        for i, token in enumerate(tokens):
+            for term, term_tokens in self._index.get(token, ()):
+                if len(term_tokens) == 1 or tuple(tokens[i:i + len(term_tokens)]) == term_tokens:
+                    hits.add(term)
+        return hits
@@ -0,0 +1,157 @@
+import asyncio
+import time
+
+import anyio.to_thread
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+
+# ===================================================================
+# ===== STAGE LATENCY HISTOGRAMS
+# ===================================================================
+UPSTREAM_FETCH_SECONDS = Histogram(
+    "pharmaclear_upstream_fetch_seconds",
+    "Time spent waiting on an upstream regulator source.",
+    ["source"],
+)
+PARSE_SECONDS = Histogram(
+    "pharmaclear_parse_seconds",
+    "Time spent parsing and normalizing an upstream payload (HTML or JSON).",
+    ["source"],
+)
+FILTER_SORT_SECONDS = Histogram(
+    "pharmaclear_filter_sort_seconds",
+    "Time spent filtering and sorting merged search results.",
+)
+DB_QUERY_SECONDS = Histogram(
+    "pharmaclear_db_query_seconds",
+    "Time spent executing a database statement.",
+    ["statement"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+LLM_CALL_SECONDS = Histogram(
+    "pharmaclear_llm_call_seconds",
+    "Time spent waiting on the LLM provider.",
+    ["operation"],
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0),
+)
+PDF_RENDER_SECONDS = Histogram(
+    "pharmaclear_pdf_render_seconds",
+    "Time spent building a PDF compliance report.",
+)
+SUGGEST_SECONDS = Histogram(
+    "pharmaclear_suggest_seconds",
+    "Time spent answering a typeahead lookup.",
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01),
+)
+
+# ===================================================================
+# ===== COUNTERS
+# ===================================================================
+CACHE_HITS = Counter(
+    "pharmaclear_cache_hits_total",
+    "Searches answered from a source's result cache.",
+    ["source"],
+)
+SEARCH_COALESCED = Counter(
+    "pharmaclear_search_coalesced_total",
+    "Searches that joined an identical in-flight upstream request instead of issuing their own.",
+    ["source"],
+)
+UPSTREAM_ERRORS = Counter(
+    "pharmaclear_upstream_errors_total",
+    "Failed upstream searches (HTTP errors, timeouts, parse failures).",
+    ["source"],
+)
+ALERTER_NOTIFICATIONS = Counter(
+    "pharmaclear_alerter_notifications_total",
+    "Notifications created by the background alerter.",
+)
+EXPORT_ROWS = Counter(
+    "pharmaclear_export_rows_total",
+    "Rows streamed by /api/export, by format.",
+    ["format"],
+)
+EMAILS = Counter(
+    "pharmaclear_emails_total",
+    "Outbox email delivery attempts by outcome.",
+    ["outcome"],
+)
+
+# ===================================================================
+# ===== RESOURCE GAUGES (refreshed on scrape, used by the load tests)
+# ===================================================================
+THREADPOOL_IN_USE = Gauge(
+    "pharmaclear_threadpool_in_use",
+    "Worker threads busy running sync endpoints and dependencies.",
+)
+THREADPOOL_CAPACITY = Gauge(
+    "pharmaclear_threadpool_capacity",
+    "Size of the AnyIO default thread limiter.",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "pharmaclear_db_pool_checked_out",
+    "Database connections currently checked out of the pool.",
+)
+DB_POOL_CAPACITY = Gauge(
+    "pharmaclear_db_pool_capacity",
+    "Pool size plus max overflow.",
+)
+EVENT_LOOP_LAG = Gauge(
+    "pharmaclear_event_loop_lag_seconds",
+    "Worst scheduling delay of the event loop since the last scrape.",
+)
+
+_max_loop_lag = 0.0
+
+
+async def monitor_event_loop(interval: float = 0.1):
+    """Background task: measures how late the loop wakes a sleeping coroutine."""
+    global _max_loop_lag
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        _max_loop_lag = max(_max_loop_lag, loop.time() - start - interval)
+
+
+def refresh_resource_gauges(engine):
+    """Must be called from the event loop (reads the AnyIO thread limiter)."""
+    global _max_loop_lag
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    THREADPOOL_IN_USE.set(limiter.borrowed_tokens)
+    THREADPOOL_CAPACITY.set(limiter.total_tokens)
+    DB_POOL_CHECKED_OUT.set(engine.pool.checkedout())
+    DB_POOL_CAPACITY.set(engine.pool.size() + engine.pool._max_overflow)
+    EVENT_LOOP_LAG.set(_max_loop_lag)
+    _max_loop_lag = 0.0
+
+
+# The start time lives on the statement's execution context, which is
+# discarded with the statement, so one that fails before after_cursor_execute
+# leaves nothing behind on the pooled connection.
+
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._pharmaclear_query_start = time.perf_counter()
+
+
+def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_pharmaclear_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    verb = statement.lstrip().split(" ", 1)[0].upper() or "OTHER"
+    DB_QUERY_SECONDS.labels(verb).observe(elapsed)
+
+
+def instrument_engine(engine):
+    """Records every statement run on `engine` in DB_QUERY_SECONDS. Safe to call twice."""
+    if event.contains(engine, "before_cursor_execute", _start_timer):
+        return
+    event.listen(engine, "before_cursor_execute", _start_timer)
+    event.listen(engine, "after_cursor_execute", _stop_timer)
+
+
+def render_latest():
+    """Returns (body, content_type) in the Prometheus text exposition format."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import BigInteger, Column, Integer, String, Text, Date, DateTime, ForeignKey, Boolean, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -13,12 +13,17 @@ class User(Base):
     searches = relationship("Search", back_populates="owner")
     watchlist_items = relationship("WatchlistItem", back_populates="owner")
     notifications = relationship("Notification", back_populates="owner")
+    emails = relationship("EmailOutbox", back_populates="owner")
 
 class Search(Base):
     __tablename__ = "searches"
+    # One row per (user, query); repeats bump search_count and last_seen_at.
+    __table_args__ = (UniqueConstraint("owner_id", "query_text", name="uq_searches_owner_query"),)
     id = Column(Integer, primary_key=True, index=True)
     query_text = Column(String, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    search_count = Column(Integer, nullable=False, default=1, server_default="1")
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="searches")
 
@@ -32,9 +37,101 @@ class WatchlistItem(Base):
 
 class Notification(Base):
     __tablename__ = "notifications"
-    id = Column(Integer, primary_key=True, index=True)
+    # Range-partitioned by month on created_at (see retention.py), so the
+    # partition key is part of the primary key.
+    __table_args__ = (
+        Index("ix_notifications_owner_created", "owner_id", text("created_at DESC")),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     message = Column(String, nullable=False)
     is_read = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
+    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner = relationship("User", back_populates="notifications")
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    # Emails are queued here and delivered by mailer.py; dedupe_key (e.g. the
+    # digest date) keeps a re-run from queueing the same email twice.
+    __table_args__ = (
+        UniqueConstraint("owner_id", "dedupe_key", name="uq_email_outbox_owner_dedupe"),
+        Index("ix_email_outbox_due", "status", "next_attempt_at"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    to_address = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    dedupe_key = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending", server_default="pending")  # pending | sending | sent | failed
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(String)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True))
     owner_id = Column(Integer, ForeignKey("users.id"))
-    owner = relationship("User", back_populates="notifications")
\ No newline at end of file
+    owner = relationship("User", back_populates="emails")
+
+# --- Recall trend rollups (see trends.py) ---
+
+class TrendTerm(Base):
+    __tablename__ = "trend_terms"
+    # Terms whose recalls are rolled up; backfilled once, then kept current by the alerter.
+    term = Column(String, primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_ingested_at = Column(DateTime(timezone=True))
+
+class TrendSeenRecall(Base):
+    __tablename__ = "trend_seen_recalls"
+    # Every (term, recall) already counted, so re-ingesting a recall is a no-op.
+    term = Column(String, primary_key=True)
+    source = Column(String, primary_key=True)
+    recall_key = Column(String, primary_key=True)
+    month = Column(Date, nullable=False)
+    severity = Column(String, nullable=False)
+
+class TrendCount(Base):
+    __tablename__ = "trend_counts"
+    # One row per bucket; a trend query reads buckets, never recalls.
+    term = Column(String, primary_key=True)
+    month = Column(Date, primary_key=True)
+    source = Column(String, primary_key=True)
+    severity = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+
+class CollectionVersion(Base):
+    __tablename__ = "collection_versions"
+    # Bumped by triggers whenever a user's searches, watchlist or notifications
+    # change; ETags are built from it (see caching.py).
+    owner_id = Column(Integer, primary_key=True)
+    collection = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=1, server_default="1")
+
+class FdaRecall(Base):
+    __tablename__ = "fda_recalls"
+    # Local copy of openFDA's drug enforcement dataset, loaded from the bulk
+    # download by `python -m backend.fda_import`; columns follow FDASource.normalize.
+    recall_number = Column(String, primary_key=True)
+    event_id = Column(String)
+    title = Column(String)
+    description = Column(String)
+    recall_date = Column(Date, index=True)
+    report_date = Column(Date)
+    severity = Column(String)
+    classification = Column(String)
+    status = Column(String)
+    recalling_firm = Column(String)
+    product_description = Column(String)
+    source_url = Column(String)
+    imported_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class FdaImportCheckpoint(Base):
+    __tablename__ = "fda_import_checkpoints"
+    # How far the importer got into each file of the bulk download. Written in
+    # the same transaction as every batch, so an interrupted import resumes
+    # exactly where its last committed batch ended.
+    member = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)
+    records_done = Column(BigInteger, nullable=False, default=0, server_default="0")
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    completed_at = Column(DateTime(timezone=True))
@@ -0,0 +1,106 @@
+import functools
+import logging
+import re
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse
+from jose import JWTError, jwt
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+
+# Set by profile_request for a profiled request: sessions recorded in worker
+# threads are appended here and merged into the request's report. Context
+# variables follow the request into the threadpool, so the endpoint sees it.
+_worker_sessions: ContextVar[Optional[List]] = ContextVar("profile_worker_sessions", default=None)
+
+
+def _admin_email(request: Request) -> Optional[str]:
+    """Returns the caller's email if the bearer token belongs to an admin."""
+    authorization = request.headers.get("Authorization", "")
+    if not authorization.startswith("Bearer "):
+        return None
+    try:
+        payload = jwt.decode(authorization[7:], config.SECRET_KEY, algorithms=[config.ALGORITHM])
+    except JWTError:
+        return None
+    email = payload.get("sub")
+    return email if email in config.ADMIN_EMAILS else None
+
+
+def profile_worker_thread(endpoint):
+    """
+    Decorator for sync (`def`) endpoints. FastAPI runs those in the
+    threadpool, where the request's event-loop profiler can't see them; under
+    X-Profile this samples the worker thread too, and its frames appear in
+    the request's report next to the event loop's.
+    """
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        sessions = _worker_sessions.get()
+        if sessions is None:
+            return endpoint(*args, **kwargs)
+
+        from pyinstrument import Profiler
+
+        profiler = Profiler(interval=config.PROFILE_INTERVAL, async_mode="disabled")
+        profiler.start()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profiler.stop()
+            sessions.append(profiler.last_session)
+
+    return wrapper
+
+
+async def profile_request(request: Request, call_next):
+    """
+    HTTP middleware: when an admin sends `X-Profile: store` the request runs
+    under a pyinstrument sampling profiler and the HTML flamegraph is written
+    to PROFILE_DIR (its filename is returned in `X-Profile-Report`).
+    `X-Profile: html` returns the flamegraph instead of the normal response.
+
+    The profiler samples the event loop. Sync endpoints decorated with
+    profile_worker_thread add a profile of their worker thread, so the
+    report shows the endpoint's own frames rather than the loop awaiting it.
+    """
+    mode = request.headers.get(PROFILE_HEADER)
+    if not mode or _admin_email(request) is None:
+        return await call_next(request)
+
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import HTMLRenderer
+    from pyinstrument.session import Session
+
+    sessions = []
+    token = _worker_sessions.set(sessions)
+    profiler = Profiler(interval=config.PROFILE_INTERVAL, async_mode="enabled")
+    profiler.start()
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.stop()
+        _worker_sessions.reset(token)
+
+    session = functools.reduce(Session.combine, sessions, profiler.last_session)
+    html = HTMLRenderer().render(session)
+    if mode == "html":
+        return HTMLResponse(html)
+
+    profile_dir = Path(config.PROFILE_DIR)
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", request.url.path).strip("-")
+    filename = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{slug}.html"
+    (profile_dir / filename).write_text(html)
+    logger.info("Stored request profile", extra={"path": request.url.path, "file": filename})
+
+    response.headers["X-Profile-Report"] = filename
+    return response
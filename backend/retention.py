@@ -0,0 +1,125 @@
+import logging
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import config, database
+
+logger = logging.getLogger(__name__)
+
+# Matches the names created by the partitioning migration: notifications_y2025m09
+PARTITION_PREFIX = "notifications_y"
+DEFAULT_PARTITION = "notifications_default"
+
+
+def _month_start(d: date, offset: int = 0) -> date:
+    month_index = d.year * 12 + d.month - 1 + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month.year:04d}m{month.month:02d}"
+
+
+def ensure_partition(db: Session, month: date):
+    """
+    Creates the partition for `month` if it doesn't exist. Rows for that month
+    that landed in the default partition meanwhile (after a gap in the
+    schedule) would make CREATE ... PARTITION OF fail, so when there are any
+    they are moved into a standalone table first, which is then attached.
+    """
+    name = _partition_name(month)
+    if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return
+    bounds = {"start": month, "end": _month_start(month, 1)}
+    bound_sql = f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+
+    # Keeps inserts from routing new rows for the month to the default partition mid-move.
+    db.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE"))
+    stranded = db.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end)"
+    ), bounds).scalar()
+    if not stranded:
+        db.execute(text(f'CREATE TABLE "{name}" PARTITION OF notifications {bound_sql}'))
+    else:
+        db.execute(text(f'CREATE TABLE "{name}" (LIKE notifications INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+        moved = db.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end RETURNING *
+            )
+            INSERT INTO "{name}" SELECT * FROM moved
+        """), bounds).rowcount
+        db.execute(text(f'ALTER TABLE notifications ATTACH PARTITION "{name}" {bound_sql}'))
+        logger.info("Moved notifications out of the default partition", extra={"partition": name, "rows": moved})
+    db.commit()
+
+
+def ensure_partitions(db: Session, months_ahead: int = 2):
+    """Creates monthly partitions from the current month through `months_ahead`."""
+    today = date.today()
+    for offset in range(months_ahead + 1):
+        ensure_partition(db, _month_start(today, offset))
+
+
+def drop_expired_partitions(db: Session, keep_months: int) -> list[str]:
+    """
+    Drops whole monthly partitions older than `keep_months`. Dropping a
+    partition is a metadata operation, far cheaper than deleting its rows.
+    """
+    cutoff = _month_start(date.today(), -keep_months)
+    partitions = db.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'notifications' AND child.relname LIKE :prefix
+    """), {"prefix": PARTITION_PREFIX + "%"}).scalars().all()
+
+    dropped = []
+    for name in partitions:
+        month = date(int(name[len(PARTITION_PREFIX):][:4]), int(name[-2:]), 1)
+        if month < cutoff:
+            db.execute(text(f'DROP TABLE "{name}"'))
+            dropped.append(name)
+    if dropped:
+        # DROP TABLE fires no row triggers; invalidate notification ETags by hand.
+        db.execute(text("UPDATE collection_versions SET version = version + 1 WHERE collection = 'notifications'"))
+    db.commit()
+    return dropped
+
+
+def purge_read_notifications(db: Session, older_than_days: int, batch_size: int) -> int:
+    """
+    Deletes read notifications older than the cutoff in small batches, each in
+    its own transaction, so the purge never holds long locks.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    total = 0
+    while True:
+        deleted = db.execute(text("""
+            DELETE FROM notifications
+            WHERE (id, created_at) IN (
+                SELECT id, created_at FROM notifications
+                WHERE is_read AND created_at < :cutoff
+                LIMIT :batch_size
+            )
+        """), {"cutoff": cutoff, "batch_size": batch_size}).rowcount
+        db.commit()
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+def run_retention():
+    """Scheduled job: keep partitions ahead of time and enforce the retention policy."""
+    db = database.SessionLocal()
+    try:
+        ensure_partitions(db)
+        purged = purge_read_notifications(
+            db, config.NOTIFICATION_READ_RETENTION_DAYS, config.NOTIFICATION_PURGE_BATCH_SIZE,
+        )
+        dropped = drop_expired_partitions(db, config.NOTIFICATION_PARTITION_RETENTION_MONTHS)
+        logger.info("Notification retention finished", extra={"purged": purged, "dropped_partitions": dropped})
+    finally:
+        db.close()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
 class UserBase(BaseModel):
@@ -25,9 +25,11 @@ class NotificationBase(BaseModel):
     is_read: bool
 
 class Search(SearchBase):
-    id: int
+    id: Optional[int] = None  # None until the write-behind buffer flushes it
     created_at: datetime
     owner_id: int
+    search_count: int = 1
+    last_seen_at: Optional[datetime] = None
     class Config:
         from_attributes = True
 
@@ -64,6 +66,27 @@ class AlertItem(BaseModel):
     date: str
     severity: str
     description: str
+    title: str = ""
+
+class Suggestion(BaseModel):
+    text: str
+    score: float
+    fuzzy: bool = False
+
+class TrendBucket(BaseModel):
+    month: date
+    source: str
+    severity: str
+    count: int
+
+    class Config:
+        from_attributes = True
+
+class TrendResponse(BaseModel):
+    term: str
+    since: date
+    total: int
+    buckets: list[TrendBucket]
 
 class ReportRequest(BaseModel):
     query: str
@@ -0,0 +1,583 @@
+import asyncio
+import contextlib
+import logging
+import re
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from opentelemetry import trace
+from opentelemetry.trace import Status, StatusCode
+
+from . import config, metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+# ===================================================================
+# ===== 1. SOURCE PLUGIN INTERFACE
+# ===================================================================
+
+@dataclass
+class SourceStats:
+    """Per-source counters, updated by RegulatorSource.search."""
+    calls: int = 0
+    errors: int = 0
+    cache_hits: int = 0
+    coalesced: int = 0
+    total_latency: float = 0.0
+    last_latency: float = 0.0
+
+    def as_dict(self) -> dict:
+        avg = self.total_latency / self.calls if self.calls else 0.0
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "avg_latency_ms": round(avg * 1000, 2),
+            "last_latency_ms": round(self.last_latency * 1000, 2),
+        }
+
+
+class RegulatorSource:
+    """
+    Base class for a regulator data source.
+
+    A plugin implements fetch (network), parse (raw payload -> records) and
+    normalize (record -> alert dict). Caching, rate limiting, timeouts and
+    per-source stats are handled here by search().
+    """
+    name: str = ""
+    timeout: float = 30.0       # seconds per upstream request
+    cache_ttl: float = 300.0    # seconds a result set is reused
+    rate_limit: float = 4.0     # max upstream requests per second
+
+    def __init__(self):
+        self.stats = SourceStats()
+        self._cache: Dict[tuple, tuple] = {}
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self._rate_lock = threading.Lock()
+        self._next_slot = 0.0
+
+    async def fetch(self, q: str, client: httpx.AsyncClient, since: Optional[str] = None) -> Any:
+        raise NotImplementedError
+
+    def parse(self, raw: Any) -> List[Any]:
+        raise NotImplementedError
+
+    def normalize(self, record: Any) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def fetch_feed(self, client: httpx.AsyncClient, since: str) -> Optional[List[Tuple[Tuple[str, ...], dict]]]:
+        """
+        Optional: every record published since `since` (YYYYMMDD), as
+        (fields to match watchlist terms against, normalized alert) pairs.
+        Sources without a feed return None and are searched term by term, and
+        so must a feed that could not be read completely.
+        """
+        return None
+
+    async def fetch_history(self, q: str, client: httpx.AsyncClient, since: Optional[str] = None) -> Optional[List[dict]]:
+        """
+        Optional: every record matching `q` over the source's whole history
+        (or from `since`, YYYYMMDD), paging as far as needed. Used to backfill
+        trend rollups, so it returns None rather than a partial history when
+        any page fails or the source can't go back that far.
+        """
+        return None
+
+    def _history_failed(self, q: str, error: str) -> None:
+        self.stats.errors += 1
+        metrics.UPSTREAM_ERRORS.labels(self.name).inc()
+        logger.warning("History fetch failed", extra={"source": self.name, "query": q, "error": error})
+        return None
+
+    async def _wait_for_slot(self, max_wait: Optional[float] = None):
+        # Reserve the next request slot under a thread lock so the limit holds
+        # across event loops (the alerter runs its own loop in a worker thread).
+        # A caller that can't wait `max_wait` seconds fails at once instead of
+        # queueing behind the others.
+        with self._rate_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            if max_wait is not None and slot - now > max_wait:
+                raise TimeoutError(f"no {self.name} request slot within {max_wait:.1f}s")
+            self._next_slot = slot + 1.0 / self.rate_limit
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    @contextlib.asynccontextmanager
+    async def _upstream_slot(self, max_wait: Optional[float] = None):
+        """
+        Held around each upstream request: a rate-limit slot first, then a
+        place in the shared concurrency budget. Sleeping on the rate limit
+        never holds the budget, so a throttled source can't starve the others.
+        """
+        await self._wait_for_slot(max_wait)
+        async with _budget():
+            yield
+
+    def _cache_get(self, key: tuple) -> Optional[List[dict]]:
+        entry = self._cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def _cache_put(self, key: tuple, results: List[dict]):
+        now = time.monotonic()
+        if len(self._cache) > 256:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+        self._cache[key] = (now + self.cache_ttl, results)
+
+    async def search(self, q: str, since: Optional[str] = None) -> List[dict]:
+        """
+        Runs fetch -> parse -> normalize for one query. Never raises: upstream
+        failures are counted and return an empty list, like the old functions.
+
+        Concurrent searches for the same normalized query and window share a
+        single upstream request (single-flight) instead of each fetching. The
+        flight runs on the loop's shared client (see http_client()), never on
+        one a caller owns and might close while followers are still waiting.
+        """
+        with tracing.tracer.start_as_current_span("source.search", attributes={"source": self.name, "query": q}) as span:
+            key = (normalize_query(q), since)
+            cached = self._cache_get(key)
+            if cached is not None:
+                self.stats.cache_hits += 1
+                metrics.CACHE_HITS.labels(self.name).inc()
+                span.set_attribute("cache_hit", True)
+                return list(cached)
+
+            # Futures belong to one event loop, so flights are keyed per loop.
+            loop = asyncio.get_running_loop()
+            flight_key = (id(loop), key)
+            flight = self._inflight.get(flight_key)
+            if flight is not None:
+                self.stats.coalesced += 1
+                metrics.SEARCH_COALESCED.labels(self.name).inc()
+                span.set_attribute("coalesced", True)
+            else:
+                flight = loop.create_task(self._search_upstream(q, http_client(), since, key))
+                self._inflight[flight_key] = flight
+                flight.add_done_callback(lambda _: self._inflight.pop(flight_key, None))
+
+            # Shielded so one caller disconnecting doesn't cancel the fetch for the others.
+            results = await asyncio.shield(flight)
+            span.set_attribute("results", len(results))
+            return list(results)
+
+    async def _search_upstream(self, q: str, client: httpx.AsyncClient, since: Optional[str], key: tuple) -> List[dict]:
+        self.stats.calls += 1
+        start = time.perf_counter()
+        try:
+            # The timeout covers waiting for a rate slot and the budget as well
+            # as the request itself.
+            raw = await asyncio.wait_for(self._fetch_in_slot(q, client, since), timeout=self.timeout)
+            with tracing.tracer.start_as_current_span("source.parse"), \
+                    metrics.PARSE_SECONDS.labels(self.name).time():
+                results = []
+                for record in self.parse(raw):
+                    try:
+                        alert = self.normalize(record)
+                    except Exception as e:
+                        logger.debug("Skipping unparseable item", extra={"source": self.name, "error": str(e)})
+                        continue
+                    if alert:
+                        results.append(alert)
+        except Exception as e:
+            self.stats.errors += 1
+            metrics.UPSTREAM_ERRORS.labels(self.name).inc()
+            span = trace.get_current_span()
+            span.record_exception(e)
+            span.set_status(Status(StatusCode.ERROR))
+            logger.warning(
+                "Upstream search failed",
+                extra={"source": self.name, "query": q, "error_type": type(e).__name__, "error": str(e)},
+            )
+            return []
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stats.last_latency = elapsed
+            self.stats.total_latency += elapsed
+
+        logger.info("Upstream search finished", extra={"source": self.name, "query": q, "results": len(results)})
+        self._cache_put(key, results)
+        return results
+
+    async def _fetch_in_slot(self, q: str, client: httpx.AsyncClient, since: Optional[str]) -> Any:
+        async with self._upstream_slot(max_wait=self.timeout):
+            with tracing.tracer.start_as_current_span("source.fetch"), \
+                    metrics.UPSTREAM_FETCH_SECONDS.labels(self.name).time():
+                return await self.fetch(q, client, since)
+
+def normalize_query(q: str) -> str:
+    """Case- and whitespace-insensitive form used for cache and single-flight keys."""
+    return " ".join(q.lower().split())
+
+# ===================================================================
+# ===== 2. REGISTRY AND FAN-OUT
+# ===================================================================
+
+SOURCES: Dict[str, RegulatorSource] = {}
+
+# One semaphore and one HTTP client per event loop; neither can be shared across loops.
+_budgets: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def register_source(source_cls):
+    """Class decorator that instantiates a source and adds it to the registry."""
+    source = source_cls()
+    SOURCES[source.name] = source
+    return source_cls
+
+
+def enabled_sources() -> List[RegulatorSource]:
+    if not config.ENABLED_SOURCES:
+        return list(SOURCES.values())
+    wanted = [name.strip() for name in config.ENABLED_SOURCES.split(",") if name.strip()]
+    return [SOURCES[name] for name in wanted if name in SOURCES]
+
+
+def http_client() -> httpx.AsyncClient:
+    """
+    The running loop's upstream client, owned by the registry rather than by
+    any request: building one costs ~40 ms of CPU (SSL context), and sharing it
+    reuses upstream connections. Whoever runs the loop closes it with
+    close_http_client() before the loop ends.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient()
+        _clients[loop] = client
+    return client
+
+
+async def close_http_client():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _budget() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    budget = _budgets.get(loop)
+    if budget is None:
+        budget = asyncio.Semaphore(config.SOURCE_CONCURRENCY)
+        _budgets[loop] = budget
+    return budget
+
+
+async def search_all(q: str, since: Optional[str] = None,
+                     only: Optional[List[RegulatorSource]] = None) -> List[dict]:
+    """
+    Searches every enabled source (or just `only`) concurrently and
+    concatenates the results. Upstream requests share the loop's
+    concurrency budget (see RegulatorSource._upstream_slot); cache hits and
+    coalesced searches don't take from it.
+    """
+    targets = enabled_sources() if only is None else only
+    batches = await asyncio.gather(*(source.search(q, since) for source in targets))
+    return [alert for batch in batches for alert in batch]
+
+
+async def history_many(queries: List[str], since: Optional[Dict[str, str]] = None) -> Dict[str, Optional[List[dict]]]:
+    """
+    Full history for each query from every enabled source, or None for a
+    query if any source couldn't supply all of it. `since` maps source names
+    to a YYYYMMDD start for sources whose older records are known already.
+    """
+    since = since or {}
+    targets = enabled_sources()
+
+    unique = list(dict.fromkeys(queries))
+    batches = await asyncio.gather(*(
+        source.fetch_history(q, http_client(), since.get(source.name)) for q in unique for source in targets
+    ))
+    results = {}
+    for i, q in enumerate(unique):
+        per_source = batches[i * len(targets):(i + 1) * len(targets)]
+        results[q] = None if any(batch is None for batch in per_source) else [alert for batch in per_source for alert in batch]
+    return results
+
+
+async def search_many(queries: List[str], since: Optional[str] = None,
+                      only: Optional[List[RegulatorSource]] = None) -> Dict[str, List[dict]]:
+    """Bulk search: every (query, source) pair shares the same concurrency budget."""
+    unique = list(dict.fromkeys(queries))
+    results = await asyncio.gather(*(search_all(q, since, only) for q in unique))
+    return dict(zip(unique, results))
+
+# ===================================================================
+# ===== 3. HELPERS
+# ===================================================================
+
+def get_date_range():
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=180) # Keeping the 180-day range for FDA
+    start_str = start_date.strftime('%Y%m%d')
+    end_str = end_date.strftime('%Y%m%d')
+    return start_str, end_str
+
+def get_severity(classification: str = '') -> str:
+    if not classification:
+        return 'low'
+    if classification=="Class I":
+        return 'high'
+    elif classification=="Class II":
+        return 'medium'
+    return 'low'
+
+# ===================================================================
+# ===== 4. FDA (openFDA drug enforcement API)
+# ===================================================================
+
+@register_source
+class FDASource(RegulatorSource):
+    name = "FDA"
+    timeout = 30.0
+    cache_ttl = 600.0
+    rate_limit = 4.0  # openFDA allows 240 requests/minute per key
+
+    async def fetch(self, q, client, since=None):
+        start_str, end_str = get_date_range()
+        if since:
+            start_str = since
+        api_url = f"{config.FDA_API_BASE}/drug/enforcement.json?search=report_date:[{start_str}+TO+{end_str}]+AND+(product_description:{q}+OR+reason_for_recall:{q})&limit=100"
+
+        response = await client.get(api_url, timeout=self.timeout, extensions={"trace": tracing.httpcore_trace})
+        if response.status_code == 404:
+            # openFDA answers "no matches" with a 404
+            return {}
+        response.raise_for_status()
+        return response.json()
+
+    def parse(self, raw):
+        return raw.get('results', [])
+
+    feed_page_size = 1000  # openFDA's maximum `limit`
+
+    async def fetch_feed(self, client, since):
+        """Pages through every enforcement report with report_date >= since."""
+        _, end_str = get_date_range()
+        records, skip = [], 0
+        with tracing.tracer.start_as_current_span("source.fetch_feed", attributes={"source": self.name, "since": since}):
+            try:
+                while True:
+                    api_url = f"{config.FDA_API_BASE}/drug/enforcement.json?search=report_date:[{since}+TO+{end_str}]&limit={self.feed_page_size}&skip={skip}"
+                    async with self._upstream_slot():
+                        with metrics.UPSTREAM_FETCH_SECONDS.labels(self.name).time():
+                            response = await client.get(api_url, timeout=self.timeout, extensions={"trace": tracing.httpcore_trace})
+                    if response.status_code == 404:
+                        break
+                    response.raise_for_status()
+                    data = response.json()
+                    page = data.get('results', [])
+                    for recall in page:
+                        fields = (recall.get('product_description', ''), recall.get('reason_for_recall', ''))
+                        records.append((fields, self.normalize(recall)))
+                    skip += len(page)
+                    total = data.get('meta', {}).get('results', {}).get('total', 0)
+                    if len(page) < self.feed_page_size or skip >= total:
+                        break
+            except Exception as e:
+                # A partial feed would pass for a complete one and silently drop
+                # notifications; None makes the alerter search term by term instead.
+                self.stats.errors += 1
+                metrics.UPSTREAM_ERRORS.labels(self.name).inc()
+                logger.warning("Feed fetch failed", extra={"source": self.name, "since": since, "pages_read": skip, "error": str(e)})
+                return None
+        logger.info("Fetched feed", extra={"source": self.name, "since": since, "records": len(records)})
+        return records
+
+    max_skip = 25000  # openFDA refuses deeper paging
+
+    async def fetch_history(self, q, client, since=None):
+        """Pages through every enforcement report matching `q`, optionally from report_date `since`."""
+        search = f"(product_description:{q}+OR+reason_for_recall:{q})"
+        if since:
+            search += f"+AND+report_date:[{since}+TO+{get_date_range()[1]}]"
+        alerts, skip = [], 0
+        with tracing.tracer.start_as_current_span("source.fetch_history", attributes={"source": self.name, "query": q}):
+            try:
+                while True:
+                    api_url = f"{config.FDA_API_BASE}/drug/enforcement.json?search={search}&limit={self.feed_page_size}&skip={skip}"
+                    async with self._upstream_slot():
+                        with metrics.UPSTREAM_FETCH_SECONDS.labels(self.name).time():
+                            response = await client.get(api_url, timeout=self.timeout, extensions={"trace": tracing.httpcore_trace})
+                    if response.status_code == 404:
+                        break
+                    response.raise_for_status()
+                    data = response.json()
+                    page = data.get('results', [])
+                    alerts.extend(self.normalize(recall) for recall in page)
+                    skip += len(page)
+                    total = data.get('meta', {}).get('results', {}).get('total', 0)
+                    if len(page) < self.feed_page_size or skip >= total:
+                        break
+                    if skip > self.max_skip:
+                        return self._history_failed(q, f"{total} matches, more than openFDA pages through")
+            except Exception as e:
+                return self._history_failed(q, str(e))
+        return alerts
+
+    def normalize(self, recall):
+        event_id = recall.get('event_id')
+        recall_number = recall.get('recall_number')
+
+        # FIXED: Correct URL format for FDA Enforcement Reports
+        # The FDA uses their new enforcement report system at cacmap.fda.gov
+        # You can link to either the event or search by recall number
+        if recall_number:
+            # Option 1: Search by recall number (most reliable)
+            source_url = f"https://cacmap.fda.gov/safety/recalls-market-withdrawals-safety-alerts/enforcement-reports?search={recall_number}"
+        elif event_id:
+            # Option 2: If no recall number, try event ID search
+            source_url = f"https://cacmap.fda.gov/safety/recalls-market-withdrawals-safety-alerts/enforcement-reports?event_id={event_id}"
+        else:
+            # Option 3: Fallback to general enforcement reports page
+            source_url = "https://cacmap.fda.gov/safety/recalls-market-withdrawals-safety-alerts/enforcement-reports"
+
+        # Date formatting
+        date_str = recall.get('recall_initiation_date', '')
+        formatted_date = date_str
+        if len(date_str) == 8:
+            formatted_date = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
+
+        return {
+            'title': recall.get('product_description', 'No Title').split('.')[0],
+            'description': recall.get('reason_for_recall', ''),
+            'date': formatted_date,
+            'source': 'FDA',
+            'severity': get_severity(recall.get('classification', '')),
+            'source_url': source_url,
+            'recall_number': recall_number,
+            'event_id': event_id
+        }
+
+# ===================================================================
+# ===== 5. HEALTH CANADA (scraped recalls-rappels search page)
+# ===================================================================
+
+# The search page's pager: Drupal marks the link rel="next"; the label is "Next".
+NEXT_PAGE_RE = re.compile(r'<a[^>]*(rel="next"|>\s*Next\b)', re.IGNORECASE)
+
+
+@register_source
+class HealthCanadaSource(RegulatorSource):
+    name = "Health Canada"
+    timeout = 30.0
+    cache_ttl = 600.0
+    rate_limit = config.HEALTH_CANADA_RATE_LIMIT  # a scraped site: stay well under what a browser would send
+
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36"
+    }
+
+    async def fetch(self, q, client, since=None):
+        scrape_url = f"{config.HEALTH_CANADA_BASE}/en/search/site?search_api_fulltext={q}"
+        logger.debug("Scraping Health Canada", extra={"url": scrape_url})
+
+        response = await client.get(
+            scrape_url, timeout=self.timeout, headers=self.headers, follow_redirects=True,
+            extensions={"trace": tracing.httpcore_trace},
+        )
+        response.raise_for_status()
+        # The site has no server-side date filter, so apply `since` after parsing.
+        return response.text, since
+
+    history_max_pages = 50
+
+    async def fetch_history(self, q, client, since=None):
+        """Follows the search results' pager until the last page."""
+        alerts = []
+        with tracing.tracer.start_as_current_span("source.fetch_history", attributes={"source": self.name, "query": q}):
+            try:
+                for page in range(self.history_max_pages):
+                    async with self._upstream_slot():
+                        with metrics.UPSTREAM_FETCH_SECONDS.labels(self.name).time():
+                            response = await client.get(
+                                f"{config.HEALTH_CANADA_BASE}/en/search/site?search_api_fulltext={q}&page={page}",
+                                timeout=self.timeout, headers=self.headers, follow_redirects=True,
+                                extensions={"trace": tracing.httpcore_trace},
+                            )
+                    response.raise_for_status()
+                    rows = self.parse((response.text, since))
+                    for row in rows:
+                        try:
+                            alert = self.normalize(row)
+                        except Exception as e:
+                            logger.debug("Skipping unparseable item", extra={"source": self.name, "error": str(e)})
+                            continue
+                        if alert:
+                            alerts.append(alert)
+                    if not rows or not NEXT_PAGE_RE.search(response.text):
+                        return alerts
+            except Exception as e:
+                return self._history_failed(q, str(e))
+        return self._history_failed(q, f"more than {self.history_max_pages} result pages")
+
+    def parse(self, raw):
+        from bs4 import BeautifulSoup  # imported on first use; it's slow to load
+
+        html, since = raw
+        soup = BeautifulSoup(html, "lxml")
+        search_results = soup.find_all("div", class_="views-row")
+        return [(item, since) for item in search_results]
+
+    def normalize(self, record):
+        item, since = record
+
+        # 1. Find Title
+        title_span = item.find("span", class_="homepage-recent")
+        if not title_span:
+            return None
+
+        title_tag = title_span.find("a")
+        if not title_tag:
+            return None
+
+        title = title_tag.text.strip()
+        source_url = "https://recalls-rappels.canada.ca" + title_tag["href"]
+
+        # 2. Find Date
+        date_span = item.find("span", class_="ar-type")
+        if not date_span:
+            return None
+
+        date_text_parts = date_span.text.split('|')
+        date = date_text_parts[-1].strip() if len(date_text_parts) > 1 else "Unknown Date"
+
+        if since:
+            try:
+                if datetime.strptime(date, "%Y-%m-%d") < datetime.strptime(since, "%Y%m%d"):
+                    return None
+            except ValueError:
+                return None
+
+        # 3. Find Description
+        problem_tag = item.find("div", class_="field-name-field-problem")
+        description = problem_tag.find("p").text.strip() if problem_tag else ""
+
+        # 4. Guess Severity
+        severity = 'low'
+        if "Type I" in title:
+            severity = 'high'
+        elif "Type II" in title:
+            severity = 'medium'
+
+        return {
+            'title': title,
+            'description': description,
+            'date': date,
+            'source': 'Health Canada',
+            'severity': severity,
+            'source_url': source_url,
+            'recall_number': "N/A (Scraped)",
+            'event_id': "N/A (Scraped)"
+        }
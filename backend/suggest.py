@@ -0,0 +1,272 @@
+import bisect
+import heapq
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import distinct, func
+from sqlalchemy.orm import Session
+
+from . import config, database, models
+from .sources import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Prefixes this short match too many keys to scan per keystroke; their best
+# candidates are precomputed at compaction instead.
+SHORT_PREFIX = 4
+SHORT_PREFIX_CANDIDATES = 20
+MAX_SCAN = 500
+MAX_NAME_LENGTH = 80
+
+
+def product_name(title: str) -> str:
+    """'Metformin HCl ER Tablets, 500 mg, Rx only' -> 'Metformin HCl ER Tablets'"""
+    name = " ".join(title.split(",")[0].split())
+    return name[:MAX_NAME_LENGTH].rstrip()
+
+
+def _keys_for(name: str) -> List[str]:
+    """A name is findable from the start of any of its first few words."""
+    words = name.split(" ")
+    return [" ".join(words[i:]) for i in range(min(len(words), 4))]
+
+
+class SuggestionIndex:
+    """
+    In-memory typeahead over product names and popular searches.
+
+    Every name is stored under a normalized key for each of its first words
+    in two parallel sorted lists, so a prefix lookup is one bisect plus a
+    short scan. Names added since the last compaction sit in a small delta
+    with its own sorted lists, rebuilt on the first lookup after a change and
+    searched the same way; compact() folds it into the main lists and
+    runs off the request path once the delta reaches `compact_threshold`,
+    or on a schedule. Prefixes of up to SHORT_PREFIX characters, which match
+    too much to scan, get their best names precomputed at compaction.
+    Results are ranked by popularity (number of searches; product names seen
+    in recalls start at 1). When a prefix has too few exact matches, prefixes
+    within edit distance 1 that exist in the index are tried as well.
+    """
+
+    def __init__(self, compact_threshold: int):
+        self.compact_threshold = compact_threshold
+        self._lock = threading.Lock()
+        self._sorted: Tuple[List[str], List[str]] = ([], [])  # (keys, owning names), swapped whole
+        self._top: Dict[str, List[str]] = {}                   # short prefix -> best names at compaction
+        self._display: Dict[str, str] = {}                     # normalized name -> text shown to users
+        self._scores: Dict[str, float] = {}
+        self._recall_names: Set[str] = set()
+        self._delta: Dict[str, None] = {}
+        self._delta_sorted: Tuple[List[str], List[str]] = ([], [])
+        self._delta_dirty = False
+        self._compacting = False
+
+    def __len__(self):
+        return len(self._scores)
+
+    # ----- updates -----
+
+    def _add(self, name: str, display: str, score: float) -> bool:
+        """Caller holds the lock. Returns True when the delta is due for compaction."""
+        self._scores[name] = score
+        self._display[name] = display
+        self._delta[name] = None
+        self._delta_dirty = True
+        return len(self._delta) >= self.compact_threshold
+
+    def add_recalls(self, alerts: Iterable[dict]):
+        """Adds the product name of every alert not already indexed."""
+        names = {}
+        for alert in alerts:
+            display = product_name(alert.get("title") or "")
+            name = normalize_query(display)
+            if name:
+                names[name] = display
+        due = False
+        with self._lock:
+            for name, display in names.items():
+                self._recall_names.add(name)
+                if name not in self._scores:
+                    due = self._add(name, display, 1.0) or due
+            due = due and not self._compacting
+            if due:
+                self._compacting = True
+        if due:
+            # Rebuilding the sorted lists takes a while on a big index; keep it
+            # off the caller, which may be the API event loop.
+            threading.Thread(target=self.compact, name="suggest-compact", daemon=True).start()
+
+    def bump(self, text: str, weight: float = 1.0):
+        """
+        Counts a search towards an existing entry's popularity. New search terms
+        only appear after refresh_from_history(), once enough users searched them.
+        """
+        name = normalize_query(text)
+        with self._lock:
+            if name in self._scores:
+                self._scores[name] += weight
+
+    def refresh_from_history(self, history: Iterable[Tuple[str, int]]):
+        """
+        Rebuilds popularity from aggregated (query_text, searches) history,
+        keeping every recall product name, then compacts.
+        """
+        with self._lock:
+            scores = {name: 1.0 for name in self._recall_names}
+            display = {name: self._display[name] for name in self._recall_names}
+        for text, searches in history:
+            name = normalize_query(text)
+            if name:
+                scores[name] = scores.get(name, 0.0) + (searches or 0)
+                display.setdefault(name, text.strip()[:MAX_NAME_LENGTH])
+        with self._lock:
+            self._scores = scores
+            self._display = display
+            self._delta = dict.fromkeys(scores)
+            self._delta_dirty = True
+        self.compact()
+
+    def compact(self):
+        """Folds the delta into the sorted lists and recomputes short-prefix candidates."""
+        with self._lock:
+            if not self._delta:
+                self._compacting = False
+                return
+            self._compacting = True
+            scores = dict(self._scores)
+            folded = list(self._delta)
+
+        entries = sorted((key, name) for name in scores for key in _keys_for(name))
+        keys = [key for key, _ in entries]
+        owners = [name for _, name in entries]
+        grouped: Dict[str, Set[str]] = {}
+        for key, name in entries:
+            for length in range(1, SHORT_PREFIX + 1):
+                if len(key) >= length:
+                    grouped.setdefault(key[:length], set()).add(name)
+        top = {
+            prefix: heapq.nsmallest(SHORT_PREFIX_CANDIDATES, names, key=lambda n: (-scores[n], len(n), n))
+            for prefix, names in grouped.items()
+        }
+
+        with self._lock:
+            self._sorted = (keys, owners)
+            self._top = top
+            for name in folded:
+                self._delta.pop(name, None)
+            self._delta_dirty = True
+            self._compacting = False
+
+    # ----- lookups -----
+
+    def _snapshot(self):
+        """(main keys, main owners, short-prefix tops, delta keys, delta owners), all from one moment."""
+        with self._lock:
+            if self._delta_dirty:
+                entries = sorted((key, name) for name in self._delta for key in _keys_for(name))
+                self._delta_sorted = ([key for key, _ in entries], [name for _, name in entries])
+                self._delta_dirty = False
+            return (*self._sorted, self._top, *self._delta_sorted)
+
+    @staticmethod
+    def _scan(prefix: str, keys: List[str], owners: List[str], top: Optional[Dict[str, List[str]]] = None,
+              cap: int = MAX_SCAN) -> Set[str]:
+        """Names with a key starting with `prefix`; short prefixes are answered from `top` when given."""
+        if top is not None and len(prefix) <= SHORT_PREFIX:
+            return set(top.get(prefix, ())[:cap])
+        found = set()
+        i = bisect.bisect_left(keys, prefix)
+        end = min(len(keys), i + cap)
+        while i < end and keys[i].startswith(prefix):
+            found.add(owners[i])
+            i += 1
+        return found
+
+    @staticmethod
+    def _next_chars(prefix: str, keys: List[str]) -> List[str]:
+        """Distinct characters that follow `prefix` in the index, one bisect each."""
+        chars = []
+        i = bisect.bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            if len(keys[i]) > len(prefix):
+                c = keys[i][len(prefix)]
+                chars.append(c)
+                i = bisect.bisect_left(keys, prefix + chr(ord(c) + 1), i)
+            else:
+                i += 1
+        return chars
+
+    def _fuzzy_variants(self, query: str, keys: List[str]) -> Set[str]:
+        """
+        Prefixes one delete, transpose, replace or insert away from `query`.
+        Replacements and inserts only use characters that actually follow the
+        unchanged part in the index, which prunes most dead ends.
+        """
+        variants = set()
+        for i in range(len(query) + 1):
+            head, tail = query[:i], query[i:]
+            if tail:
+                variants.add(head + tail[1:])
+            if len(tail) > 1:
+                variants.add(head + tail[1] + tail[0] + tail[2:])
+            for c in self._next_chars(head, keys):
+                variants.add(head + c + tail)
+                if tail:
+                    variants.add(head + c + tail[1:])
+        variants.discard(query)
+        return variants
+
+    def _rank(self, names: Set[str], limit: int) -> List[str]:
+        scores = self._scores
+        return heapq.nsmallest(limit, names, key=lambda n: (-scores.get(n, 0.0), len(n), n))
+
+    def suggest(self, prefix: str, limit: int = 8, fuzzy: bool = True) -> List[dict]:
+        query = normalize_query(prefix)
+        if not query:
+            return []
+        keys, owners, top, delta_keys, delta_owners = self._snapshot()
+
+        exact = self._scan(query, keys, owners, top) | self._scan(query, delta_keys, delta_owners)
+        ranked = self._rank(exact, limit)
+
+        if fuzzy and len(ranked) < limit and len(query) >= 3:
+            close = set()
+            for variant in self._fuzzy_variants(query, keys) | self._fuzzy_variants(query, delta_keys):
+                close |= self._scan(variant, keys, owners, top, cap=limit)
+                close |= self._scan(variant, delta_keys, delta_owners, cap=limit)
+            ranked += self._rank(close - exact, limit - len(ranked))
+
+        return [
+            {"text": self._display.get(name, name), "score": self._scores.get(name, 0.0), "fuzzy": name not in exact}
+            for name in ranked
+        ]
+
+# ===================================================================
+# ===== SHARED INDEX AND SCHEDULED REFRESH
+# ===================================================================
+
+suggestions = SuggestionIndex(config.SUGGEST_COMPACT_THRESHOLD)
+
+
+def popular_searches(db: Session) -> List[Tuple[str, int]]:
+    """
+    Search terms used by at least SUGGEST_MIN_SEARCHERS different users, with
+    their total search count. The threshold keeps one user's searches from
+    being suggested to everyone else.
+    """
+    normalized = func.lower(func.trim(models.Search.query_text))
+    return db.query(func.min(models.Search.query_text), func.sum(models.Search.search_count)) \
+        .group_by(normalized) \
+        .having(func.count(distinct(models.Search.owner_id)) >= config.SUGGEST_MIN_SEARCHERS) \
+        .all()
+
+
+def refresh_suggestions():
+    """Scheduled job: rebuild popularity from search history."""
+    db = database.SessionLocal()
+    try:
+        suggestions.refresh_from_history(popular_searches(db))
+        logger.info("Suggestion index refreshed", extra={"entries": len(suggestions)})
+    finally:
+        db.close()
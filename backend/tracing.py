@@ -0,0 +1,65 @@
+from opentelemetry import trace
+
+from . import config
+
+# Until setup_tracing() installs a provider this is a no-op tracer, so spans
+# cost almost nothing when tracing is off.
+tracer = trace.get_tracer("pharmaclear")
+
+_configured = False
+
+
+def setup_tracing():
+    """
+    Installs the span exporter selected by TRACE_EXPORTER:
+      "otlp" - OTLP/HTTP to OTEL_EXPORTER_OTLP_ENDPOINT (e.g. a local collector)
+      "file" - one JSON span per line appended to TRACE_FILE
+      "none" - tracing disabled (default)
+    """
+    global _configured
+    if _configured or config.TRACE_EXPORTER == "none":
+        return
+
+    # The SDK is only needed once tracing is actually switched on.
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    if config.TRACE_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter(endpoint=config.OTEL_EXPORTER_OTLP_ENDPOINT)
+    elif config.TRACE_EXPORTER == "file":
+        exporter = ConsoleSpanExporter(
+            out=open(config.TRACE_FILE, "a"),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    else:
+        raise ValueError(f"Unknown TRACE_EXPORTER: {config.TRACE_EXPORTER}")
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "pharmaclear-api"}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _configured = True
+
+
+async def httpcore_trace(event_name: str, info: dict):
+    """
+    httpx `trace` extension hook. Records connection-level phases (TCP connect,
+    which includes DNS resolution, TLS handshake, request send, response
+    headers) as events on the current span.
+    """
+    span = trace.get_current_span()
+    if span.is_recording():
+        span.add_event(event_name)
+
+
+async def trace_request(request, call_next):
+    """HTTP middleware: one server span per request, parent of all stage spans."""
+    with tracer.start_as_current_span(
+        f"{request.method} {request.url.path}",
+        kind=trace.SpanKind.SERVER,
+        attributes={"http.method": request.method, "http.target": request.url.path},
+    ) as span:
+        response = await call_next(request)
+        span.set_attribute("http.status_code", response.status_code)
+        return response
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from . import config, database, fda_import, models, sources
+from .sources import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# ===================================================================
+# ===== 1. INCREMENTAL ROLLUP
+# ===================================================================
+# trend_counts holds one row per (term, month, source, severity) bucket.
+# Recalls are folded in as they are ingested rather than recounted:
+# trend_seen_recalls remembers which (term, recall) pairs were already
+# counted, and only pairs it has not seen before bump their bucket.
+
+def recall_month(alert: dict) -> Optional[date]:
+    try:
+        d = datetime.strptime(alert.get("date") or "", "%Y-%m-%d")
+    except ValueError:
+        return None
+    return date(d.year, d.month, 1)
+
+
+def recall_key(alert: dict) -> str:
+    """Stable identity of a recall within its source."""
+    number = alert.get("recall_number")
+    if number and not number.startswith("N/A"):
+        return number
+    return alert.get("source_url") or f"{alert.get('title')}|{alert.get('date')}"
+
+
+_INGEST_SQL = text("""
+    WITH batch AS (
+        SELECT * FROM unnest(
+            CAST(:terms AS text[]), CAST(:sources AS text[]), CAST(:keys AS text[]),
+            CAST(:months AS date[]), CAST(:severities AS text[])
+        ) AS b(term, source, recall_key, month, severity)
+    ), new AS (
+        INSERT INTO trend_seen_recalls (term, source, recall_key, month, severity)
+        SELECT term, source, recall_key, month, severity FROM batch
+        ON CONFLICT DO NOTHING
+        RETURNING term, month, source, severity
+    )
+    INSERT INTO trend_counts (term, month, source, severity, count)
+    SELECT term, month, source, severity, COUNT(*) FROM new
+    GROUP BY term, month, source, severity
+    ON CONFLICT (term, month, source, severity)
+    DO UPDATE SET count = trend_counts.count + EXCLUDED.count
+""")
+
+
+def ingest(db: Session, matches: Iterable[Tuple[str, dict]]) -> int:
+    """
+    Folds (term, recall) matches into the rollup. Each batch of
+    TREND_INGEST_BATCH_SIZE rows is one statement: the database dedupes,
+    groups and upserts it, so nothing is counted twice however often the
+    same recall is ingested. Returns the number of rows considered.
+    """
+    rows = {}
+    for term, alert in matches:
+        month = recall_month(alert)
+        if month is None:
+            continue
+        term = normalize_query(term)
+        key = recall_key(alert)
+        rows[(term, alert.get("source") or "", key)] = (month, alert.get("severity") or "low")
+
+    items = list(rows.items())
+    size = config.TREND_INGEST_BATCH_SIZE
+    for start in range(0, len(items), size):
+        batch = items[start:start + size]
+        db.execute(_INGEST_SQL, {
+            "terms": [term for (term, _, _), _ in batch],
+            "sources": [source for (_, source, _), _ in batch],
+            "keys": [key for (_, _, key), _ in batch],
+            "months": [month for _, (month, _) in batch],
+            "severities": [severity for _, (_, severity) in batch],
+        })
+    if items:
+        db.execute(
+            text("UPDATE trend_terms SET last_ingested_at = now() WHERE term = ANY(:terms)"),
+            {"terms": sorted({term for term, _, _ in rows})},
+        )
+    db.commit()
+    return len(items)
+
+# ===================================================================
+# ===== 2. TRACKED TERMS
+# ===================================================================
+
+def untracked_terms(db: Session, terms: Iterable[str]) -> List[str]:
+    wanted = {normalize_query(term) for term in terms} - {""}
+    if not wanted:
+        return []
+    tracked = {term for (term,) in db.query(models.TrendTerm.term).filter(models.TrendTerm.term.in_(wanted))}
+    return sorted(wanted - tracked)
+
+
+def backfill_terms(db: Session, terms: Iterable[str]) -> List[str]:
+    """
+    Starts tracking terms that aren't rolled up yet. Their whole history is
+    ingested in bulk: FDA recalls come from the imported fda_recalls table
+    where a complete import exists, and the API pages through the rest (or
+    everything, without one). Afterwards the alerter keeps them current from
+    the daily feed. A term is only marked as tracked once every source
+    returned its full history; the others are retried on the next call.
+    Returns the terms that were backfilled.
+    """
+    missing = untracked_terms(db, terms)
+    if not missing:
+        return []
+
+    since, local = {}, []
+    snapshot = fda_import.complete_through(db)
+    if snapshot:
+        since["FDA"] = snapshot.strftime('%Y%m%d')
+        local = list(fda_import.match_terms(db, missing))
+
+    async def fetch():
+        try:
+            return await sources.history_many(missing, since=since)
+        finally:
+            await sources.close_http_client()
+
+    results = asyncio.run(fetch())
+    done = [term for term in missing if results[term] is not None]
+    failed = [term for term in missing if results[term] is None]
+    if failed:
+        logger.warning("Recall history incomplete; terms stay untracked", extra={"terms": failed})
+    if not done:
+        return []
+
+    db.execute(pg_insert(models.TrendTerm.__table__).on_conflict_do_nothing(), [{"term": term} for term in done])
+    ingest(db, [
+        *((term, alert) for term, alert in local if term in done),
+        *((term, alert) for term in done for alert in results[term]),
+    ])
+    logger.info("Backfilled recall trends", extra={"terms": done, "local_fda_through": str(snapshot) if snapshot else None})
+    return done
+
+# ===================================================================
+# ===== 3. BACKGROUND BACKFILL
+# ===================================================================
+# A term's full history can take tens of seconds of paging, too long to
+# hold a request for. /api/trends starts the backfill here and answers 202
+# until it lands. Concurrent requests for the same term share one backfill,
+# and a few workers bound how many upstream pages backfills have in flight
+# next to live searches. A failed backfill is reported for
+# TREND_BACKFILL_RETRY_SECONDS before a request may start another.
+
+class TrendBackfills:
+    def __init__(self, workers: int, retry_after: float):
+        self.workers = workers
+        self.retry_after = retry_after
+        self._executor = self._new_executor()
+        self._lock = threading.Lock()
+        self._running: Dict[str, Future] = {}
+        self._failed: Dict[str, float] = {}  # term -> time.monotonic() of the failure
+
+    def request(self, term: str) -> Optional[Future]:
+        """
+        The backfill of `term`, started unless one is already running. Its
+        result is whether the term ended up tracked. None while a recent
+        failure is still being reported.
+        """
+        term = normalize_query(term)
+        with self._lock:
+            if term in self._running:
+                return self._running[term]
+            failed_at = self._failed.get(term)
+            if failed_at is not None and time.monotonic() - failed_at < self.retry_after:
+                return None
+            self._failed.pop(term, None)
+            future = self._running[term] = self._executor.submit(self._run, term)
+            return future
+
+    def _run(self, term: str) -> bool:
+        db = database.SessionLocal()
+        tracked = False
+        try:
+            backfill_terms(db, [term])
+            tracked = not untracked_terms(db, [term])
+        except Exception:
+            logger.exception("Trend backfill failed", extra={"term": term})
+        finally:
+            db.close()
+            with self._lock:
+                self._running.pop(term, None)
+                if not tracked:
+                    self._failed[term] = time.monotonic()
+        return tracked
+
+    def _new_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="trend-backfill")
+
+    def shutdown(self):
+        """Drops queued backfills (a running one finishes); a later request starts a fresh worker pool."""
+        with self._lock:
+            executor, self._executor = self._executor, self._new_executor()
+        executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._running = {term: future for term, future in self._running.items() if not future.cancelled()}
+
+
+backfills = TrendBackfills(workers=config.TREND_BACKFILL_WORKERS, retry_after=config.TREND_BACKFILL_RETRY_SECONDS)
+
+# ===================================================================
+# ===== 4. QUERIES
+# ===================================================================
+
+def last_ingested(db: Session, term: str) -> Optional[datetime]:
+    return db.query(models.TrendTerm.last_ingested_at).filter(models.TrendTerm.term == normalize_query(term)).scalar()
+
+
+def get_trend(db: Session, term: str, since: date) -> List[models.TrendCount]:
+    """Reads buckets only: cost is O(months x sources x severities), not O(recalls)."""
+    return db.query(models.TrendCount) \
+        .filter(models.TrendCount.term == normalize_query(term), models.TrendCount.month >= since) \
+        .order_by(models.TrendCount.month, models.TrendCount.source, models.TrendCount.severity) \
+        .all()
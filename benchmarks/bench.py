@@ -0,0 +1,600 @@
+"""
+Reproducible benchmark suite. Upstreams are replaced by a local fake that
+replays the recorded fixtures; the DB benchmarks need the Postgres configured
+in .env (use a dedicated benchmark database - the alerter benchmark scans
+every user with a watchlist).
+
+    python -m benchmarks.bench --out results.json
+    python -m benchmarks.bench --only parser,report
+    python -m benchmarks.bench --only startup --import-budget-ms 1000
+
+Results are written as JSON so runs can be diffed or plotted.
+The email benchmark needs aiosmtpd (pip install -r requirements-dev.txt).
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import httpx
+
+from .harness import (
+    FDA_FIXTURE, HEALTH_CANADA_FIXTURE, UPSTREAM_PORT, ServerProcess, ServerThread, create_fake_upstream,
+    free_port, latency_summary, run_metadata,
+)
+
+BENCH_EMAIL = "bench@pharmaclear.local"
+ALL_BENCHMARKS = ("startup", "parser", "search", "alerter", "report", "db", "email", "export", "suggest", "trends", "caching", "fda_import")
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+# ===================================================================
+# ===== FIXTURE HELPERS
+# ===================================================================
+
+def clear_bench_user(db):
+    """Deletes the bench user and every row it owns."""
+    from backend import crud, models
+
+    user = crud.get_user_by_email(db, BENCH_EMAIL)
+    if user:
+        for model in (models.Notification, models.WatchlistItem, models.Search, models.CollectionVersion):
+            db.query(model).filter(model.owner_id == user.id).delete(synchronize_session=False)
+        db.delete(user)
+        db.commit()
+
+
+def reset_bench_user(db):
+    """Clears rows left by an earlier run and returns a fresh bench user."""
+    from backend import crud, schemas
+
+    clear_bench_user(db)
+    return crud.create_user(db, schemas.UserCreate(email=BENCH_EMAIL, password="bench-password"))
+
+
+def bench_token() -> str:
+    from backend import auth
+
+    return auth.create_access_token({"sub": BENCH_EMAIL})
+
+
+def disable_source_throttling(keep_rate_limits: bool = False):
+    """
+    Measure the pipeline itself: no result cache and, unless
+    `keep_rate_limits`, no politeness delay either.
+    """
+    from backend import sources
+
+    for source in sources.SOURCES.values():
+        source.cache_ttl = 0
+        if not keep_rate_limits:
+            source.rate_limit = float("inf")
+
+
+async def drive(base_url: str, paths: list[str], concurrency: int, token: str) -> tuple[list[float], int, float]:
+    """Issues GETs for `paths` with `concurrency` workers; returns (latencies, errors, wall time)."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for path in paths:
+        queue.put_nowait(path)
+    latencies, errors = [], 0
+
+    async def worker(client):
+        nonlocal errors
+        while not queue.empty():
+            path = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60.0) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+    return latencies, errors, wall
+
+
+# ===================================================================
+# ===== BENCHMARKS
+# ===================================================================
+
+def bench_startup(repeats: int, budget_ms: float) -> dict:
+    """
+    Cold `import backend.main` in fresh interpreters, checked against a budget.
+    Also lists the modules with the most self time from one -X importtime run.
+    """
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import backend.main"], cwd=REPO_ROOT, check=True)
+        timings.append(time.perf_counter() - start)
+    interpreter = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        interpreter.append(time.perf_counter() - start)
+
+    trace = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.main"],
+        cwd=REPO_ROOT, check=True, capture_output=True, text=True,
+    ).stderr
+    modules = []
+    for line in trace.splitlines():
+        if line.startswith("import time:") and "|" in line and "self [us]" not in line:
+            self_us, _, name = line[len("import time:"):].split("|")
+            modules.append((int(self_us), name.strip()))
+    modules.sort(reverse=True)
+
+    import_ms = (statistics.median(timings) - statistics.median(interpreter)) * 1000
+    return {
+        "repeats": repeats,
+        "import_ms": round(import_ms, 1),
+        "budget_ms": budget_ms,
+        "within_budget": import_ms <= budget_ms,
+        "slowest_modules_ms": {name: round(us / 1000, 1) for us, name in modules[:10]},
+    }
+
+
+def bench_export(rows: int, batch_size: int = 500) -> dict:
+    """
+    Encoder throughput and peak Python heap per format, streaming `rows` FDA
+    fixture alerts in search-sized batches. The bytes are counted and dropped,
+    as the response stream would.
+    """
+    from backend import export, sources
+
+    fda = sources.SOURCES["FDA"]
+    alerts = [dict(fda.normalize(r), query="bench") for r in json.loads(FDA_FIXTURE.read_text())["results"]]
+    batch = [alerts[i % len(alerts)] for i in range(batch_size)]
+    results = {}
+    for fmt, gzip in (("csv", False), ("csv", True), ("ndjson", False), ("ndjson", True), ("parquet", False)):
+        encoder = export.make_encoder(fmt, gzip)
+        size = 0
+        tracemalloc.start()
+        start = time.perf_counter()
+        for _ in range(rows // batch_size):
+            size += len(encoder.write(batch))
+        size += len(encoder.close())
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[fmt + (".gz" if gzip else "")] = {
+            "rows": rows // batch_size * batch_size,
+            "rows_per_sec": round(rows / elapsed, 1),
+            "output_mb": round(size / 1e6, 2),
+            "peak_heap_mb": round(peak / 1e6, 2),
+        }
+    return results
+
+
+def bench_fda_import(sizes) -> dict:
+    """
+    Bulk enforcement import from synthetic zips of each size (the FDA fixture
+    repeated under BENCH- recall numbers): first load, then an unchanged
+    re-import, which must write nothing. Peak Python heap should not grow with
+    the file. Bench rows and checkpoints are removed afterwards.
+    """
+    import tempfile
+    import zipfile
+
+    from sqlalchemy import text
+
+    from backend import database, fda_import
+
+    fixture = json.loads(FDA_FIXTURE.read_text())["results"]
+    member = "bench-drug-enforcement.json"
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for size in sizes:
+                path = Path(tmp) / f"bench-{size}.zip"
+                with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive, archive.open(member, "w") as f:
+                    f.write(b'{"meta": {}, "results": [')
+                    for i in range(size):
+                        record = dict(fixture[i % len(fixture)], recall_number=f"BENCH-{size}-{i}")
+                        f.write((b", " if i else b"") + json.dumps(record).encode())
+                    f.write(b"]}")
+
+                results[str(size)] = {"zip_mb": round(path.stat().st_size / 1e6, 2)}
+                for label in ("import", "reimport"):
+                    stats = fda_import.import_archive(path, restart=True)[0]
+                    results[str(size)][label] = {
+                        key: value for key, value in stats.as_dict().items() if key in ("records", "written", "seconds", "records_per_sec")
+                    }
+                # tracemalloc slows the import several times over, so the heap is measured on a separate run.
+                tracemalloc.start()
+                fda_import.import_archive(path, restart=True)
+                results[str(size)]["peak_heap_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+                tracemalloc.stop()
+    finally:
+        with database.engine.begin() as conn:
+            conn.execute(text("DELETE FROM fda_recalls WHERE recall_number LIKE 'BENCH-%'"))
+            conn.execute(text("DELETE FROM fda_import_checkpoints WHERE member = :member"), {"member": member})
+    return results
+
+
+def bench_suggest(names: int, lookups: int, seed: int = 1) -> dict:
+    """
+    /api/suggest's server-side work: index build time, then per-lookup latency
+    for exact prefixes and for misspelt ones that fall back to fuzzy matching.
+    Names are the FDA fixture's products plus synthetic drug-like names.
+    """
+    import random
+
+    from backend.suggest import SuggestionIndex
+
+    rng = random.Random(seed)
+    syllables = ["met", "for", "min", "ator", "va", "sta", "tin", "lo", "sar", "tan", "pra", "zole",
+                 "ami", "dip", "ine", "cet", "iri", "zine", "flu", "oxe", "am", "pro", "pran", "olol"]
+    forms = ["Tablets", "Capsules", "Injection", "Oral Solution", "Extended-Release Tablets", "Cream"]
+    alerts = [{"title": r["product_description"]} for r in json.loads(FDA_FIXTURE.read_text())["results"]]
+    for _ in range(names):
+        word = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).capitalize()
+        alerts.append({"title": f"{word} {rng.choice(forms)}, {rng.choice([5, 10, 20, 50])} mg"})
+
+    index = SuggestionIndex(compact_threshold=len(alerts) + 1)
+    start = time.perf_counter()
+    index.add_recalls(alerts)
+    index.compact()
+    build = time.perf_counter() - start
+
+    words = [a["title"].split()[0].lower() for a in alerts]
+    results = {"names": len(index), "build_seconds": round(build, 3)}
+    for label, make in (
+        ("prefix", lambda w: w[:rng.randint(1, min(len(w), 6))]),
+        ("misspelt", lambda w: w[:3] + "q" + w[4:7]),
+    ):
+        timings, empty = [], 0
+        for _ in range(lookups):
+            prefix = make(rng.choice(words))
+            start = time.perf_counter()
+            found = index.suggest(prefix, limit=8, fuzzy=True)
+            timings.append(time.perf_counter() - start)
+            empty += not found
+        results[label] = {"empty": empty, **latency_summary(timings)}
+    return results
+
+
+def bench_trends(recalls: int, queries: int) -> dict:
+    """
+    Rollup ingest throughput (first pass and a duplicate re-ingest, which must
+    change nothing) and trend query latency. Uses its own bench- terms and
+    removes them afterwards.
+    """
+    from datetime import date
+
+    from sqlalchemy import text
+
+    from backend import database, trends
+
+    terms = [f"bench-trend-{i}" for i in range(10)]
+    matches = [
+        (terms[i % len(terms)], {
+            "date": f"{2015 + i // 10 % 10}-{i // 100 % 12 + 1:02d}-15",
+            "source": ("FDA", "Health Canada")[i % 2],
+            "severity": ("high", "medium", "low")[i % 3],
+            "recall_number": f"BENCH-{i}",
+        })
+        for i in range(recalls)
+    ]
+    db = database.SessionLocal()
+    try:
+        results = {"recalls": recalls}
+        for label in ("ingest", "reingest"):
+            start = time.perf_counter()
+            trends.ingest(db, matches)
+            elapsed = time.perf_counter() - start
+            results[label] = {"seconds": round(elapsed, 3), "recalls_per_sec": round(recalls / elapsed, 1)}
+
+        timings = []
+        for i in range(queries):
+            start = time.perf_counter()
+            buckets = trends.get_trend(db, terms[i % len(terms)], date(2015, 1, 1))
+            timings.append(time.perf_counter() - start)
+        results["query"] = {"buckets": len(buckets), **latency_summary(timings)}
+        results["total_counted"] = db.execute(
+            text("SELECT COALESCE(SUM(count), 0) FROM trend_counts WHERE term LIKE 'bench-trend-%'")
+        ).scalar()
+    finally:
+        for table in ("trend_counts", "trend_seen_recalls"):
+            db.execute(text(f"DELETE FROM {table} WHERE term LIKE 'bench-trend-%'"))
+        db.commit()
+        db.close()
+    return results
+
+
+def bench_parser(iterations: int) -> dict:
+    """Parse + normalize throughput per source, on the recorded payloads."""
+    from backend import sources
+
+    payloads = {
+        "FDA": json.loads(FDA_FIXTURE.read_text()),
+        "Health Canada": (HEALTH_CANADA_FIXTURE.read_text(), None),
+    }
+    sizes = {"FDA": FDA_FIXTURE.stat().st_size, "Health Canada": HEALTH_CANADA_FIXTURE.stat().st_size}
+    results = {}
+    for name, raw in payloads.items():
+        source = sources.SOURCES[name]
+        records = 0
+        start = time.perf_counter()
+        for _ in range(iterations):
+            records += sum(1 for record in source.parse(raw) if source.normalize(record))
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "iterations": iterations,
+            "records_per_sec": round(records / elapsed, 1),
+            "payloads_per_sec": round(iterations / elapsed, 2),
+            "mb_per_sec": round(sizes[name] * iterations / elapsed / 1e6, 2),
+        }
+    return results
+
+
+def bench_search(base_url: str, token: str, requests: int, concurrency: int) -> dict:
+    """End-to-end /api/search: distinct queries so every request goes upstream."""
+    paths = [f"/api/search?q=bench{i}" for i in range(requests)]
+    latencies, errors, wall = asyncio.run(drive(base_url, paths, concurrency, token))
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / wall, 2),
+        "latency": latency_summary(latencies),
+    }
+
+
+def bench_alerter(sizes: list[int]) -> dict:
+    """Alerter wall time as the bench user's watchlist grows."""
+    from backend import alerter, database, models
+
+    results = {}
+    for size in sizes:
+        db = database.SessionLocal()
+        try:
+            user = reset_bench_user(db)
+            db.add_all(models.WatchlistItem(query_text=f"benchterm{i}", owner_id=user.id) for i in range(size))
+            db.commit()
+        finally:
+            db.close()
+
+        start = time.perf_counter()
+        alerter.check_for_new_reports()
+        elapsed = time.perf_counter() - start
+        results[str(size)] = {"seconds": round(elapsed, 3), "per_item_ms": round(elapsed / size * 1000, 3)}
+    return results
+
+
+def bench_report(counts: list[int], repeats: int) -> dict:
+    """PDF render time (LLM call excluded) as the number of alerts grows."""
+    from backend import main, schemas
+
+    fda = json.loads(FDA_FIXTURE.read_text())["results"]
+    summary = "Benchmark summary paragraph. " * 40
+    results = {}
+    for count in counts:
+        alerts = [
+            schemas.AlertItem(
+                date=fda[i % len(fda)]["recall_initiation_date"],
+                severity="high",
+                title=fda[i % len(fda)]["product_description"],
+                description=fda[i % len(fda)]["reason_for_recall"],
+            )
+            for i in range(count)
+        ]
+        timings, size = [], 0
+        for _ in range(repeats):
+            start = time.perf_counter()
+            buffer = main.render_report_pdf("benchmark", summary, BENCH_EMAIL, alerts)
+            timings.append(time.perf_counter() - start)
+            size = len(buffer.getvalue())
+        results[str(count)] = {"render": latency_summary(timings), "pdf_bytes": size}
+    return results
+
+
+def bench_db(base_url: str, token: str, requests: int, concurrency: int) -> dict:
+    """QPS of the DB-backed endpoints the dashboard polls."""
+    from backend import database, models
+
+    db = database.SessionLocal()
+    try:
+        user = reset_bench_user(db)
+        db.add_all(models.Search(query_text=f"history{i}", owner_id=user.id) for i in range(50))
+        db.add_all(models.WatchlistItem(query_text=f"watch{i}", owner_id=user.id) for i in range(20))
+        db.add_all(models.Notification(message=f"notification {i}", owner_id=user.id) for i in range(100))
+        db.commit()
+    finally:
+        db.close()
+
+    results = {}
+    for path in ("/api/searches/", "/api/watchlist/", "/api/notifications/"):
+        latencies, errors, wall = asyncio.run(drive(base_url, [path] * requests, concurrency, token))
+        results[path] = {
+            "requests": requests,
+            "errors": errors,
+            "qps": round(requests / wall, 1),
+            "latency": latency_summary(latencies),
+        }
+    return results
+
+
+def bench_caching(requests: int) -> dict:
+    """
+    Bytes on the wire and server CPU per request for the polled endpoints and
+    a search, with no compression, gzip, brotli, and as a conditional GET
+    carrying the previous ETag. The API runs in its own process so its CPU
+    time can be measured apart from this client.
+    """
+    from backend import database, models
+
+    db = database.SessionLocal()
+    try:
+        user = reset_bench_user(db)
+        db.add_all(models.Search(query_text=f"history{i}", owner_id=user.id) for i in range(50))
+        db.add_all(models.WatchlistItem(query_text=f"watch{i}", owner_id=user.id) for i in range(20))
+        db.add_all(models.Notification(message=f"notification {i}", owner_id=user.id) for i in range(100))
+        db.commit()
+    finally:
+        db.close()
+
+    modes = {"identity": {}, "gzip": {}, "br": {}, "conditional": {}}
+    results = {}
+    with ServerProcess("backend.main:app", free_port()) as api:
+        time.sleep(2)  # let the startup jobs settle before measuring CPU
+        headers = {"Authorization": f"Bearer {bench_token()}"}
+        with httpx.Client(base_url=api.url, headers=headers, timeout=60.0) as client:
+            for path in ("/api/searches/", "/api/watchlist/", "/api/notifications/", "/api/search?q=bench"):
+                results[path] = {}
+                first = client.get(path, headers={"Accept-Encoding": "gzip"})
+                for mode in modes:
+                    request_headers = {"Accept-Encoding": "gzip" if mode == "conditional" else mode}
+                    if mode == "conditional":
+                        request_headers["If-None-Match"] = first.headers["etag"]
+                    wire_bytes, statuses, latencies = 0, set(), []
+                    cpu_before = api.cpu_seconds()
+                    for _ in range(requests):
+                        start = time.perf_counter()
+                        response = client.get(path, headers=request_headers)
+                        latencies.append(time.perf_counter() - start)
+                        wire_bytes += response.num_bytes_downloaded
+                        statuses.add(response.status_code)
+                    cpu = api.cpu_seconds() - cpu_before
+                    results[path][mode] = {
+                        "status": sorted(statuses),
+                        "bytes_per_request": round(wire_bytes / requests),
+                        "server_cpu_ms_per_request": round(cpu / requests * 1000, 3),
+                        "p50_ms": latency_summary(latencies)["p50_ms"],
+                    }
+    return results
+
+
+def bench_email(count: int) -> dict:
+    """
+    SMTP delivery against a local aiosmtpd stand-in: one pooled connection for
+    all messages versus a fresh connection per message.
+    """
+    from email.message import EmailMessage
+
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.handlers import Sink
+
+    from backend.mailer import SMTPSender
+
+    def message(i):
+        msg = EmailMessage()
+        msg["From"], msg["To"], msg["Subject"] = "alerts@pharmaclear.local", f"user{i}@example.com", "digest"
+        msg.set_content("New report found for 'metformin' (FDA) on your watchlist.")
+        return msg
+
+    def sender(port):
+        return SMTPSender("127.0.0.1", port, None, None, start_tls=False, rate_per_second=0)
+
+    async def pooled(port):
+        async with sender(port) as smtp:
+            for i in range(count):
+                await smtp.send(message(i))
+
+    async def per_message(port):
+        for i in range(count):
+            async with sender(port) as smtp:
+                await smtp.send(message(i))
+
+    controller = Controller(Sink(), hostname="127.0.0.1", port=free_port())
+    controller.start()
+    try:
+        results = {}
+        for name, run in (("pooled_connection", pooled), ("connection_per_message", per_message)):
+            start = time.perf_counter()
+            asyncio.run(run(controller.port))
+            elapsed = time.perf_counter() - start
+            results[name] = {"messages": count, "seconds": round(elapsed, 3), "messages_per_sec": round(count / elapsed, 1)}
+        return results
+    finally:
+        controller.stop()
+
+
+# ===================================================================
+# ===== ENTRY POINT
+# ===================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="PharmaClear benchmark suite")
+    parser.add_argument("--only", default=",".join(ALL_BENCHMARKS), help="comma-separated subset of " + ",".join(ALL_BENCHMARKS))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--upstream-latency", type=float, default=0.0, help="seconds added to each fake upstream response")
+    parser.add_argument("--parser-iterations", type=int, default=200)
+    parser.add_argument("--export-rows", type=int, default=50000)
+    parser.add_argument("--import-budget-ms", type=float, default=1500.0, help="fail if importing backend.main takes longer")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="measure with the sources' production rate limits")
+    parser.add_argument("--out", help="write results JSON here as well as stdout")
+    args = parser.parse_args()
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+
+    disable_source_throttling(args.keep_rate_limits)
+    results = {}
+
+    if "startup" in selected:
+        results["startup"] = bench_startup(repeats=5, budget_ms=args.import_budget_ms)
+    if "parser" in selected:
+        results["parser"] = bench_parser(args.parser_iterations)
+    if "report" in selected:
+        results["report"] = bench_report([10, 100, 1000], repeats=3)
+    if "email" in selected:
+        results["email"] = bench_email(args.requests)
+    if "export" in selected:
+        results["export"] = bench_export(args.export_rows)
+    if "trends" in selected:
+        results["trends"] = bench_trends(recalls=100000, queries=args.requests)
+    if "fda_import" in selected:
+        results["fda_import"] = bench_fda_import([25000, 100000])
+    if "suggest" in selected:
+        results["suggest"] = bench_suggest(names=50000, lookups=args.requests * 10)
+
+    if "caching" in selected:
+        with ServerThread(create_fake_upstream(args.upstream_latency), UPSTREAM_PORT):
+            results["caching"] = bench_caching(args.requests)
+
+    if {"search", "alerter", "db"} & set(selected):
+        from backend import database
+        from backend.main import app
+
+        db = database.SessionLocal()
+        try:
+            reset_bench_user(db)
+        finally:
+            db.close()
+        token = bench_token()
+
+        with ServerThread(create_fake_upstream(args.upstream_latency), UPSTREAM_PORT), \
+                ServerThread(app, free_port()) as api:
+            if "search" in selected:
+                results["search"] = bench_search(api.url, token, args.requests, args.concurrency)
+            if "db" in selected:
+                results["db"] = bench_db(api.url, token, args.requests, args.concurrency)
+            if "alerter" in selected:
+                results["alerter"] = bench_alerter([10, 100, 500])
+
+        db = database.SessionLocal()
+        try:
+            clear_bench_user(db)
+        finally:
+            db.close()
+
+    output = json.dumps({"meta": run_metadata(), "benchmarks": results}, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    if not results.get("startup", {}).get("within_budget", True):
+        sys.exit(f"backend.main import took {results['startup']['import_ms']} ms, budget is {args.import_budget_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
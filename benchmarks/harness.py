@@ -0,0 +1,182 @@
+"""
+Shared plumbing for the benchmark and load-test scripts: a fake upstream that
+replays recorded openFDA / Health Canada payloads and stands in for Groq, and
+a helper that serves an ASGI app with uvicorn on a background thread.
+
+Import this module before anything from `backend`: it points the upstream base
+URLs at the fake through the environment, which is read at import time.
+"""
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, Query
+from fastapi.responses import HTMLResponse, JSONResponse
+
+FIXTURES = Path(__file__).parent / "fixtures"
+FDA_FIXTURE = FIXTURES / "fda_enforcement.json"
+HEALTH_CANADA_FIXTURE = FIXTURES / "health_canada_search.html"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+UPSTREAM_PORT = int(os.environ.setdefault("BENCH_UPSTREAM_PORT", str(free_port())))
+os.environ["FDA_API_BASE"] = f"http://127.0.0.1:{UPSTREAM_PORT}"
+os.environ["HEALTH_CANADA_BASE"] = f"http://127.0.0.1:{UPSTREAM_PORT}"
+# The Groq SDK reads GROQ_BASE_URL itself; the fake upstream answers chat completions.
+os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{UPSTREAM_PORT}"
+os.environ.setdefault("GROQ_API_KEY", "bench-key")
+
+
+def create_fake_upstream(latency: float = 0.0) -> FastAPI:
+    """
+    Serves the recorded fixtures for any query, plus a canned Groq chat
+    completion. `latency` adds a fixed delay so runs can approximate real
+    upstream round-trip times.
+    """
+    fake = FastAPI()
+    fda_payload = json.loads(FDA_FIXTURE.read_text())
+    hc_html = HEALTH_CANADA_FIXTURE.read_text()
+
+    @fake.get("/drug/enforcement.json")
+    async def enforcement(limit: int = Query(100), skip: int = Query(0)):
+        if latency:
+            await asyncio.sleep(latency)
+        results = fda_payload["results"][skip:skip + limit]
+        meta = dict(fda_payload["meta"], results={"skip": skip, "limit": limit, "total": len(fda_payload["results"])})
+        return JSONResponse({"meta": meta, "results": results})
+
+    @fake.get("/en/search/site")
+    async def health_canada_search(page: int = Query(0)):
+        if latency:
+            await asyncio.sleep(latency)
+        # The fixture is the first page; its "Next" link leads to an empty one.
+        return HTMLResponse(hc_html if page == 0 else "<html><body><main></main></body></html>")
+
+    @fake.post("/openai/v1/chat/completions")
+    async def chat_completion():
+        if latency:
+            await asyncio.sleep(latency)
+        return JSONResponse({
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "llama-3.1-8b-instant",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "Benchmark answer based on the provided results."},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+    return fake
+
+
+class ServerThread:
+    """Runs `app` with uvicorn on 127.0.0.1:`port` for the duration of a with-block."""
+
+    def __init__(self, app, port: int, **uvicorn_options):
+        options = {"log_level": "warning", "lifespan": "on"}
+        options.update(uvicorn_options)
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, **options))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.url = f"http://127.0.0.1:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server on {self.url} did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+class ServerProcess:
+    """
+    Runs `app` ("module:attr") under uvicorn in a child process so its CPU
+    time can be read separately from the load generator's (Linux /proc only).
+    """
+
+    def __init__(self, app: str, port: int):
+        self.app = app
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", self.app, "--port", str(self.port), "--log-level", "warning"],
+            cwd=Path(__file__).resolve().parent.parent,
+        )
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.5):
+                    break
+            except OSError:
+                if time.monotonic() > deadline or self.process.poll() is not None:
+                    self.process.kill()
+                    raise RuntimeError(f"Server on {self.url} did not start")
+                time.sleep(0.1)
+        return self
+
+    def cpu_seconds(self) -> float:
+        """User + system CPU the server has used so far."""
+        with open(f"/proc/{self.process.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+def latency_summary(samples: list[float]) -> dict:
+    """Latency percentiles in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    cuts = statistics.quantiles(ordered, n=100, method="inclusive") if len(ordered) > 1 else [ordered[0]] * 99
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p90_ms": round(cuts[89] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def run_metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+    }
@@ -0,0 +1,254 @@
+"""
+Load-test scenario pack: simulated analysts follow the DashboardPage.js flows
+(login, load history + watchlist, poll notifications, search, save search,
+chat, report download) with think time, while the number of concurrent
+analysts steps up. Upstreams (openFDA, Health Canada, Groq) are served by the
+local fake from harness.py.
+
+    python -m benchmarks.loadtest --steps 5,10,20,40,80 --step-seconds 30 --out load.json
+
+By default the API runs in-process under uvicorn. With --target the script
+drives an already running instance instead; start that instance with
+FDA_API_BASE, HEALTH_CANADA_BASE and GROQ_BASE_URL pointing at
+http://127.0.0.1:$BENCH_UPSTREAM_PORT so it talks to the fake upstream this
+script serves.
+
+For each step the report gives throughput, error rate, latency percentiles
+per flow, and the peak utilization of the worker threadpool, the DB
+connection pool and the event loop (scraped from /metrics). The saturation
+point is the first step where throughput stops growing, errors exceed 1% or
+p95 latency exceeds the budget; the resource that reached 90% first is
+reported as the bottleneck.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from .harness import (
+    UPSTREAM_PORT, ServerThread, create_fake_upstream, free_port, latency_summary, run_metadata,
+)
+
+QUERIES = [
+    "metformin", "valsartan", "losartan", "ranitidine", "acetaminophen", "ibuprofen",
+    "heparin", "amlodipine", "atorvastatin", "levothyroxine", "sanitizer", "sodium chloride",
+]
+PASSWORD = "loadtest-password"
+LOOP_LAG_BUDGET = 0.1  # seconds of event loop lag treated as 100% utilization
+SATURATED = 0.9
+
+
+class StepStats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.resources = defaultdict(float)
+
+    def record(self, flow: str, elapsed: float, ok: bool):
+        self.latencies[flow].append(elapsed)
+        if not ok:
+            self.errors[flow] += 1
+
+
+class Recorder:
+    """Holds the StepStats for the step currently running."""
+
+    def __init__(self):
+        self.current = StepStats()
+
+    async def call(self, client: httpx.AsyncClient, flow: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.current.record(flow, time.perf_counter() - start, ok)
+        return response if ok else None
+
+
+# ===================================================================
+# ===== SCENARIO: ONE ANALYST
+# ===================================================================
+
+async def analyst(client: httpx.AsyncClient, recorder: Recorder, email: str, stop: asyncio.Event,
+                  rng: random.Random, think: tuple, chat_ratio: float, report_ratio: float):
+    response = await recorder.call(client, "login", "POST", "/api/token", data={"username": email, "password": PASSWORD})
+    if response is None:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    while not stop.is_set():
+        # Dashboard mount: history and watchlist load in parallel.
+        await asyncio.gather(
+            recorder.call(client, "load_history", "GET", "/api/searches/", headers=headers),
+            recorder.call(client, "load_watchlist", "GET", "/api/watchlist/", headers=headers),
+        )
+        # NotificationBell polls once on mount and then every 60s.
+        await recorder.call(client, "poll_notifications", "GET", "/api/notifications/", headers=headers)
+
+        query = rng.choice(QUERIES)
+        response = await recorder.call(client, "search", "GET", "/api/search", params={"q": query}, headers=headers)
+        alerts = response.json()["results"][:25] if response is not None else []
+        await recorder.call(client, "save_search", "POST", "/api/searches/", json={"query_text": query}, headers=headers)
+
+        context = [
+            {"date": a["date"], "severity": a["severity"], "title": a["title"], "description": a["description"]}
+            for a in alerts
+        ]
+        if context and rng.random() < chat_ratio:
+            await recorder.call(client, "chat", "POST", "/api/chat", headers=headers,
+                                json={"question": f"Which {query} recalls are high severity?", "context_alerts": context})
+        if context and rng.random() < report_ratio:
+            await recorder.call(client, "report", "POST", "/api/report", headers=headers,
+                                json={"query": query, "alerts": context})
+
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=rng.uniform(*think))
+        except asyncio.TimeoutError:
+            pass
+
+
+# ===================================================================
+# ===== RESOURCE SAMPLING
+# ===================================================================
+
+def parse_gauges(text: str) -> dict:
+    gauges = {}
+    for line in text.splitlines():
+        if line.startswith("pharmaclear_") and " " in line and "{" not in line:
+            name, value = line.rsplit(" ", 1)
+            gauges[name] = float(value)
+    return gauges
+
+
+async def sample_resources(client: httpx.AsyncClient, recorder: Recorder, stop: asyncio.Event, interval: float):
+    while not stop.is_set():
+        try:
+            gauges = parse_gauges((await client.get("/metrics")).text)
+        except httpx.HTTPError:
+            gauges = {}
+        if gauges:
+            usage = {
+                "threadpool": gauges["pharmaclear_threadpool_in_use"] / max(gauges["pharmaclear_threadpool_capacity"], 1),
+                "db_pool": gauges["pharmaclear_db_pool_checked_out"] / max(gauges["pharmaclear_db_pool_capacity"], 1),
+                "event_loop": gauges["pharmaclear_event_loop_lag_seconds"] / LOOP_LAG_BUDGET,
+            }
+            for resource, value in usage.items():
+                recorder.current.resources[resource] = max(recorder.current.resources[resource], value)
+        await asyncio.sleep(interval)
+
+
+# ===================================================================
+# ===== RUNNER
+# ===================================================================
+
+def summarize_step(users: int, stats: StepStats, seconds: float) -> dict:
+    total = sum(len(v) for v in stats.latencies.values())
+    errors = sum(stats.errors.values())
+    every = [latency for samples in stats.latencies.values() for latency in samples]
+    return {
+        "users": users,
+        "requests": total,
+        "throughput_rps": round(total / seconds, 2),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "latency": latency_summary(every),
+        "flows": {
+            flow: dict(latency_summary(samples), errors=stats.errors[flow])
+            for flow, samples in sorted(stats.latencies.items())
+        },
+        "resource_peak_utilization": {k: round(v, 3) for k, v in sorted(stats.resources.items())},
+    }
+
+
+def find_saturation(steps: list[dict], p95_budget_ms: float) -> dict:
+    saturation, best_rps = None, 0.0
+    for step in steps:
+        p95 = step["latency"].get("p95_ms", 0.0)
+        if step["error_rate"] > 0.01 or p95 > p95_budget_ms or (best_rps and step["throughput_rps"] < best_rps * 1.1):
+            saturation = step["users"]
+            break
+        best_rps = max(best_rps, step["throughput_rps"])
+
+    bottleneck = None
+    for step in steps:
+        hot = {k: v for k, v in step["resource_peak_utilization"].items() if v >= SATURATED}
+        if hot:
+            bottleneck = {"resource": max(hot, key=hot.get), "users": step["users"], "utilization": hot}
+            break
+    return {"saturation_users": saturation, "max_throughput_rps": best_rps, "first_saturated_resource": bottleneck}
+
+
+async def run(base_url: str, args) -> dict:
+    steps = [int(n) for n in args.steps.split(",")]
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=max(steps) * 2, max_keepalive_connections=max(steps) * 2)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        emails = [f"loadtest-{i}@pharmaclear.local" for i in range(max(steps))]
+        # Existing accounts answer 400, which is fine.
+        await asyncio.gather(*(client.post("/api/users/", json={"email": e, "password": PASSWORD}) for e in emails))
+
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_resources(client, recorder, stop, args.sample_interval))
+        analysts, results = [], []
+        for users in steps:
+            while len(analysts) < users:
+                email = emails[len(analysts)]
+                analysts.append(asyncio.create_task(analyst(
+                    client, recorder, email, stop, random.Random(rng.random()),
+                    (args.think_min, args.think_max), args.chat_ratio, args.report_ratio,
+                )))
+            recorder.current = StepStats()
+            start = time.perf_counter()
+            await asyncio.sleep(args.step_seconds)
+            step = summarize_step(users, recorder.current, time.perf_counter() - start)
+            results.append(step)
+            print(f"[loadtest] users={users} rps={step['throughput_rps']} errors={step['error_rate']} "
+                  f"p50={step['latency'].get('p50_ms')}ms resources={step['resource_peak_utilization']}")
+
+        stop.set()
+        await asyncio.gather(sampler, *analysts, return_exceptions=True)
+
+    return {"steps": results, "summary": find_saturation(results, args.p95_budget_ms)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PharmaClear mixed-traffic load test")
+    parser.add_argument("--target", help="base URL of a running API (default: start one in-process)")
+    parser.add_argument("--steps", default="5,10,20,40,80", help="concurrent analysts per step")
+    parser.add_argument("--step-seconds", type=float, default=30.0)
+    parser.add_argument("--think-min", type=float, default=0.5)
+    parser.add_argument("--think-max", type=float, default=2.0)
+    parser.add_argument("--chat-ratio", type=float, default=0.3, help="share of searches followed by a chat question")
+    parser.add_argument("--report-ratio", type=float, default=0.1, help="share of searches followed by a PDF download")
+    parser.add_argument("--upstream-latency", type=float, default=0.2, help="seconds added to each fake upstream response")
+    parser.add_argument("--p95-budget-ms", type=float, default=2000.0)
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write results JSON here as well as stdout")
+    args = parser.parse_args()
+
+    with ServerThread(create_fake_upstream(args.upstream_latency), UPSTREAM_PORT):
+        if args.target:
+            results = asyncio.run(run(args.target, args))
+        else:
+            from backend.main import app
+
+            with ServerThread(app, free_port()) as api:
+                results = asyncio.run(run(api.url, args))
+
+    output = json.dumps({"meta": run_metadata(), "config": vars(args), "load": results}, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
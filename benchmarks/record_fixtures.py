@@ -0,0 +1,41 @@
+"""
+Re-records the upstream fixtures from the live openFDA API and Health Canada
+search page, so benchmarks replay real payload shapes and sizes.
+
+    python -m benchmarks.record_fixtures --query metformin
+"""
+import argparse
+
+import httpx
+
+from .harness import FDA_FIXTURE, HEALTH_CANADA_FIXTURE
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--query", default="metformin")
+    args = parser.parse_args()
+
+    with httpx.Client(timeout=60.0, follow_redirects=True) as client:
+        fda = client.get(
+            "https://api.fda.gov/drug/enforcement.json",
+            params={"search": f"product_description:{args.query}", "limit": 100},
+        )
+        fda.raise_for_status()
+        FDA_FIXTURE.write_text(fda.text)
+
+        hc = client.get(
+            "https://recalls-rappels.canada.ca/en/search/site",
+            params={"search_api_fulltext": args.query},
+            headers={"User-Agent": USER_AGENT},
+        )
+        hc.raise_for_status()
+        HEALTH_CANADA_FIXTURE.write_text(hc.text)
+
+    print(f"Recorded {len(fda.content)} bytes of openFDA JSON and {len(hc.content)} bytes of Health Canada HTML.")
+
+
+if __name__ == "__main__":
+    main()
@@ -194,7 +194,7 @@ const DashboardPage = () => {
           const newSearch = await saveResponse.json();
           setSearchHistory((prev) => [
             newSearch,
-            ...prev.filter((s) => s.id !== newSearch.id),
+            ...prev.filter((s) => s.query_text !== newSearch.query_text),
           ]);
         }
       }
@@ -495,7 +495,7 @@ const DashboardPage = () => {
           ) : (
             <ul className="space-y-2">
               {searchHistory.slice(0, 10).map((search) => (
-                <li key={search.id}>
+                <li key={search.query_text}>
                   <button
                     onClick={() => handleHistoryClick(search.query_text)}
                     className="text-blue-600 hover:underline text-left w-full"
@@ -0,0 +1,66 @@
+"""
+Shared fixtures. Tests that touch the database use the Postgres configured by
+the DB_* variables (or .env), migrated to alembic head - use a dedicated test
+database - and are skipped when it isn't reachable.
+
+    python -m pytest
+"""
+import os
+
+from dotenv import load_dotenv
+
+# Before backend.config is imported, so settings it needs at import time exist.
+load_dotenv()
+for name, value in {"DB_USER": "postgres", "DB_PASSWORD": "", "DB_HOST": "127.0.0.1", "DB_PORT": "5432",
+                    "DB_NAME": "pharmaclear", "SECRET_KEY": "test-secret", "ALGORITHM": "HS256"}.items():
+    os.environ.setdefault(name, value)
+
+import pytest  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+TEST_EMAIL = "pytest@pharmaclear.local"
+
+
+@pytest.fixture(scope="session")
+def engine():
+    from backend import database
+
+    try:
+        with database.engine.connect() as conn:
+            conn.execute(text("SELECT version_num FROM alembic_version"))
+    except Exception as e:
+        pytest.skip(f"no migrated PharmaClear database: {e}")
+    return database.engine
+
+
+@pytest.fixture
+def db(engine):
+    from backend import database
+
+    session = database.SessionLocal()
+    yield session
+    session.rollback()
+    session.close()
+
+
+def _delete_test_user(db):
+    from backend import crud, models
+
+    user = crud.get_user_by_email(db, TEST_EMAIL)
+    if user:
+        for model in (models.Notification, models.WatchlistItem, models.Search, models.EmailOutbox, models.CollectionVersion):
+            db.query(model).filter(model.owner_id == user.id).delete(synchronize_session=False)
+        db.delete(user)
+        db.commit()
+
+
+@pytest.fixture
+def user(db):
+    """A fresh user; everything it owns is deleted afterwards."""
+    from backend import crud, schemas
+
+    _delete_test_user(db)
+    created = crud.create_user(db, schemas.UserCreate(email=TEST_EMAIL, password="test-password"))
+    yield created
+    db.rollback()
+    _delete_test_user(db)
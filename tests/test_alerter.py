@@ -0,0 +1,92 @@
+import asyncio
+
+from backend import alerter, config, crud, models, schemas, sources, trends
+from backend.matcher import WatchlistMatcher
+
+FDA = sources.SOURCES["FDA"]
+HC = sources.SOURCES["Health Canada"]
+
+
+def recall(number, source="FDA"):
+    return {"title": number, "date": "2026-01-09", "source": source, "severity": "high", "recall_number": number}
+
+
+def test_percolate_matches_each_record_once_per_term():
+    matcher = WatchlistMatcher(["metformin", "ndma", "valsartan"])
+    records = [
+        (("Metformin ER Tablets", "NDMA impurity"), recall("D-1")),
+        (("Aspirin", "Mislabeled"), recall("D-2")),
+        (("Metformin", "Metformin mix-up"), recall("D-3")),
+    ]
+    assert sorted((term, r["recall_number"]) for term, r in alerter.percolate(records, matcher)) == [
+        ("metformin", "D-1"), ("metformin", "D-3"), ("ndma", "D-1"),
+    ]
+
+
+def test_sources_without_a_feed_are_searched_per_term(monkeypatch):
+    feed = [
+        (("Metformin Tablets", "NDMA"), recall("D-1")),
+        (("Aspirin", "Mislabeled"), recall("D-2")),
+    ]
+    searched = []
+
+    async def fda_feed(client, since):
+        return feed
+
+    async def failed_feed(client, since):
+        return None
+
+    async def hc_search(q, since=None):
+        searched.append((q, since))
+        return [recall(f"HC-{q}", source="Health Canada")]
+
+    async def fda_search(q, since=None):
+        raise AssertionError("a source whose feed was read must not be searched")
+
+    monkeypatch.setattr(sources, "enabled_sources", lambda: [FDA, HC])
+    monkeypatch.setattr(FDA, "fetch_feed", fda_feed)
+    monkeypatch.setattr(FDA, "search", fda_search)
+    monkeypatch.setattr(HC, "fetch_feed", failed_feed)
+    monkeypatch.setattr(HC, "search", hc_search)
+
+    matcher = WatchlistMatcher(["metformin", "valsartan"])
+    matches = asyncio.run(alerter.fetch_new_reports(matcher, since="20260108"))
+
+    assert sorted((term, r["source"], r["recall_number"]) for term, r in matches) == [
+        ("metformin", "FDA", "D-1"),
+        ("metformin", "Health Canada", "HC-metformin"),
+        ("valsartan", "Health Canada", "HC-valsartan"),
+    ]
+    assert sorted(searched) == [("metformin", "20260108"), ("valsartan", "20260108")]
+
+
+def test_digest_message():
+    assert alerter.digest_message({"metformin": {"FDA": None}}) == \
+        "New report found for 'metformin' (FDA) on your watchlist."
+    assert alerter.digest_message({"valsartan": {"FDA": None, "Health Canada": None}, "metformin": {"FDA": None}}) == \
+        "New reports for 2 watchlist terms: 'metformin' (FDA); 'valsartan' (FDA, Health Canada)."
+
+
+def test_one_digest_per_user_per_run(db, user, monkeypatch):
+    for term in ("pytestalpha", "pytestbeta"):
+        crud.create_watchlist_item(db, schemas.WatchlistItemCreate(query_text=term), user.id)
+
+    async def fetch_new_reports(matcher, since):
+        return [
+            ("pytestalpha", recall("D-1")),
+            ("pytestalpha", recall("D-2")),
+            ("pytestalpha", recall("HC-1", source="Health Canada")),
+            ("pytestbeta", recall("D-3")),
+            ("unwatched", recall("D-4")),
+        ]
+
+    monkeypatch.setattr(alerter, "fetch_new_reports", fetch_new_reports)
+    monkeypatch.setattr(trends, "backfill_terms", lambda db, terms: [])
+    monkeypatch.setattr(trends, "ingest", lambda db, matches: 0)
+    monkeypatch.setattr(config, "EMAIL_ENABLED", False)
+
+    alerter._check_for_new_reports(db)
+
+    db.expire_all()
+    messages = [n.message for n in db.query(models.Notification).filter(models.Notification.owner_id == user.id)]
+    assert messages == ["New reports for 2 watchlist terms: 'pytestalpha' (FDA, Health Canada); 'pytestbeta' (FDA)."]
@@ -0,0 +1,56 @@
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from backend import auth, caching
+
+
+def request_with(if_none_match):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.mark.parametrize("header, matches", [
+    (None, False),
+    ('W/"watchlist-3"', True),
+    ('"watchlist-3"', True),
+    ('W/"watchlist-2", W/"watchlist-3"', True),
+    ("*", True),
+    ('W/"watchlist-4"', False),
+])
+def test_etag_matches_is_weak(header, matches):
+    assert caching.etag_matches(request_with(header), 'W/"watchlist-3"') is matches
+
+
+@pytest.fixture
+def client(user):
+    from backend.main import app
+
+    token = auth.create_access_token({"sub": user.email})
+    with TestClient(app, headers={"Authorization": f"Bearer {token}"}) as client:
+        yield client
+
+
+def test_unchanged_collection_revalidates_with_304(client):
+    first = client.get("/api/watchlist/")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == caching.REVALIDATE
+
+    again = client.get("/api/watchlist/", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+    assert again.headers["vary"] == "Accept-Encoding"
+
+
+def test_write_changes_the_etag(client):
+    etag = client.get("/api/watchlist/").headers["etag"]
+
+    assert client.post("/api/watchlist/", json={"query_text": "metformin"}).status_code == 200
+
+    after = client.get("/api/watchlist/", headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.headers["etag"] != etag
+    assert [item["query_text"] for item in after.json()] == ["metformin"]
+    assert client.get("/api/watchlist/", headers={"If-None-Match": after.headers["etag"]}).status_code == 304
@@ -0,0 +1,104 @@
+import gzip
+
+import brotli
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from backend.compression import CompressionMiddleware, choose_encoding
+
+BIG = "metformin " * 500
+
+
+def big(request):
+    return PlainTextResponse(BIG)
+
+
+def small(request):
+    return JSONResponse({"ok": True})
+
+
+def binary(request):
+    return Response(b"\x89PNG" + b"\0" * 4096, media_type="image/png")
+
+
+def stream(request):
+    return StreamingResponse((chunk for chunk in (BIG, BIG)), media_type="text/csv")
+
+
+def not_modified(request):
+    return Response(status_code=304, headers={"ETag": 'W/"x"'})
+
+
+@pytest.fixture
+def client():
+    app = Starlette(routes=[Route(f"/{f.__name__}", f) for f in (big, small, binary, stream, not_modified)])
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    # TestClient's default Accept-Encoding would hide what each test sends.
+    with TestClient(app, headers={"Accept-Encoding": ""}) as client:
+        yield client
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("br;q=0, gzip;q=0", ""),
+    ("*", "br"),
+    ("*, br;q=0", "gzip"),
+    ("identity", ""),
+    ("", ""),
+    ("gzip;q=bogus", ""),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_brotli_preferred(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BIG)
+    assert response.text == BIG
+
+
+def test_gzip_when_brotli_refused(client):
+    response = client.get("/big", headers={"Accept-Encoding": "br;q=0, gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == BIG
+
+
+def test_raw_bodies_round_trip(client):
+    # Decode by hand to check the bytes on the wire, not the client's decoding.
+    with client.stream("GET", "/big", headers={"Accept-Encoding": "br"}) as response:
+        assert brotli.decompress(b"".join(response.iter_raw())).decode() == BIG
+    with client.stream("GET", "/big", headers={"Accept-Encoding": "gzip"}) as response:
+        assert gzip.decompress(b"".join(response.iter_raw())).decode() == BIG
+
+
+def test_uncompressed_responses_still_vary(client):
+    refused = client.get("/big", headers={"Accept-Encoding": "gzip;q=0, br;q=0"})
+    assert "content-encoding" not in refused.headers
+    assert refused.headers["vary"] == "Accept-Encoding"
+    assert refused.text == BIG
+
+    too_small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in too_small.headers
+    assert too_small.headers["vary"] == "Accept-Encoding"
+
+    assert client.get("/not_modified", headers={"Accept-Encoding": "gzip"}).headers["vary"] == "Accept-Encoding"
+
+
+def test_incompressible_types_are_untouched(client):
+    response = client.get("/binary", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+
+
+def test_streaming_responses_pass_through(client):
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip, br"}) as response:
+        assert "content-encoding" not in response.headers
+        assert "vary" not in response.headers
+        assert b"".join(response.iter_raw()).decode() == BIG * 2
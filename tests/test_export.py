@@ -0,0 +1,108 @@
+import csv
+import gzip
+import io
+import json
+
+import pyarrow.parquet as pq
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import auth, export, sources
+
+
+def rows(count, query="metformin"):
+    return [
+        {"query": query, "date": f"2024-01-{i % 28 + 1:02d}", "source": "FDA", "severity": "high",
+         "title": f"Recall {i}", "description": "NDMA, above \"limit\"", "source_url": f"https://example.test/{i}",
+         "recall_number": f"D-{i}-2024", "event_id": None}
+        for i in range(count)
+    ]
+
+
+def encode(encoder, batches):
+    return b"".join(encoder.write(batch) for batch in batches) + encoder.close()
+
+
+def test_csv_header_is_written_once_across_batches():
+    data = rows(7)
+    body = encode(export.CsvEncoder(), [data[:3], [], data[3:]]).decode()
+
+    assert body.count("query,date,source") == 1
+    parsed = list(csv.DictReader(io.StringIO(body)))
+    assert [row["recall_number"] for row in parsed] == [row["recall_number"] for row in data]
+    assert parsed[0]["description"] == 'NDMA, above "limit"'
+    assert parsed[0]["event_id"] == ""
+
+
+def test_ndjson_has_every_column_in_order():
+    lines = encode(export.NdjsonEncoder(), [rows(2)]).decode().splitlines()
+    assert [list(json.loads(line)) for line in lines] == [list(export.EXPORT_COLUMNS)] * 2
+
+
+def test_parquet_round_trips_in_row_groups_of_the_requested_size():
+    data = rows(25)
+    encoder = export.ParquetEncoder(row_group_size=10)
+    body = encode(encoder, [data[:4], data[4:17], data[17:]])
+
+    parquet = pq.ParquetFile(io.BytesIO(body))
+    assert parquet.metadata.num_row_groups == 3
+    assert [parquet.metadata.row_group(i).num_rows for i in range(3)] == [10, 10, 5]
+    assert parquet.read().to_pylist() == data
+
+
+def test_parquet_streams_each_full_row_group_as_it_fills():
+    encoder = export.ParquetEncoder(row_group_size=10)
+    assert len(encoder.write(rows(5))) <= 4  # just the magic bytes: no row group yet
+    assert len(encoder.write(rows(5))) > 100
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson", "parquet"])
+def test_gzip_decompresses_to_the_plain_output(fmt):
+    data = rows(30)
+    plain = encode(export.make_encoder(fmt), [data[:12], data[12:]])
+    gzipped = encode(export.make_encoder(fmt, gzip=True), [data[:12], data[12:]])
+
+    if fmt == "parquet":
+        assert pq.read_table(io.BytesIO(gzip.decompress(gzipped))).to_pylist() == data
+    else:
+        assert gzip.decompress(gzipped) == plain
+
+
+@pytest.fixture
+def client(user, monkeypatch):
+    from backend.main import app
+
+    searched = []
+
+    async def search_all(q, since=None, only=None):
+        searched.append(q)
+        return [{k: v for k, v in row.items() if k != "query"} for row in rows(3, q)]
+
+    monkeypatch.setattr(sources, "search_all", search_all)
+    token = auth.create_access_token({"sub": user.email})
+    with TestClient(app, headers={"Authorization": f"Bearer {token}"}) as client:
+        client.searched = searched
+        yield client
+
+
+def test_export_streams_every_query(client):
+    response = client.get("/api/export", params=[("q", "metformin"), ("q", "valsartan"), ("q", " metformin "), ("format", "csv")])
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="pharmaclear-export.csv"'
+    assert client.searched == ["metformin", "valsartan"]
+    parsed = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["query"] for row in parsed] == ["metformin"] * 3 + ["valsartan"] * 3
+
+
+def test_export_gzip_parquet(client):
+    response = client.get("/api/export", params=[("q", "metformin"), ("q", "losartan"), ("format", "parquet"), ("gzip", "true")])
+
+    assert response.headers["content-type"] == "application/gzip"
+    table = pq.read_table(io.BytesIO(gzip.decompress(response.content)))
+    assert table.column("query").to_pylist() == ["metformin"] * 3 + ["losartan"] * 3
+
+
+def test_export_rejects_missing_queries(client):
+    assert client.get("/api/export", params={"q": " x "}).status_code == 400
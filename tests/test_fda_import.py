@@ -0,0 +1,158 @@
+import json
+import zipfile
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from backend import fda_import
+
+MEMBER = "pytest-drug-enforcement-0001-of-0001.json"
+
+
+def record(n, **fields):
+    return {
+        "recall_number": f"PYTEST-{n}",
+        "event_id": str(90000 + n),
+        "product_description": f"Metformin HCl ER Tablets {n}. 500 mg",
+        "reason_for_recall": "NDMA above the acceptable intake limit",
+        "recall_initiation_date": f"202401{n:02d}",
+        "report_date": f"202402{n:02d}",
+        "classification": "Class II",
+        "status": "Ongoing",
+        "recalling_firm": "Pytest Pharma",
+        **fields,
+    }
+
+
+def write_zip(path, records):
+    """A bulk-download style archive: one JSON member holding {"meta", "results"}."""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(MEMBER, json.dumps({"meta": {}, "results": records}))
+    return path
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return write_zip(tmp_path / "drug-enforcement.json.zip", [record(n) for n in range(1, 6)])
+
+
+@pytest.fixture
+def clean_import(db):
+    def clean():
+        db.rollback()
+        db.execute(text("DELETE FROM fda_recalls WHERE recall_number LIKE 'PYTEST-%'"))
+        db.execute(text("DELETE FROM fda_import_checkpoints WHERE member = :member"), {"member": MEMBER})
+        db.commit()
+
+    clean()
+    yield
+    clean()
+
+
+def rows(db):
+    db.rollback()  # a fresh snapshot: the import commits on its own connection
+    return {row.recall_number: row for row in db.execute(
+        text("SELECT * FROM fda_recalls WHERE recall_number LIKE 'PYTEST-%' ORDER BY recall_number"))}
+
+
+def checkpoint(db):
+    db.rollback()
+    return db.execute(text("SELECT records_done, completed_at FROM fda_import_checkpoints WHERE member = :member"),
+                      {"member": MEMBER}).one()
+
+
+def test_to_row_normalizes_like_the_live_search():
+    row = dict(zip(fda_import.COLUMNS, fda_import.to_row(record(3, classification="Class I"))))
+    assert row["recall_number"] == "PYTEST-3"
+    assert row["title"] == "Metformin HCl ER Tablets 3"
+    assert row["description"] == "NDMA above the acceptable intake limit"
+    assert row["recall_date"] == "2024-01-03"
+    assert row["report_date"] == "2024-02-03"
+    assert row["severity"] == "high"
+    assert row["classification"] == "Class I"
+    assert row["recalling_firm"] == "Pytest Pharma"
+    assert row["source_url"].endswith("search=PYTEST-3")
+
+
+def test_to_row_skips_records_without_a_recall_number_and_tolerates_bad_dates():
+    assert fda_import.to_row(record(1, recall_number=None)) is None
+    row = dict(zip(fda_import.COLUMNS, fda_import.to_row(record(1, recall_initiation_date="unknown", report_date=""))))
+    assert row["recall_date"] is None
+    assert row["report_date"] is None
+
+
+def test_import_loads_every_record(db, clean_import, archive):
+    [stats] = fda_import.import_archive(archive, batch_size=2)
+
+    assert (stats.member, stats.records, stats.written, stats.resumed_from) == (MEMBER, 5, 5, 0)
+    loaded = rows(db)
+    assert sorted(loaded) == [f"PYTEST-{n}" for n in range(1, 6)]
+    assert loaded["PYTEST-4"].recall_date == date(2024, 1, 4)
+    assert loaded["PYTEST-4"].severity == "medium"
+    assert checkpoint(db).completed_at is not None
+
+    # Already complete: a second run skips the file without reading it.
+    [again] = fda_import.import_archive(archive, batch_size=2)
+    assert again.skipped and again.records == 0
+
+
+def test_interrupted_import_resumes_after_the_last_committed_batch(db, clean_import, archive, monkeypatch):
+    real_to_row = fda_import.to_row
+    converted = []
+
+    def failing_to_row(item):
+        if item["recall_number"] == "PYTEST-4":
+            raise KeyboardInterrupt
+        return real_to_row(item)
+
+    monkeypatch.setattr(fda_import, "to_row", failing_to_row)
+    with pytest.raises(KeyboardInterrupt):
+        fda_import.import_archive(archive, batch_size=2)
+
+    # Records 1-2 were committed with their checkpoint; record 3 was rolled back.
+    assert sorted(rows(db)) == ["PYTEST-1", "PYTEST-2"]
+    assert tuple(checkpoint(db)) == (2, None)
+    assert fda_import.complete_through(db) is None
+
+    def counting_to_row(item):
+        converted.append(item["recall_number"])
+        return real_to_row(item)
+
+    monkeypatch.setattr(fda_import, "to_row", counting_to_row)
+    [stats] = fda_import.import_archive(archive, batch_size=2)
+
+    assert (stats.resumed_from, stats.records, stats.written) == (2, 3, 3)
+    assert converted == ["PYTEST-3", "PYTEST-4", "PYTEST-5"]
+    assert sorted(rows(db)) == [f"PYTEST-{n}" for n in range(1, 6)]
+    assert checkpoint(db).records_done == 5 and checkpoint(db).completed_at is not None
+
+
+def test_reimport_only_touches_changed_rows(db, clean_import, archive, tmp_path):
+    fda_import.import_archive(archive, batch_size=2)
+    before = rows(db)
+
+    [same] = fda_import.import_archive(archive, batch_size=2, restart=True)
+    assert (same.records, same.written) == (5, 0)
+    assert rows(db) == before  # imported_at included: unchanged rows weren't rewritten
+
+    changed = write_zip(tmp_path / "republished.json.zip",
+                        [record(n, status="Terminated") if n == 2 else record(n) for n in range(1, 6)])
+    [update] = fda_import.import_archive(changed, batch_size=2)
+    assert update.written == 1
+    after = rows(db)
+    assert after["PYTEST-2"].status == "Terminated"
+    assert after["PYTEST-2"].imported_at > before["PYTEST-2"].imported_at
+    assert {n: after[n] for n in after if n != "PYTEST-2"} == {n: before[n] for n in before if n != "PYTEST-2"}
+
+
+def test_match_terms_reads_the_imported_table(db, clean_import, archive):
+    fda_import.import_archive(archive, batch_size=2)
+    db.rollback()
+
+    matches = [(term, alert) for term, alert in fda_import.match_terms(db, ["metformin hcl", "ndma", "insulin"])
+               if alert["recall_number"].startswith("PYTEST-")]
+    assert sorted({term for term, _ in matches}) == ["metformin hcl", "ndma"]
+    assert len(matches) == 10
+    alert = next(alert for term, alert in matches if alert["recall_number"] == "PYTEST-1")
+    assert (alert["date"], alert["source"], alert["severity"]) == ("2024-01-01", "FDA", "medium")
@@ -0,0 +1,109 @@
+from backend import crud, models
+from backend.history import SearchHistoryBuffer
+
+MISSING_USER_ID = 2**31 - 1  # violates the searches.owner_id foreign key
+
+
+def make_buffer(**kwargs):
+    return SearchHistoryBuffer(**{"flush_size": 1000, "flush_interval": 60.0, **kwargs})
+
+
+def stored_counts(db, user_id):
+    db.expire_all()
+    return {s.query_text: s.search_count for s in crud.get_searches_by_user(db, user_id=user_id)}
+
+
+def test_repeats_collapse_into_one_pending_entry():
+    buffer = make_buffer()
+    for _ in range(3):
+        buffer.record(1, "metformin")
+    buffer.record(1, "valsartan")
+    buffer.record(2, "metformin")
+
+    pending = buffer.pending_for(1)
+    assert {q: count for q, (count, _) in pending.items()} == {"metformin": 3, "valsartan": 1}
+    assert {q: count for q, (count, _) in buffer.pending_for(2).items()} == {"metformin": 1}
+
+
+def test_flush_upserts_one_row_per_key_and_adds_to_existing(db, user):
+    buffer = make_buffer()
+    for _ in range(3):
+        buffer.record(user.id, "metformin")
+    assert buffer.flush() == 1
+    assert buffer.pending_for(user.id) == {}
+
+    buffer.record(user.id, "metformin")
+    buffer.record(user.id, "valsartan")
+    assert buffer.flush() == 2
+    assert stored_counts(db, user.id) == {"metformin": 4, "valsartan": 1}
+
+
+def test_read_overlays_unflushed_searches(db, user):
+    buffer = make_buffer()
+    buffer.record(user.id, "metformin")
+    buffer.flush()
+    buffer.record(user.id, "metformin")
+    buffer.record(user.id, "losartan")
+
+    searches = buffer.read_searches(db, user.id)
+    assert {s.query_text: s.search_count for s in searches} == {"metformin": 2, "losartan": 1}
+    assert searches[0].query_text == "losartan"  # most recent first
+    assert stored_counts(db, user.id) == {"metformin": 1}
+
+
+def test_pending_search_moves_its_stored_row_to_the_first_page(db, user):
+    buffer = make_buffer()
+    for query_text in ("aspirin", "aspirin", "losartan", "valsartan"):
+        buffer.record(user.id, query_text)
+        buffer.flush()
+    buffer.record(user.id, "aspirin")  # stored on what would be page 2
+
+    first = buffer.read_searches(db, user.id, skip=0, limit=2)
+    second = buffer.read_searches(db, user.id, skip=2, limit=2)
+    assert [(s.query_text, s.search_count) for s in first] == [("aspirin", 3), ("valsartan", 1)]
+    assert first[0].id is not None
+    assert [(s.query_text, s.search_count) for s in second] == [("losartan", 1)]
+
+
+def test_read_does_not_double_count_a_flush_committing_mid_read(db, user, monkeypatch):
+    buffer = make_buffer()
+    buffer.record(user.id, "metformin")
+    real_query = crud.get_searches_by_user
+    flushed = []
+
+    def query_racing_a_flush(*args, **kwargs):
+        if not flushed:
+            flushed.append(buffer.flush())
+        return real_query(*args, **kwargs)
+
+    monkeypatch.setattr(crud, "get_searches_by_user", query_racing_a_flush)
+    searches = buffer.read_searches(db, user.id)
+    assert flushed == [1]
+    assert {s.query_text: s.search_count for s in searches} == {"metformin": 1}
+
+
+def test_stop_drains_pending_searches(db, user):
+    buffer = make_buffer()
+    buffer.start()
+    buffer.record(user.id, "metformin")
+    buffer.record(user.id, "metformin")
+    buffer.stop()
+    assert buffer.pending_for(user.id) == {}
+    assert stored_counts(db, user.id) == {"metformin": 2}
+
+
+def test_unwritable_row_is_retried_then_dropped_without_blocking_others(db, user):
+    buffer = make_buffer(max_attempts=2)
+    buffer.record(MISSING_USER_ID, "orphan")
+    buffer.record(user.id, "metformin")
+
+    assert buffer.flush() == 1
+    assert stored_counts(db, user.id) == {"metformin": 1}
+    assert {q: count for q, (count, _) in buffer.pending_for(MISSING_USER_ID).items()} == {"orphan": 1}
+
+    buffer.record(user.id, "metformin")
+    assert buffer.flush() == 1
+    assert stored_counts(db, user.id) == {"metformin": 2}
+    assert buffer.pending_for(MISSING_USER_ID) == {}
+    assert buffer.flush() == 0
+    assert db.query(models.Search).filter(models.Search.owner_id == MISSING_USER_ID).count() == 0
@@ -0,0 +1,170 @@
+import asyncio
+import importlib
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+
+import aiosmtplib
+import pytest
+from aiosmtpd.controller import Controller
+
+from backend import config, mailer, models
+
+
+class RecordingHandler:
+    """Accepts mail, remembering which SMTP session delivered each message; can refuse the first few."""
+
+    def __init__(self, refuse: int = 0):
+        self.refuse = refuse
+        self.messages = []  # (session id, recipients)
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.refuse:
+            self.refuse -= 1
+            return "451 Temporary failure, try again later"
+        self.messages.append((id(session), envelope.rcpt_tos))
+        return "250 OK"
+
+    def recipients(self, domain="example.test"):
+        return [rcpt for _, rcpts in self.messages for rcpt in rcpts if rcpt.endswith(domain)]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    servers = []
+
+    def start(refuse: int = 0):
+        handler = RecordingHandler(refuse)
+        controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+        controller.start()
+        servers.append(controller)
+        return handler, controller.port
+
+    yield start
+    for controller in servers:
+        controller.stop()
+
+
+def sender(port, rate_per_second=0.0):
+    return mailer.SMTPSender("127.0.0.1", port, None, None, start_tls=False, rate_per_second=rate_per_second)
+
+
+def queue(db, user, count, attempts=0):
+    mailer.enqueue_emails(db, [
+        {"owner_id": user.id, "to_address": f"user{i}@example.test", "subject": "Digest", "body": "New reports.",
+         "dedupe_key": f"test-{i}"}
+        for i in range(count)
+    ])
+    emails = db.query(models.EmailOutbox).filter(models.EmailOutbox.owner_id == user.id).order_by(models.EmailOutbox.id).all()
+    for email in emails:
+        email.attempts = attempts
+    db.commit()
+    return emails
+
+
+def outbox(db, user):
+    db.expire_all()
+    return db.query(models.EmailOutbox).filter(models.EmailOutbox.owner_id == user.id).order_by(models.EmailOutbox.id).all()
+
+
+def test_enqueue_skips_duplicate_dedupe_keys(db, user):
+    queue(db, user, 2)
+    queue(db, user, 3)
+    assert [email.dedupe_key for email in outbox(db, user)] == ["test-0", "test-1", "test-2"]
+
+
+def test_pooled_delivery_uses_one_connection(db, user, smtp_server):
+    handler, port = smtp_server()
+    queue(db, user, 5)
+
+    asyncio.run(mailer.deliver_pending(db, sender(port), batch_size=2))
+
+    assert sorted(handler.recipients()) == [f"user{i}@example.test" for i in range(5)]
+    assert len({session for session, _ in handler.messages}) == 1
+    assert {email.status for email in outbox(db, user)} == {"sent"}
+
+
+def test_empty_outbox_opens_no_connection(db, user):
+    # Nothing listens on this port, so connecting would raise.
+    assert asyncio.run(mailer.deliver_pending(db, sender(free_port()), batch_size=10)) == {"sent": 0, "failed": 0}
+
+
+def test_unreachable_server_hands_the_batch_back(db, user):
+    queue(db, user, 2)
+
+    with pytest.raises((aiosmtplib.SMTPException, OSError)):
+        asyncio.run(mailer.deliver_pending(db, sender(free_port()), batch_size=10))
+    assert [(email.status, email.attempts) for email in outbox(db, user)] == [("pending", 0), ("pending", 0)]
+
+
+def test_email_is_off_by_default_without_smtp_credentials(monkeypatch):
+    try:
+        with monkeypatch.context() as env:
+            for name in ("EMAIL_ENABLED", "SMTP_USERNAME", "SMTP_PASSWORD", "GMAIL_EMAIL", "GMAIL_APP_PASSWORD"):
+                env.delenv(name, raising=False)
+            assert importlib.reload(config).EMAIL_ENABLED is False
+
+            env.setenv("GMAIL_EMAIL", "alerts@example.test")
+            env.setenv("GMAIL_APP_PASSWORD", "app-password")
+            assert importlib.reload(config).EMAIL_ENABLED is True
+
+            env.setenv("EMAIL_ENABLED", "false")
+            assert importlib.reload(config).EMAIL_ENABLED is False
+    finally:
+        importlib.reload(config)
+
+
+def test_transient_failure_is_retried_with_backoff(db, user, smtp_server, monkeypatch):
+    monkeypatch.setattr(config, "EMAIL_RETRY_BASE_SECONDS", 60)
+    handler, port = smtp_server(refuse=1)
+    queue(db, user, 1)
+
+    before = datetime.now(timezone.utc)
+    asyncio.run(mailer.deliver_pending(db, sender(port), batch_size=10))
+    (email,) = outbox(db, user)
+    assert (email.status, email.attempts) == ("pending", 1)
+    assert "451" in email.last_error
+    assert before + timedelta(seconds=55) < email.next_attempt_at < before + timedelta(seconds=120)
+    assert mailer.retry_delay(3) == timedelta(seconds=240)
+
+    # Once due again, the next run delivers it.
+    email.next_attempt_at = before
+    db.commit()
+    asyncio.run(mailer.deliver_pending(db, sender(port), batch_size=10))
+    assert outbox(db, user)[0].status == "sent"
+    assert handler.recipients() == ["user0@example.test"]
+
+
+def test_email_is_marked_failed_after_max_attempts(db, user, smtp_server, monkeypatch):
+    monkeypatch.setattr(config, "EMAIL_MAX_ATTEMPTS", 3)
+    handler, port = smtp_server(refuse=100)
+    queue(db, user, 1, attempts=2)
+
+    asyncio.run(mailer.deliver_pending(db, sender(port), batch_size=10))
+    (email,) = outbox(db, user)
+    assert (email.status, email.attempts) == ("failed", 3)
+    assert handler.recipients() == []
+
+
+def test_sends_are_throttled(smtp_server):
+    handler, port = smtp_server()
+
+    async def send_all():
+        async with sender(port, rate_per_second=20) as smtp:
+            for i in range(5):
+                message = EmailMessage()
+                message["From"], message["To"], message["Subject"] = "alerts@pharmaclear.local", f"user{i}@example.test", "Digest"
+                message.set_content("New reports.")
+                await smtp.send(message)
+
+    start = time.monotonic()
+    asyncio.run(send_all())
+    assert time.monotonic() - start >= 4 / 20
+    assert len(handler.recipients()) == 5
@@ -0,0 +1,45 @@
+from backend.matcher import WatchlistMatcher, tokenize
+
+
+def test_tokenize_lowercases_and_splits_on_punctuation():
+    assert tokenize("Metformin HCl, 500-mg (ER)") == ["metformin", "hcl", "500", "mg", "er"]
+
+
+def test_single_word_term():
+    matcher = WatchlistMatcher(["metformin"])
+    assert matcher.match("Metformin Hydrochloride Tablets") == {"metformin"}
+    assert matcher.match("Metformina tablets") == set()
+
+
+def test_phrase_needs_consecutive_tokens():
+    matcher = WatchlistMatcher(["extended release"])
+    assert matcher.match("Metformin Extended Release Tablets") == {"extended release"}
+    assert matcher.match("Extended shelf life, release delayed") == set()
+    assert matcher.match("release extended") == set()
+
+
+def test_overlapping_terms_all_match():
+    matcher = WatchlistMatcher(["metformin", "metformin er", "er tablets", "tablets"])
+    assert matcher.match("Metformin ER Tablets") == {"metformin", "metformin er", "er tablets", "tablets"}
+    assert matcher.match("Metformin tablets") == {"metformin", "tablets"}
+
+
+def test_punctuation_in_terms_and_text_is_ignored():
+    matcher = WatchlistMatcher(["co-trimoxazole", "vitamin b12"])
+    assert matcher.match("Co Trimoxazole 800mg/160mg") == {"co-trimoxazole"}
+    assert matcher.match("VITAMIN B-12? no: Vitamin (B12).") == {"vitamin b12"}
+
+
+def test_duplicate_and_empty_terms():
+    matcher = WatchlistMatcher(["aspirin", "aspirin", "", "!!"])
+    assert matcher.terms == {"aspirin"}
+    assert matcher.match("aspirin aspirin") == {"aspirin"}
+
+
+def test_match_fields_does_not_span_fields():
+    matcher = WatchlistMatcher(["tablets contamination", "contamination"])
+    fields = ("Metformin Tablets", "Contamination with NDMA")
+    assert matcher.match(" ".join(fields)) == {"tablets contamination", "contamination"}
+    assert matcher.match_fields(fields) == {"contamination"}
+    assert matcher.match_fields(("", None)) == set()
+
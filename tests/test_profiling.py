@@ -0,0 +1,55 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend import auth, config, profiling
+
+ADMIN = "admin@pharmaclear.local"
+
+
+def render_the_pdf_slowly():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    return {"ok": True}
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "ADMIN_EMAILS", {ADMIN})
+    monkeypatch.setattr(config, "PROFILE_DIR", str(tmp_path))
+    app = FastAPI()
+    app.middleware("http")(profiling.profile_request)
+
+    @app.get("/sync")
+    @profiling.profile_worker_thread
+    def sync_endpoint(q: str = "x"):
+        return render_the_pdf_slowly() | {"q": q}
+
+    with TestClient(app) as client:
+        yield client
+
+
+def admin(**headers):
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': ADMIN})}", **headers}
+
+
+def test_profile_includes_the_worker_threads_frames(client):
+    response = client.get("/sync", headers=admin(**{"X-Profile": "html"}))
+    assert response.status_code == 200
+    assert "render_the_pdf_slowly" in response.text
+
+
+def test_stored_profile_and_normal_response(client, tmp_path):
+    response = client.get("/sync?q=metformin", headers=admin(**{"X-Profile": "store"}))
+    assert response.json() == {"ok": True, "q": "metformin"}
+    report = tmp_path / response.headers["X-Profile-Report"]
+    assert "render_the_pdf_slowly" in report.read_text()
+
+
+def test_unprofiled_requests_run_as_usual(client):
+    response = client.get("/sync", headers={"X-Profile": "html"})  # not an admin
+    assert response.json() == {"ok": True, "q": "x"}
+    assert "X-Profile-Report" not in response.headers
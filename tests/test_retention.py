@@ -0,0 +1,92 @@
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from backend import models, retention
+
+FAR_MONTH = date(2099, 1, 1)  # no partition exists this far ahead
+
+
+def test_ensure_partition_moves_rows_stranded_in_the_default_partition(db, user):
+    name = retention._partition_name(FAR_MONTH)
+    db.add_all([
+        models.Notification(owner_id=user.id, message="stranded", created_at=datetime(2099, 1, 15, tzinfo=timezone.utc)),
+        models.Notification(owner_id=user.id, message="next month", created_at=datetime(2099, 2, 1, tzinfo=timezone.utc)),
+    ])
+    db.commit()
+    try:
+        retention.ensure_partition(db, FAR_MONTH)
+        retention.ensure_partition(db, FAR_MONTH)  # already there: no-op
+
+        placed = dict(db.execute(text(
+            "SELECT message, tableoid::regclass::text FROM notifications WHERE owner_id = :owner"
+        ), {"owner": user.id}).all())
+        assert placed == {"stranded": name, "next month": retention.DEFAULT_PARTITION}
+    finally:
+        db.rollback()
+        db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+        db.commit()
+
+
+def test_ensure_partition_on_an_empty_month(db):
+    name = retention._partition_name(FAR_MONTH)
+    try:
+        retention.ensure_partition(db, FAR_MONTH)
+        assert db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() == name
+    finally:
+        db.rollback()
+        db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+        db.commit()
+
+
+def notifications(db, user):
+    db.expire_all()
+    return sorted(n.message for n in db.query(models.Notification).filter(models.Notification.owner_id == user.id))
+
+
+def test_purge_deletes_only_old_read_notifications_in_batches(db, user, monkeypatch):
+    old = datetime.now(timezone.utc) - timedelta(days=200)
+    db.add_all(
+        [models.Notification(owner_id=user.id, message=f"old read {i}", is_read=True, created_at=old) for i in range(5)]
+        + [
+            models.Notification(owner_id=user.id, message="old unread", is_read=False, created_at=old),
+            models.Notification(owner_id=user.id, message="recent read", is_read=True),
+        ]
+    )
+    db.commit()
+    commits = []
+    real_commit = db.commit
+    monkeypatch.setattr(db, "commit", lambda: commits.append(1) or real_commit())
+
+    assert retention.purge_read_notifications(db, older_than_days=90, batch_size=2) == 5
+    assert len(commits) == 3  # 2 + 2 + 1, each batch in its own transaction
+    assert notifications(db, user) == ["old unread", "recent read"]
+
+
+def test_drop_expired_partitions_keeps_the_window_and_bumps_etags(db, user):
+    expired = date(2001, 1, 1)
+    names = [retention._partition_name(month) for month in (expired, FAR_MONTH)]
+    try:
+        retention.ensure_partition(db, expired)
+        retention.ensure_partition(db, FAR_MONTH)
+        db.add(models.Notification(owner_id=user.id, message="current"))
+        db.commit()
+        version = lambda: db.execute(text(
+            "SELECT version FROM collection_versions WHERE owner_id = :owner AND collection = 'notifications'"
+        ), {"owner": user.id}).scalar()
+        before = version()
+
+        dropped = retention.drop_expired_partitions(db, keep_months=12)
+
+        assert names[0] in dropped
+        current = retention._partition_name(retention._month_start(date.today()))
+        assert names[1] not in dropped and current not in dropped
+        assert db.execute(text("SELECT to_regclass(:name)"), {"name": names[0]}).scalar() is None
+        assert db.execute(text("SELECT to_regclass(:name)"), {"name": names[1]}).scalar() == names[1]
+        assert version() == before + 1
+        assert retention.drop_expired_partitions(db, keep_months=12) == []
+    finally:
+        db.rollback()
+        for name in names:
+            db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+        db.commit()
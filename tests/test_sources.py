@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from backend import config, metrics, sources
+
+FDA = sources.SOURCES["FDA"]
+HC = sources.SOURCES["Health Canada"]
+
+
+@pytest.fixture
+def stub_sources(monkeypatch):
+    """Both sources answer from memory at once: every query returns one alert, or raises if it starts with "fail"."""
+    fetched = []
+
+    def install(source, rate_limit=float("inf"), timeout=30.0, latency=0.0):
+        async def fetch(q, client, since=None):
+            fetched.append((source.name, q))
+            if latency:
+                await asyncio.sleep(latency)
+            if q.startswith("fail"):
+                raise RuntimeError("upstream down")
+            return [{"title": q, "source": source.name}]
+
+        monkeypatch.setattr(source, "fetch", fetch)
+        monkeypatch.setattr(source, "parse", lambda raw: raw)
+        monkeypatch.setattr(source, "normalize", lambda record: record)
+        monkeypatch.setattr(source, "rate_limit", rate_limit)
+        monkeypatch.setattr(source, "timeout", timeout)
+        monkeypatch.setattr(source, "cache_ttl", 0)
+        monkeypatch.setattr(source, "stats", sources.SourceStats())
+        monkeypatch.setattr(source, "_next_slot", 0.0)
+
+    install(FDA)
+    install(HC)
+    install.fetched = fetched
+    return install
+
+
+def run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await sources.close_http_client()
+    return asyncio.run(main())
+
+
+def test_rate_limited_source_does_not_hold_the_budget(stub_sources, monkeypatch):
+    monkeypatch.setattr(config, "SOURCE_CONCURRENCY", 2)
+    stub_sources(HC, rate_limit=5.0)
+
+    async def scenario():
+        throttled = [asyncio.create_task(sources.search_all(f"hc {i}", only=[HC])) for i in range(6)]
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        fda = await sources.search_all("fda only", only=[FDA])
+        elapsed = time.perf_counter() - start
+        await asyncio.gather(*throttled)
+        return fda, elapsed
+
+    fda, elapsed = run(scenario())
+    assert fda == [{"title": "fda only", "source": "FDA"}]
+    # The Health Canada searches are still sleeping on their slots (~1 s in all).
+    assert elapsed < 0.2
+
+
+def test_slot_wait_counts_against_the_timeout(stub_sources):
+    stub_sources(HC, rate_limit=2.0, timeout=0.6)
+
+    async def scenario():
+        start = time.perf_counter()
+        results = await asyncio.gather(*(sources.search_all(f"hc {i}", only=[HC]) for i in range(4)))
+        return results, time.perf_counter() - start
+
+    results, elapsed = run(scenario())
+    # Slots at 0, 0.5, 1.0, 1.5 s: the last two can't start within 0.6 s and fail at once.
+    assert [len(batch) for batch in results] == [1, 1, 0, 0]
+    assert HC.stats.errors == 2
+    assert elapsed < 0.8
+
+
+def test_default_rate_limit_does_not_serialize_interactive_searches(stub_sources):
+    stub_sources(HC, rate_limit=HC.__class__.rate_limit)
+
+    async def scenario():
+        start = time.perf_counter()
+        await asyncio.gather(*(sources.search_all(f"drug {i}") for i in range(12)))
+        return time.perf_counter() - start
+
+    assert run(scenario()) < 1.5
+
+
+def coalesced_metric(source):
+    return metrics.SEARCH_COALESCED.labels(source.name)._value.get()
+
+
+def test_concurrent_searches_share_one_fetch(stub_sources):
+    stub_sources(FDA, latency=0.05)
+    before = coalesced_metric(FDA)
+
+    async def scenario():
+        return await asyncio.gather(*(FDA.search(q) for q in ("Metformin", " metformin ", "METFORMIN\t", "metformin")))
+
+    results = run(scenario())
+    assert stub_sources.fetched == [("FDA", "Metformin")]
+    assert results == [[{"title": "Metformin", "source": "FDA"}]] * 4
+    assert (FDA.stats.calls, FDA.stats.coalesced) == (1, 3)
+    assert coalesced_metric(FDA) - before == 3
+    # Callers get their own lists, so one mutating its results can't affect the others.
+    assert len({id(batch) for batch in results}) == 4
+
+
+def test_cancelled_leader_does_not_cancel_the_flight(stub_sources):
+    stub_sources(FDA, latency=0.1)
+
+    async def scenario():
+        leader = asyncio.create_task(FDA.search("valsartan"))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.create_task(FDA.search(q)) for q in ("Valsartan", "VALSARTAN ")]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    results = run(scenario())
+    assert results == [[{"title": "valsartan", "source": "FDA"}]] * 2
+    assert stub_sources.fetched == [("FDA", "valsartan")]
+    assert (FDA.stats.calls, FDA.stats.coalesced, FDA.stats.errors) == (1, 2, 0)
+
+
+def test_fda_feed_failure_returns_none_instead_of_a_partial_feed(monkeypatch):
+    monkeypatch.setattr(FDA, "feed_page_size", 1)
+    monkeypatch.setattr(FDA, "rate_limit", 1e9)
+    record = {"product_description": "Metformin Tablets", "reason_for_recall": "NDMA", "recall_number": "D-1-2025"}
+    pages = []
+
+    def handler(request):
+        pages.append(request.url)
+        if len(pages) == 1:
+            return httpx.Response(200, json={"meta": {"results": {"total": 3}}, "results": [record]})
+        return httpx.Response(500)
+
+    async def fetch():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await FDA.fetch_feed(client, "20250101")
+
+    assert asyncio.run(fetch()) is None
+    assert len(pages) == 2
@@ -0,0 +1,88 @@
+from backend.suggest import SHORT_PREFIX, SuggestionIndex, product_name
+
+
+def recalls(*titles):
+    return [{"title": title} for title in titles]
+
+
+def texts(results):
+    return [result["text"] for result in results]
+
+
+def make_index(*titles, compact=True):
+    index = SuggestionIndex(compact_threshold=10_000)
+    index.add_recalls(recalls(*titles))
+    if compact:
+        index.compact()
+    return index
+
+
+def test_product_name_keeps_the_part_before_the_first_comma():
+    assert product_name("Metformin  HCl ER Tablets, 500 mg, Rx only") == "Metformin HCl ER Tablets"
+
+
+def test_prefix_matches_rank_by_popularity_then_length():
+    index = make_index("Metformin Tablets", "Metformin Hydrochloride Extended-Release Tablets", "Metoprolol Tartrate")
+    assert texts(index.suggest("metf", fuzzy=False)) == ["Metformin Tablets", "Metformin Hydrochloride Extended-Release Tablets"]
+
+    index.bump("Metformin Hydrochloride Extended-Release Tablets", 5)
+    assert texts(index.suggest("metfor"))[0] == "Metformin Hydrochloride Extended-Release Tablets"
+
+
+def test_later_words_are_searchable():
+    index = make_index("Lisinopril and Hydrochlorothiazide Tablets")
+    assert texts(index.suggest("hydrochloro")) == ["Lisinopril and Hydrochlorothiazide Tablets"]
+
+
+def test_short_prefixes_are_answered_from_the_precomputed_top_list():
+    index = make_index("Aspirin", "Atenolol", "Amlodipine", "Azithromycin")
+    assert set(index._top["a"]) == {"aspirin", "atenolol", "amlodipine", "azithromycin"}
+    assert "at" in index._top and "aten" in index._top
+    assert all(len(prefix) <= SHORT_PREFIX for prefix in index._top)
+    assert texts(index.suggest("at")) == ["Atenolol"]
+
+    # Scores from after the compaction still decide the order.
+    index.bump("Azithromycin", 3)
+    assert texts(index.suggest("a"))[0] == "Azithromycin"
+
+
+def test_uncompacted_names_are_found_and_merged_on_compaction():
+    index = make_index("Metformin Tablets")
+    index.add_recalls(recalls("Metoprolol Tartrate", "Metformin Tablets, 1000 mg"))
+    assert index._delta == {"metoprolol tartrate": None}
+    assert set(texts(index.suggest("met"))) == {"Metformin Tablets", "Metoprolol Tartrate"}
+
+    index.compact()
+    assert index._delta == {}
+    assert set(texts(index.suggest("met"))) == {"Metformin Tablets", "Metoprolol Tartrate"}
+    assert len(index) == 2
+
+
+def test_misspelt_prefix_falls_back_to_fuzzy_matches():
+    index = make_index("Metformin Tablets", "Valsartan Tablets")
+    results = index.suggest("metfro")  # transposition
+    assert [(r["text"], r["fuzzy"]) for r in results] == [("Metformin Tablets", True)]
+    assert texts(index.suggest("valsaran")) == ["Valsartan Tablets"]  # deletion
+    assert texts(index.suggest("vslsartan")) == ["Valsartan Tablets"]  # replacement
+    assert index.suggest("metfro", fuzzy=False) == []
+
+
+def test_fuzzy_matching_covers_uncompacted_names():
+    index = make_index("Valsartan Tablets")
+    index.add_recalls(recalls("Metformin Tablets"))
+    assert index._delta
+    assert texts(index.suggest("metfro")) == ["Metformin Tablets"]
+    assert texts(index.suggest("mtformin")) == ["Metformin Tablets"]
+
+
+def test_exact_matches_come_before_fuzzy_ones():
+    index = make_index("Metformin Tablets", "Metforming Solution")
+    results = index.suggest("metformi")
+    assert all(not r["fuzzy"] for r in results)
+    assert texts(index.suggest("metforn")) == ["Metformin Tablets", "Metforming Solution"]
+
+
+def test_popular_searches_are_suggested_after_a_refresh():
+    index = make_index("Metformin Tablets")
+    index.refresh_from_history([("metformin recall", 7)])
+    assert texts(index.suggest("metf")) == ["metformin recall", "Metformin Tablets"]
@@ -0,0 +1,194 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from backend import alerter, auth, fda_import, sources, trends
+
+TERM = "pytest trendterm"
+OTHER = "pytest trendonly"
+
+
+def alert(number, day, source="FDA", severity="high"):
+    return {"title": number, "date": day, "source": source, "severity": severity, "recall_number": number}
+
+
+@pytest.fixture
+def clean_trends(db):
+    def clean():
+        db.rollback()
+        for table in ("trend_terms", "trend_counts", "trend_seen_recalls"):
+            db.execute(text(f"DELETE FROM {table} WHERE term = ANY(:terms)"), {"terms": [TERM, OTHER]})
+        db.commit()
+
+    clean()
+    yield
+    clean()
+
+
+@pytest.fixture
+def history(monkeypatch):
+    """Replaces each source's fetch_history; a source mapped to None fails."""
+    calls = []
+
+    def install(**per_source):
+        for name, alerts in per_source.items():
+            async def fetch_history(q, client, since=None, name=name, alerts=alerts):
+                calls.append((name, q, since))
+                return alerts
+            monkeypatch.setattr(sources.SOURCES[name], "fetch_history", fetch_history)
+        monkeypatch.setattr(sources, "enabled_sources", lambda: [sources.SOURCES[name] for name in per_source])
+        return calls
+
+    monkeypatch.setattr(fda_import, "complete_through", lambda db: None)
+    return install
+
+
+def counts(db, term):
+    return dict(db.execute(
+        text("SELECT month, sum(count) FROM trend_counts WHERE term = :term GROUP BY month"), {"term": term},
+    ).all())
+
+
+def test_fda_history_pages_past_the_first_page(monkeypatch):
+    fda = sources.SOURCES["FDA"]
+    monkeypatch.setattr(fda, "feed_page_size", 2)
+    monkeypatch.setattr(fda, "rate_limit", 1e9)
+    records = [{"recall_number": f"D-{i}-2010", "recall_initiation_date": "20100105"} for i in range(5)]
+    urls = []
+
+    def handler(request):
+        urls.append(str(request.url))
+        skip = int(request.url.params["skip"])
+        return httpx.Response(200, json={"meta": {"results": {"total": len(records)}}, "results": records[skip:skip + 2]})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await fda.fetch_history("metformin", client, since="20240101")
+
+    alerts = asyncio.run(run())
+    assert [a["recall_number"] for a in alerts] == [r["recall_number"] for r in records]
+    assert len(urls) == 3
+    assert all("report_date:[20240101" in url for url in urls)
+
+
+def test_fda_history_fails_instead_of_returning_part_of_it(monkeypatch):
+    fda = sources.SOURCES["FDA"]
+    monkeypatch.setattr(fda, "feed_page_size", 1)
+    monkeypatch.setattr(fda, "rate_limit", 1e9)
+
+    def handler(request):
+        if request.url.params["skip"] == "1":
+            return httpx.Response(500)
+        return httpx.Response(200, json={"meta": {"results": {"total": 3}}, "results": [{"recall_number": "D-1"}]})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await fda.fetch_history("metformin", client)
+
+    assert asyncio.run(run()) is None
+
+
+def test_failed_source_leaves_the_term_untracked(db, clean_trends, history):
+    history(**{"FDA": [alert("D-1-2005", "2005-03-14")], "Health Canada": None})
+
+    assert trends.backfill_terms(db, [TERM]) == []
+    assert trends.untracked_terms(db, [TERM]) == [TERM]
+    assert counts(db, TERM) == {}
+
+
+def test_backfill_covers_the_whole_history(db, clean_trends, history):
+    history(**{
+        "FDA": [alert("D-1-2005", "2005-03-14"), alert("D-2-2024", "2024-07-02")],
+        "Health Canada": [alert("https://hc/1", "2012-11-30", source="Health Canada")],
+    })
+
+    assert trends.backfill_terms(db, [TERM]) == [TERM]
+    assert trends.untracked_terms(db, [TERM]) == []
+    assert counts(db, TERM) == {date(2005, 3, 1): 1, date(2012, 11, 1): 1, date(2024, 7, 1): 1}
+    # Tracked now, so a second call doesn't fetch or count anything again.
+    assert trends.backfill_terms(db, [TERM]) == []
+    assert sum(counts(db, TERM).values()) == 3
+
+
+def test_backfill_reads_fda_from_a_complete_import(db, clean_trends, history, monkeypatch):
+    calls = history(**{"FDA": [alert("D-2-2024", "2024-07-02")]})
+    monkeypatch.setattr(fda_import, "complete_through", lambda db: date(2024, 6, 30))
+    monkeypatch.setattr(fda_import, "match_terms", lambda db, terms: iter([(TERM, alert("D-1-1999", "1999-01-20"))]))
+
+    assert trends.backfill_terms(db, [TERM]) == [TERM]
+    assert calls == [("FDA", TERM, "20240630")]
+    assert counts(db, TERM) == {date(1999, 1, 1): 1, date(2024, 7, 1): 1}
+
+
+def test_alerter_keeps_trend_only_terms_current(db, clean_trends, monkeypatch):
+    db.execute(text("INSERT INTO trend_terms (term) VALUES (:term)"), {"term": OTHER})
+    db.commit()
+    seen = {}
+
+    async def fetch_new_reports(matcher, since):
+        seen["terms"] = matcher.terms
+        return [(OTHER, alert("D-3-2026", "2026-01-09"))]
+
+    monkeypatch.setattr(alerter, "fetch_new_reports", fetch_new_reports)
+    monkeypatch.setattr(trends, "backfill_terms", lambda db, terms: [])
+
+    alerter._check_for_new_reports(db)
+
+    assert OTHER in seen["terms"]
+    assert counts(db, OTHER) == {date(2026, 1, 1): 1}
+
+
+@pytest.fixture
+def api(user, monkeypatch):
+    from backend.main import app
+
+    monkeypatch.setattr(trends, "backfills", trends.TrendBackfills(workers=1, retry_after=60))
+    token = auth.create_access_token({"sub": user.email})
+    with TestClient(app, headers={"Authorization": f"Bearer {token}"}) as client:
+        yield client
+
+
+def test_trends_backfill_runs_once_in_the_background(db, clean_trends, api, monkeypatch):
+    gate, calls = threading.Event(), []
+
+    def slow_backfill(session, terms):
+        calls.append(list(terms))
+        gate.wait(5)
+        session.execute(text("INSERT INTO trend_terms (term) VALUES (:term)"), {"term": TERM})
+        session.commit()
+        return [TERM]
+
+    monkeypatch.setattr(trends, "backfill_terms", slow_backfill)
+    with ThreadPoolExecutor(4) as pool:
+        responses = list(pool.map(lambda q: api.get("/api/trends", params={"q": q}), [TERM, TERM.upper(), f" {TERM} "] * 2))
+    assert {response.status_code for response in responses} == {202}
+    assert responses[0].json() == {"term": TERM, "status": "backfilling"}
+
+    flight = trends.backfills.request(TERM)  # joins the running backfill
+    gate.set()
+    assert flight.result(5) is True
+    assert calls == [[TERM]]
+    response = api.get("/api/trends", params={"q": TERM})
+    assert response.status_code == 200
+    assert response.json()["term"] == TERM
+
+
+def test_failed_trends_backfill_answers_503_until_retry(db, clean_trends, api, history):
+    history(**{"FDA": [alert("D-1-2005", "2005-03-14")], "Health Canada": None})
+
+    assert trends.backfills.request(TERM).result(5) is False
+
+    failed = api.get("/api/trends", params={"q": TERM})
+    assert failed.status_code == 503
+    assert failed.headers["retry-after"] == "60"
+    assert trends.untracked_terms(db, [TERM]) == [TERM]
+
+    trends.backfills.retry_after = 0
+    assert api.get("/api/trends", params={"q": TERM}).status_code == 202
+    assert trends.backfills.request(TERM).result(5) is False